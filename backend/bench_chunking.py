@@ -0,0 +1,56 @@
+"""
+Benchmarks chunk_transcript (time windows) against chunk_segments_by_tokens
+on synthetic 4-hour transcripts.
+
+    python bench_chunking.py [hours] [seconds_per_segment]
+"""
+import random
+import sys
+import time
+
+from services.analysis import chunk_transcript
+from services.transcript_chunking import chunk_segments_by_tokens, count_tokens, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS
+
+WORDS = "we then so actually the idea is that you really need to think about how people hear a story".split()
+# Conversational speech: ~150 words per minute on average, faster in heated
+# dialogue and slower in reflective stretches.
+FAST_WPM, SLOW_WPM = 180, 120
+
+def make_transcript(hours: float, seconds_per_segment: float):
+    random.seed(42)
+    segments, t, speaker = [], 0.0, "Host"
+    while t < hours * 3600:
+        if random.random() < 0.15:
+            speaker = "Guest" if speaker == "Host" else "Host"
+        duration = seconds_per_segment * random.uniform(0.5, 1.5)
+        # Fast 15-minute stretches alternate with slower ones
+        wpm = FAST_WPM if (t // 900) % 2 == 0 else SLOW_WPM
+        words = max(1, round(duration * wpm / 60))
+        text = " ".join(random.choices(WORDS, k=words)) + "."
+        segments.append({"speaker": speaker, "time": f"{int(t // 3600):02d}:{int(t % 3600 // 60):02d}:{int(t % 60):02d}",
+                         "start_seconds": t, "text": text})
+        t += duration
+    return segments
+
+def timed(fn, repeat: int = 3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def describe(name: str, seconds: float, chunks):
+    tokens = [count_tokens(c["text"]) for c in chunks]
+    over = sum(1 for c in chunks if len(c["text"]) > 30000) # What analyze_transcript used to truncate
+    print(f"{name:<28} {seconds * 1000:9.1f} ms  {len(chunks):4d} chunks  "
+          f"tokens min/avg/max {min(tokens)}/{sum(tokens) // len(tokens)}/{max(tokens)}  over 30k chars: {over}")
+
+if __name__ == "__main__":
+    hours = float(sys.argv[1]) if len(sys.argv) > 1 else 4
+    per_segment = float(sys.argv[2]) if len(sys.argv) > 2 else 4
+    segments = make_transcript(hours, per_segment)
+    words = sum(len(s["text"].split()) for s in segments)
+    print(f"{len(segments)} segments over {hours:g}h ({words / (hours * 60):.0f} wpm)")
+    describe("chunk_transcript 300s/60s", *timed(lambda: chunk_transcript(segments, 300, 60)))
+    describe(f"by tokens {CHUNK_TOKENS}/{CHUNK_OVERLAP_TOKENS}", *timed(lambda: chunk_segments_by_tokens(segments)))
@@ -1,5 +1,6 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
 import os
@@ -8,7 +9,7 @@ from dotenv import load_dotenv
 
 
 # Import services
-from services.transcription import fetch_transcript
+from services.transcription import fetch_transcript_async
 from services.analysis import analyze_transcript
 from services.rss import parse_podcast_feed
 
@@ -40,6 +41,22 @@ class AnalyzeRequest(BaseModel):
     provider_config: Optional[dict] = None # { provider: 'openai', api_key: '...', base_url: '...' }
     transcription_config: Optional[dict] = None # { provider: 'deepgram', api_key: '...' }
 
+@app.on_event("startup")
+def clean_scratch_space():
+    """Removes temp audio/subtitle files left behind by crashed or killed workers."""
+    from services.scratch import scratch_space
+    scratch_space.cleanup_stale(legacy_dir=os.path.dirname(os.path.abspath(__file__)))
+
+@app.on_event("shutdown")
+async def close_pooled_clients():
+    """Closes keep-alive connections held by the LLM provider pool and the cache DB, and flushes job writes."""
+    from services.llm_factory import close_http_clients
+    from services.cache import cache_service
+    from services.jobs import job_manager
+    await close_http_clients()
+    cache_service.close()
+    job_manager.store.close()
+
 @app.get("/")
 def read_root():
     return {"message": "StoryFlow Backend is Running"}
@@ -95,47 +112,127 @@ def get_job_status(job_id: str):
         raise HTTPException(status_code=404, detail="Job not found")
     return job
 
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Pushes progress, partial results and the final result as server-sent events."""
+    if not await asyncio.to_thread(job_manager.get_job, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(
+        job_manager.event_stream(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/webhooks/uniscribe")
+async def uniscribe_webhook(payload: dict, token: Optional[str] = None):
+    """
+    Completion callback for Uniscribe tasks (set UNISCRIBE_WEBHOOK_URL to this endpoint).
+    It only wakes the waiting job, which then re-reads the task from the API,
+    so the payload is never trusted. Polling continues as a fallback.
+    """
+    from services.remote_tasks import remote_task_waiter
+    secret = os.getenv("UNISCRIBE_WEBHOOK_SECRET")
+    if secret and token != secret:
+        raise HTTPException(status_code=403, detail="Invalid webhook token")
+    data = payload.get("data") if isinstance(payload.get("data"), dict) else payload
+    task_id = data.get("id") or data.get("task_id")
+    if not task_id:
+        raise HTTPException(status_code=400, detail="Missing task id")
+    return {"notified": remote_task_waiter.notify("uniscribe", str(task_id))}
+
 from services.cache import cache_service
 
-async def run_analysis_task(job_id: str, transcript_data: dict, model_id: str, provider_config: dict, cache_key_input: str = None):
-    """Background task wrapper."""
+async def run_analysis_task(job_id: str, transcript_data: Optional[dict], model_id: str, provider_config: dict, cache_key_input: str = None, url: str = None, transcription_config: dict = None):
+    """
+    Background job pipeline.
+    Stage 1 (0-20%): fetch the transcript when only a URL was given.
+    Stage 2 (20-100%): LLM analysis.
+    """
+    provider_config = provider_config or {}
+    transcript_key = None
     try:
+        if transcript_data is None:
+            print(f"Fetching from URL: {url}")
+            job_manager.update_progress(job_id, 5, "Fetching Transcript...")
+            try:
+                # Blocking providers (yt-dlp / ffmpeg / SDKs) run on worker threads;
+                # remote jobs (Uniscribe) are awaited on the loop without holding a thread
+                # /analyze already missed the transcript cache for this URL
+                transcript_data = await fetch_transcript_async(url, transcription_config, check_cache=False)
+            except Exception as e:
+                job_manager.fail_job(job_id, f"Transcription failed: {str(e)}")
+                return
+
+            # The job only references the transcript; clients fetch it from /history/{key}/transcript
+            transcript_key = await asyncio.to_thread(
+                cache_service.set_pending_transcript, cache_key_input, model_id, transcript_data.get("segments", [])
+            )
+            job_manager.set_transcript(job_id, {
+                "url": url,
+                "video_id": transcript_data.get("video_id"),
+                "title": transcript_data.get("title", "Unknown Title"),
+                "duration": transcript_data.get("duration", 0)
+            }, transcript_key)
+            job_manager.update_progress(job_id, 20, "Transcript ready. Starting analysis...")
+
         # Pass job_id to analyze_transcript so it can update progress
         result = await analyze_transcript(transcript_data, model_id, job_id=job_id, provider_config=provider_config)
-        
+        if "error" in result:
+            # analyze_transcript already failed the job; there is nothing to cache
+            if transcript_key:
+                await asyncio.to_thread(cache_service.discard_pending_transcript, transcript_key)
+            return
+
         # Merge everything into a single cacheable object
         full_result = {
             "meta": {
                 "video_id": transcript_data.get("video_id"),
                 "title": transcript_data.get("title"),
                 "duration": transcript_data.get("duration"),
-                "url": provider_config.get("url") or "Uploaded File" # Or derived from request
+                "url": url or provider_config.get("url") or "Uploaded File", # Or derived from request
+                "prompt_version": result.get("prompt_version")
             },
             "transcript": transcript_data.get("segments"),
             "analysis": result
         }
 
-        # Cache the result if successful
+        # Cache the result if successful (compression + SQLite write stay off the event loop)
         if cache_key_input:
-            cache_service.set(cache_key_input, model_id, full_result)
+            await asyncio.to_thread(cache_service.set, cache_key_input, model_id, full_result)
             
     except Exception as e:
         print(f"Background Job Failed: {e}")
         job_manager.fail_job(job_id, str(e))
+        if transcript_key:
+            await asyncio.to_thread(cache_service.discard_pending_transcript, transcript_key)
 
 @app.get("/history")
-def get_history():
-    """Returns list of past analyses."""
-    return {"history": cache_service.get_history_list()}
+def get_history(limit: Optional[int] = None, cursor: Optional[str] = None):
+    """Returns list of past analyses. Pass limit (and next_cursor from the previous page) to paginate."""
+    if limit is not None and limit <= 0:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    try:
+        history, next_cursor = cache_service.get_history_list(limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"history": history, "next_cursor": next_cursor}
 
 @app.get("/history/{key}")
-def get_history_item(key: str):
-    """Returns full analysis for a specific history item."""
-    data = cache_service.get_analysis_by_key(key)
+def get_history_item(key: str, include_transcript: bool = True):
+    """Returns full analysis for a specific history item. Use include_transcript=false to load the transcript lazily."""
+    data = cache_service.get_analysis_by_key(key, include_transcript=include_transcript)
     if not data:
         raise HTTPException(status_code=404, detail="History item not found")
     return data
 
+@app.get("/history/{key}/transcript")
+def get_history_transcript(key: str):
+    """Returns only the transcript segments of a history item."""
+    transcript = cache_service.get_transcript_by_key(key)
+    if transcript is None:
+        raise HTTPException(status_code=404, detail="Transcript not found")
+    return {"transcript": transcript}
+
 class DeleteHistoryRequest(BaseModel):
     keys: list[str]
 
@@ -160,10 +257,12 @@ async def analyze(request: AnalyzeRequest, background_tasks: BackgroundTasks):
     # but for correctness we should probably hash the whole thing. 
     # For now, let's just pass the full string to the cache service (it hashes it internally).
     
-    cached_result = cache_service.get(cache_input, request.model)
+    # The transcript stays out of the job record; the client loads it from /history/{key}/transcript
+    cached_result = await asyncio.to_thread(cache_service.get, cache_input, request.model, False)
     if cached_result:
         # Cache Hit! Create a job that is already done.
         job_id = job_manager.create_job()
+        job_manager.set_transcript(job_id, cached_result.get("meta"), cache_service.history_key(cache_input, request.model))
         job_manager.update_progress(job_id, 100, "Result found in cache.")
         job_manager.complete_job(job_id, cached_result)
         
@@ -175,22 +274,21 @@ async def analyze(request: AnalyzeRequest, background_tasks: BackgroundTasks):
             "transcript_preview": [] # Already done
         }
 
-    # 1. Fetch/Process Transcript (Synchronous or lightweight async)
-    try:
-        if request.transcript_text:
-            print("Using manual transcript text...")
-            from services.transcription import process_manual_transcript
-            transcript_data = process_manual_transcript(request.transcript_text)
-            request_url = "Manual Input"
-        elif request.url:
-            print(f"Fetching from URL: {request.url}")
-            transcript_data = fetch_transcript(request.url, request.transcription_config)
-            request_url = request.url
-        else:
-            raise HTTPException(status_code=400, detail="Either 'url' or 'transcript_text' must be provided.")
-            
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Transcription failed: {str(e)}")
+    # 1. Manual text is cheap to process here; URLs are transcribed inside the job
+    transcript_data = None
+    if request.transcript_text:
+        print("Using manual transcript text...")
+        from services.transcription import process_manual_transcript
+        transcript_data = process_manual_transcript(request.transcript_text)
+        request_url = "Manual Input"
+    elif request.url:
+        request_url = request.url
+        # Transcript cache hit (same media, provider, language): go straight to analysis.
+        # This is the only lookup; on a miss the job fetches without checking again.
+        from services.transcription import get_cached_transcript
+        transcript_data = await asyncio.to_thread(get_cached_transcript, request.url, request.transcription_config)
+    else:
+        raise HTTPException(status_code=400, detail="Either 'url' or 'transcript_text' must be provided.")
     
     # 2. Create Job
     job_id = job_manager.create_job()
@@ -199,7 +297,20 @@ async def analyze(request: AnalyzeRequest, background_tasks: BackgroundTasks):
     # Pass cache_key_input so the background task knows what to cache it as
     cache_key_to_save = request.url if request.url else request.transcript_text
     
-    background_tasks.add_task(run_analysis_task, job_id, transcript_data, request.model, request.provider_config, cache_key_to_save)
+    background_tasks.add_task(
+        run_analysis_task, job_id, transcript_data, request.model, request.provider_config, cache_key_to_save,
+        url=request.url, transcription_config=request.transcription_config
+    )
+    
+    if transcript_data is None:
+        # Transcript arrives on the job once stage 1 finishes
+        return {
+            "job_id": job_id,
+            "status": "queued",
+            "message": "Transcription started. Poll /jobs/{job_id} for updates.",
+            "meta": {"url": request_url, "video_id": None, "title": "Fetching transcript...", "duration": 0},
+            "transcript_preview": []
+        }
     
     return {
         "job_id": job_id,
@@ -3,23 +3,19 @@ import requests
 import json
 import re
 import asyncio
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Callable
 
-# Load the PROMPT from prompt.md
-PROMPT_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "prompt.md")
+from services.prompts import prompt_registry
 
 def load_prompt():
-    """Reads the prompt.md file."""
-    try:
-        with open(PROMPT_FILE_PATH, "r", encoding="utf-8") as f:
-            return f.read()
-    except FileNotFoundError:
-        print(f"Warning: prompt.md not found at {PROMPT_FILE_PATH}")
-        return "You are an expert storytelling coach..."
+    """Returns the current prompt.md content (cached, reloaded only when the file changes)."""
+    return prompt_registry.content
 
 def chunk_transcript(segments: List[Dict], chunk_duration_sec: int = 900, overlap_sec: int = 120) -> List[Dict]:
     """
     Splits transcript segments into chunks based on duration.
+    Superseded by transcript_chunking.chunk_segments_by_tokens for analysis;
+    kept for callers that want fixed time windows.
     
     Args:
         segments: List of transcript segments [{'start_seconds': 0.0, 'text': '...'}]
@@ -71,16 +67,101 @@ def chunk_transcript(segments: List[Dict], chunk_duration_sec: int = 900, overla
     return chunks
 
 from services.jobs import job_manager
+from services.llm_factory import get_llm_provider, RateLimitError
+from services.json_stream import IncrementalJSONParser
+from services.rate_limiter import get_llm_limiter, estimate_tokens
+from services.llm_retry import resilient_caller
+from services.transcript_chunking import chunk_segments_by_tokens, chunk_token_budget, count_tokens, CHUNK_OVERLAP_TOKENS
+from services.macro_summary import HierarchicalSummarizer, macro_input_budget, transcript_text
+from services.cache import cache_service, llm_call_key
+from services.moments import deduplicate_moments
+from services.llm_usage import start_usage_tracking, stop_usage_tracking, record_call_usage, record_result_cache_hit
 
-from services.jobs import job_manager
-from services.llm_factory import get_llm_provider
+# Admission (requests/min, tokens/min, concurrency) is shared by every job on the
+# same provider + API key; see services/rate_limiter.py for the knobs.
+# How often one call waits out a 429 before giving up.
+RATE_LIMIT_RETRIES = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "3"))
+# Output budget reserved against the tokens/min bucket until real usage is known
+ESTIMATED_OUTPUT_TOKENS = 2048
+
+def estimate_call_tokens(messages: List[Dict]) -> int:
+    return estimate_tokens(messages, ESTIMATED_OUTPUT_TOKENS)
+
+def usage_tokens(usage: Optional[Dict]) -> Optional[int]:
+    """Total tokens from an OpenAI ('total_tokens') or Anthropic ('input/output_tokens') usage block."""
+    if not usage:
+        return None
+    if usage.get("total_tokens"):
+        return usage["total_tokens"]
+    total = (usage.get("input_tokens") or 0) + (usage.get("output_tokens") or 0)
+    return total or None
+
+# Stream completions by default? Override per request with provider_config['stream'].
+LLM_STREAMING = os.getenv("LLM_STREAMING", "false").lower() in ("1", "true", "yes")
 
-# We no longer need call_ai_api_sync as a standalone, but the factory is sync.
-# We will wrap the factory call in the async executor.
+# Sampling settings sent with every call (also part of the LLM call cache key)
+LLM_MAX_TOKENS = 4096
+LLM_TEMPERATURE = 0.3
+# Reuse results of identical LLM calls across jobs? Override per request with provider_config['llm_cache'].
+LLM_CACHE = os.getenv("LLM_CACHE", "true").lower() in ("1", "true", "yes")
+# Array keys replayed to on_item when a call is served from the cache
+STREAMED_KEYS = ("narrative_arc", "learning_moments")
 
-async def call_ai_api(messages: List[Dict], model_id: str, provider_config: Dict) -> Dict:
+def use_llm_cache(provider_config: Dict) -> bool:
+    value = provider_config.get("llm_cache")
+    return LLM_CACHE if value is None else bool(value)
+
+def use_streaming(provider_config: Dict) -> bool:
+    value = provider_config.get("stream")
+    return LLM_STREAMING if value is None else bool(value)
+
+async def stream_completion(provider, messages: List[Dict], model_id: str, parser: IncrementalJSONParser, on_item: Optional[Callable] = None):
+    """Consumes a streamed completion, reporting each complete array item to on_item."""
+    parts = []
+    finish_reason = None
+    usage = None
+    async for event in provider.stream(messages, model=model_id, max_tokens=LLM_MAX_TOKENS, temperature=LLM_TEMPERATURE):
+        if "delta" in event:
+            parts.append(event["delta"])
+            for key, item in parser.feed(event["delta"]):
+                if on_item: on_item(key, item)
+        else:
+            finish_reason = event.get("finish_reason")
+            usage = event.get("usage")
+    return "".join(parts), finish_reason, usage
+
+def _llm_cache_key(messages: List[Dict], model_id: str, provider_config: Dict) -> Optional[str]:
+    if not use_llm_cache(provider_config):
+        return None
+    base_url = provider_config.get("base_url") or os.getenv("BASE_URL")
+    return llm_call_key(messages, model_id, provider_config.get("provider", "openai"), base_url, LLM_TEMPERATURE, LLM_MAX_TOKENS)
+
+async def get_cached_result(cache_key: Optional[str], on_item: Optional[Callable] = None) -> Optional[Dict]:
+    """Returns the cached result of an identical earlier call (replaying its items to on_item), or None."""
+    if not cache_key:
+        return None
+    cached = await asyncio.to_thread(cache_service.get_llm_result, cache_key)
+    if cached is None:
+        return None
+    print(f"LLM cache HIT for {cache_key[:8]}")
+    record_result_cache_hit()
+    if on_item:
+        for key in STREAMED_KEYS:
+            for item in cached.get(key) or []:
+                on_item(key, item)
+    return cached
+
+async def call_ai_api(messages: List[Dict], model_id: str, provider_config: Dict, on_item: Optional[Callable] = None,
+                      job_id: Optional[str] = None, call_type: str = "default") -> Dict:
     """
-    Async wrapper calling the LLM Factory.
+    Calls the LLM Factory on the shared pooled client (no executor hop).
+    When streaming is enabled, on_item(key, item) fires for every complete
+    'learning_moments' / 'narrative_arc' entry as soon as it arrives.
+    Transient errors and stalled attempts are retried (services/llm_retry.py).
+    Complete results are cached by content hash, so a resumed or repeated job
+    only pays for the calls that never finished; cache hits never queue for a
+    rate-limit slot (job_id is the job the slot is queued fairly under).
+    call_type ('macro', 'micro', 'summary') keeps latency stats for hedging apart.
     """
     api_key = provider_config.get("api_key") or os.getenv("SUPER_MIND_API_KEY")
     base_url = provider_config.get("base_url") or os.getenv("BASE_URL")
@@ -89,53 +170,108 @@ async def call_ai_api(messages: List[Dict], model_id: str, provider_config: Dict
     if not api_key:
         return {"error": "API Key missing. Please check settings."}
 
-    def sync_call():
-        try:
-            provider = get_llm_provider(provider_type, api_key, base_url)
-            result = provider.generate(messages, model=model_id)
-            
-            # Common parsing logic (OpenAI format is returned by all adapters)
-            message = result['choices'][0]['message']
-            content = message.get('content') or ""
-            
-            # Check finish reason
-            finish_reason = result['choices'][0].get('finish_reason')
-            
-            if not content and finish_reason == 'length':
-                 raise Exception("Context limit exceeded. The transcript was too long for this model.")
-                 
-            if finish_reason == 'length':
-                print("WARNING: AI Output truncated due to token limit.")
-            
-            # Parse JSON
-            clean_json = clean_json_string(content)
-            return json.loads(clean_json)
-            
-        except (json.JSONDecodeError, Exception) as e:
-            print(f"Failed to parse AI response as JSON: {e}")
-            # Log bad response for debugging
+    cache_key = _llm_cache_key(messages, model_id, provider_config)
+    cached = await get_cached_result(cache_key, on_item)
+    if cached is not None:
+        return cached
+
+    parser = None
+    finish_reason = None
+    content = ""
+    usage = None
+    try:
+        provider = get_llm_provider(provider_type, api_key, base_url)
+        limiter = get_llm_limiter(provider_config)
+        # Every request sent (retries and hedges too) is admitted and charged separately
+        slot = lambda: limiter.slot(job_id, estimate_call_tokens(messages))
+        latency_key = (provider_type, model_id, call_type)
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
             try:
-                with open("debug_llm_failure.txt", "w", encoding="utf-8") as f:
-                    f.write(f"Error: {str(e)}\n")
-                    f.write(f"Finish Reason: {result['choices'][0].get('finish_reason')}\n")
-                    f.write(f"Content Length: {len(content)}\n")
-                    f.write("-" * 20 + " CONTENT " + "-" * 20 + "\n")
-                    f.write(content)
-                    f.write("\n" + "-" * 20 + " END CONTENT " + "-" * 20 + "\n")
-            except: pass
-            
-            return {"error": "JSON Parse Error. Check debug_llm_failure.txt for raw output.", "raw": content}
-        except Exception as e:
-            print(f"AI Request Failed: {e}")
-            return {"error": str(e)}
+                if use_streaming(provider_config):
+                    # A stream is only retried while nothing has reached on_item yet
+                    emitted = []
+                    def track_item(key: str, item: Dict):
+                        emitted.append(key)
+                        if on_item: on_item(key, item)
+
+                    async def stream_attempt():
+                        nonlocal parser
+                        parser = IncrementalJSONParser()
+                        return await stream_completion(provider, messages, model_id, parser, track_item)
+
+                    content, finish_reason, usage = await resilient_caller.call(
+                        stream_attempt, latency_key, provider_config,
+                        can_retry=lambda: not emitted, hedge=False, slot=slot
+                    )
+                else:
+                    result = await resilient_caller.call(
+                        lambda: provider.generate(messages, model=model_id, max_tokens=LLM_MAX_TOKENS, temperature=LLM_TEMPERATURE),
+                        latency_key, provider_config, slot=slot
+                    )
 
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, sync_call)
+                    # Common parsing logic (OpenAI format is returned by all adapters)
+                    message = result['choices'][0]['message']
+                    content = message.get('content') or ""
+
+                    # Check finish reason
+                    finish_reason = result['choices'][0].get('finish_reason')
+                    usage = result.get('usage')
+                break
+            except RateLimitError as e:
+                if attempt == RATE_LIMIT_RETRIES:
+                    raise
+                # Hold every job on this key, not just this call, until the provider is ready.
+                # The slot is already released; the retry queues (and is charged) again.
+                limiter.pause(e.retry_after)
+        limiter.record_usage(estimate_call_tokens(messages), usage_tokens(usage))
+        record_call_usage(usage)
+        
+        if not content and finish_reason == 'length':
+             raise Exception("Context limit exceeded. The transcript was too long for this model.")
+             
+        if finish_reason == 'length':
+            print("WARNING: AI Output truncated due to token limit.")
+            # Keep every item that did arrive complete rather than failing the parse
+            if parser and parser.result():
+                return parser.result()
+        
+        # Parse JSON
+        clean_json = clean_json_string(content)
+        try:
+            parsed = json.loads(clean_json)
+        except json.JSONDecodeError:
+            if parser and parser.result():
+                return parser.result()
+            raise
+        # Only complete answers are cached; truncated or salvaged ones are retried next time
+        if cache_key and finish_reason != 'length' and isinstance(parsed, dict):
+            await asyncio.to_thread(cache_service.set_llm_result, cache_key, model_id, parsed)
+        return parsed
+        
+    except (json.JSONDecodeError, Exception) as e:
+        print(f"Failed to parse AI response as JSON: {e}")
+        # Log bad response for debugging
+        try:
+            with open("debug_llm_failure.txt", "w", encoding="utf-8") as f:
+                f.write(f"Error: {str(e)}\n")
+                f.write(f"Finish Reason: {finish_reason}\n")
+                f.write(f"Content Length: {len(content)}\n")
+                f.write("-" * 20 + " CONTENT " + "-" * 20 + "\n")
+                f.write(content)
+                f.write("\n" + "-" * 20 + " END CONTENT " + "-" * 20 + "\n")
+        except: pass
+        
+        return {"error": "JSON Parse Error. Check debug_llm_failure.txt for raw output.", "raw": content}
+    except Exception as e:
+        print(f"AI Request Failed: {e}")
+        return {"error": str(e)}
 
 async def analyze_transcript(transcript_data: Dict, model_id: str, job_id: str = None, provider_config: Dict = None):
     """
     Orchestrates the Map-Reduce analysis with Progress Tracking.
+    Token usage of all its LLM calls (including prompt-cache hits) is returned under 'usage'.
     """
+    usage_totals, usage_token = start_usage_tracking()
     try:
         provider_config = provider_config or {}
         
@@ -144,7 +280,8 @@ async def analyze_transcript(transcript_data: Dict, model_id: str, job_id: str =
             if job_id: job_manager.fail_job(job_id, "No segments found")
             return {"error": "No segments found"}
 
-        system_prompt_base = load_prompt()
+        system_prompt_base, prompt_hash = prompt_registry.get()
+        prompt_version = prompt_hash[:12]
         
         # --- Handle Output Language ---
         # Default Constraint (Match Audio)
@@ -166,39 +303,26 @@ async def analyze_transcript(transcript_data: Dict, model_id: str, job_id: str =
         else:
             # Fallback: Append if placeholder is missing in prompt.md
             system_prompt_base += f"\n\n# Language Constraint\n{constraint_text}"
-        if job_id: job_manager.update_progress(job_id, 10, "Analyzing Narrative Arc (Macro Pass)...")
-        print("Starting Macro Analysis...")
-        print("Starting Macro Analysis...")
-        full_text = "\n".join([f"[{s['time']}] {s.get('speaker', 'Speaker')}: {s['text']}" for s in segments])
-        
-        # Truncate to valid context limit (approx 37k tokens)
-        if len(full_text) > 150000:
-            print(f"⚠️ Truncating transcript from {len(full_text)} chars to 150,000 chars for Macro Analysis.")
-            full_text = full_text[:150000] + "\n...(truncated)"
-        
+
+        # --- Step 1: Macro Analysis (The Arc) ---
+        full_text = transcript_text(segments)
         macro_system_prompt = system_prompt_base + "\n\nTASK: Focus ONLY on generating the 'summary' and 'narrative_arc'. return empty list for 'learning_moments'. You MUST output valid JSON ONLY. No Introduction. No Conclusion. If the transcript is short or incomplete, analyze what you have. DO NOT REFUSE. DO NOT ASK FOR MORE CONTEXT."
-        
-        macro_messages = [
-            {"role": "system", "content": macro_system_prompt},
-            {"role": "user", "content": f"Analyze the following full transcript to find the Narrative Arc:\n\n{full_text}"}
-        ]
-        
-        # Run Macro Analysis
-        macro_result = await call_ai_api(macro_messages, model_id, provider_config)
-        
-        if "error" in macro_result:
-            # If job_id exists, fail it
-            if job_id:
-                 job_manager.fail_job(job_id, f"Macro analysis failed: {macro_result['error']}")
-            return macro_result
+
+        # Transcripts that do not fit the model are condensed hierarchically instead of truncated
+        macro_budget = macro_input_budget(model_id, provider_config, macro_system_prompt)
+        condense_macro = count_tokens(full_text) > macro_budget
+        if condense_macro:
+            print(f"Transcript exceeds the macro budget ({macro_budget} tokens); condensing section summaries for the Narrative Arc.")
 
         # --- Step 2: Micro Analysis (The Moments) ---
-        # --- Step 2: Micro Analysis (The Moments) ---
-        if job_id: job_manager.update_progress(job_id, 30, "Chunking Transcript...")
-        print("Starting Micro Analysis (Chunking)...")
-        # Reduce chunk size to 5 mins (300s) to prevent context overflow
-        chunks = chunk_transcript(segments, chunk_duration_sec=300, overlap_sec=60)
-        all_learning_moments = []
+        if job_id: job_manager.update_progress(job_id, 25, "Chunking Transcript...")
+        # Chunks are sized in tokens for this model, so dense dialogue is never truncated
+        chunk_tokens = chunk_token_budget(model_id, provider_config)
+        try:
+            overlap_tokens = int(provider_config.get("chunk_overlap_tokens") or CHUNK_OVERLAP_TOKENS)
+        except (TypeError, ValueError):
+            overlap_tokens = CHUNK_OVERLAP_TOKENS
+        chunks = chunk_segments_by_tokens(segments, chunk_tokens, overlap_tokens)
         
         micro_system_prompt = system_prompt_base + """
 
@@ -221,44 +345,109 @@ You MUST output valid JSON ONLY. No Introduction. No Conclusion. DO NOT REFUSE.
 """
         
         total_chunks = len(chunks)
+        # Macro pass + one call per chunk; all share the provider's concurrency limit.
+        total_calls = total_chunks + 1
+        completed_calls = 0
         print(f"Total chunks to analyze: {total_chunks}")
-        
-        for i, chunk in enumerate(chunks):
+
+        def on_item(key: str, item: Dict):
+            # Streamed items show up in the job's partial result straight away
+            if job_id: job_manager.add_partial_item(job_id, key, item)
+
+        def report_call_done(label: str):
+            nonlocal completed_calls
+            completed_calls += 1
+            pct = 25 + int((completed_calls / total_calls) * 65) # 25% to 90% (0-20% is transcription)
+            if job_id: job_manager.update_progress(job_id, pct, f"Analyzed {label} ({completed_calls}/{total_calls} calls done)...")
+
+        def report_summary_done(label: str):
+            # Summary calls are only known once condensing starts
+            nonlocal total_calls
+            total_calls += 1
+            report_call_done(label)
+
+        async def call_llm(messages: List[Dict], label: str, call_type: str, item_callback: Optional[Callable] = None) -> Dict:
+            print(f"{label}...")
+            return await call_ai_api(messages, model_id, provider_config, on_item=item_callback, job_id=job_id, call_type=call_type)
+
+        async def summarize_call(messages: List[Dict]) -> Dict:
+            return await call_llm(messages, "Summarizing section", "summary")
+
+        async def run_macro():
+            macro_request = f"Analyze the following full transcript to find the Narrative Arc:\n\n{full_text}"
+            if condense_macro:
+                summarizer = HierarchicalSummarizer(summarize_call, macro_budget, on_call_done=report_summary_done)
+                condensed = await summarizer.condense(segments)
+                macro_request = (
+                    "The transcript is too long to include in full. Below are condensed, time-labelled summaries "
+                    f"of every section of the episode, in order. Analyze them to find the Narrative Arc:\n\n{condensed}"
+                )
+            macro_messages = [
+                {"role": "system", "content": macro_system_prompt},
+                {"role": "user", "content": macro_request}
+            ]
+            result = await call_llm(macro_messages, "Starting Macro Analysis", "macro", on_item)
+            report_call_done("Narrative Arc")
+            return result
+
+        async def run_micro(i: int, chunk: Dict) -> List[Dict]:
             current_chunk_num = i + 1
-            pct = 30 + int((current_chunk_num / total_chunks) * 60) # 30% to 90%
-            if job_id: job_manager.update_progress(job_id, pct, f"Analyzing Chunk {current_chunk_num}/{total_chunks}...")
-            
-            print(f"Analyzing Chunk {current_chunk_num}/{total_chunks}...")
-            
             chunk_text = chunk['text']
-            if len(chunk_text) > 30000:
-                print(f"⚠️ Truncating Chunk {current_chunk_num} from {len(chunk_text)} chars to 30,000.")
-                chunk_text = chunk_text[:30000] + "\n...(truncated)"
 
             micro_messages = [
                 {"role": "system", "content": micro_system_prompt},
                 {"role": "user", "content": f"Analyze this segment ({chunk['start']}s to {chunk['end']}s) for learning moments:\n\n{chunk_text}"}
             ]
             
-            micro_result = await call_ai_api(micro_messages, model_id, provider_config)
+            micro_result = await call_llm(micro_messages, f"Analyzing Chunk {current_chunk_num}/{total_chunks}", "micro", on_item)
 
             # Debug Log for Micro Analysis
             try:
                 with open("debug_micro_response.txt", "a", encoding="utf-8") as f:
-                     f.write(f"\n--- Chunk {i+1} ---\n{json.dumps(micro_result, ensure_ascii=False, indent=2)}\n")
+                     f.write(f"\n--- Chunk {current_chunk_num} ---\n{json.dumps(micro_result, ensure_ascii=False, indent=2)}\n")
             except: pass
-            
+
+            report_call_done(f"Chunk {current_chunk_num}/{total_chunks}")
             moments = micro_result.get('learning_moments', [])
-            if isinstance(moments, list):
-                all_learning_moments.extend(moments)
+            return moments if isinstance(moments, list) else []
+
+        if job_id: job_manager.update_progress(job_id, 25, f"Analyzing Narrative Arc and {total_chunks} chunks...")
+        # Macro and micro passes are independent, so schedule them all at once.
+        macro_task = asyncio.create_task(run_macro())
+        micro_tasks = [asyncio.create_task(run_micro(i, chunk)) for i, chunk in enumerate(chunks)]
+
+        try:
+            macro_result = await macro_task
+        except BaseException:
+            for t in micro_tasks: t.cancel()
+            raise
+
+        if "error" in macro_result:
+            # No point finishing the chunks if the job is going to fail anyway
+            for t in micro_tasks: t.cancel()
+            await asyncio.gather(*micro_tasks, return_exceptions=True)
+            # If job_id exists, fail it
+            if job_id:
+                 job_manager.fail_job(job_id, f"Macro analysis failed: {macro_result['error']}")
+            return macro_result
+
+        # gather() preserves task order, so moments stay in timeline order
+        chunk_moments = await asyncio.gather(*micro_tasks)
+        all_learning_moments = [m for moments in chunk_moments for m in moments]
 
         # --- Step 3: Merge & Deduplicate ---
         if job_id: job_manager.update_progress(job_id, 95, "Finalizing Results...")
         final_result = {
             "summary": macro_result.get("summary", "Analysis failed to generate summary."),
             "narrative_arc": macro_result.get("narrative_arc", []),
-            "learning_moments": deduplicate_moments(all_learning_moments)
+            "learning_moments": deduplicate_moments(all_learning_moments),
+            "prompt_version": prompt_version,
+            "usage": usage_totals.as_dict()
         }
+        usage = final_result["usage"]
+        print(f"LLM usage: {usage['calls']} calls ({usage['result_cache_hits']} from result cache), "
+              f"{usage['input_tokens']} input tokens of which {usage['cached_tokens']} prompt-cached ({usage['cached_share']:.0%}), "
+              f"{usage['output_tokens']} output tokens")
         
         if job_id: job_manager.complete_job(job_id, final_result)
         return final_result
@@ -268,14 +457,8 @@ You MUST output valid JSON ONLY. No Introduction. No Conclusion. DO NOT REFUSE.
         traceback.print_exc()
         if job_id: job_manager.fail_job(job_id, f"Internal Analysis Error: {str(e)}")
         return {"error": str(e)}
-
-def deduplicate_moments(moments: List[Dict]) -> List[Dict]:
-    """
-    Simple deduplication based on timestamps/content. 
-    (MVP: Just pass through for now, or basic exact match check)
-    """
-    # TODO: Implement fuzzy matching as per PRD
-    return moments
+    finally:
+        stop_usage_tracking(usage_token)
 
 def clean_json_string(s):
     """
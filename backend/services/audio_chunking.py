@@ -0,0 +1,150 @@
+import bisect
+import re
+from typing import Dict, List, Optional, Tuple
+
+SILENCE_START_RE = re.compile(r"silence_start:\s*(-?[\d.]+)")
+SILENCE_END_RE = re.compile(r"silence_end:\s*(-?[\d.]+)")
+DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d{2}):(\d{2}(?:\.\d+)?)")
+
+def parse_silencedetect(stderr: str) -> Tuple[List[Tuple[float, float]], Optional[float]]:
+    """
+    Parses ffmpeg `-af silencedetect` output.
+    Returns ([(silence_start, silence_end)], media_duration or None).
+    """
+    silences = []
+    pending_start = None
+    for line in stderr.splitlines():
+        m = SILENCE_START_RE.search(line)
+        if m:
+            pending_start = max(0.0, float(m.group(1)))
+            continue
+        m = SILENCE_END_RE.search(line)
+        if m and pending_start is not None:
+            silences.append((pending_start, float(m.group(1))))
+            pending_start = None
+
+    duration = None
+    m = DURATION_RE.search(stderr)
+    if m:
+        duration = int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3))
+    if pending_start is not None and duration:
+        silences.append((pending_start, duration)) # Trailing silence runs to the end
+    return silences, duration
+
+class ChunkPlanner:
+    """
+    Plans [(start, end)] chunks of roughly target_sec, cutting in the middle of
+    the silence nearest the target point. If no silence falls within
+    search_window_sec of the target, cut hard at the target and let the next
+    chunk start overlap_sec early so the cut word is heard whole by one side.
+
+    Works incrementally: feed silences and the decoded position as audio
+    streams in, and advance() returns each chunk once no later silence can
+    change its cut.
+    """
+    def __init__(self, target_sec: float, search_window_sec: Optional[float] = None, overlap_sec: float = 0.0):
+        self.target_sec = target_sec
+        self.search_window_sec = target_sec * 0.25 if search_window_sec is None else search_window_sec
+        self.overlap_sec = overlap_sec
+        self.midpoints: List[float] = []
+        self.start = 0.0
+        self._j = 0
+
+    def add_silence(self, start: float, end: float):
+        bisect.insort(self.midpoints, (start + end) / 2) # ffmpeg reports in order, so this is an append
+
+    def advance(self, position: float) -> List[Tuple[float, float]]:
+        """Returns chunks whose cut is final now that audio up to `position` has been analysed."""
+        chunks = []
+        while position >= self.start + self.target_sec + self.search_window_sec:
+            chunks.append(self._next_chunk())
+        return chunks
+
+    def finish(self, duration: float) -> List[Tuple[float, float]]:
+        """Returns the remaining chunks once the total duration is known."""
+        if duration <= 0:
+            return []
+        chunks = []
+        while duration - self.start > self.target_sec + self.search_window_sec:
+            chunks.append(self._next_chunk())
+        chunks.append((self.start, duration))
+        self.start = duration
+        return chunks
+
+    def _next_chunk(self) -> Tuple[float, float]:
+        start = self.start
+        target = start + self.target_sec
+        window = self.search_window_sec
+        midpoints = self.midpoints
+        # Advance past silences too early for this chunk (linear overall)
+        while self._j < len(midpoints) and midpoints[self._j] < target - window:
+            self._j += 1
+        best = None
+        k = self._j
+        while k < len(midpoints) and midpoints[k] <= target + window:
+            if best is None or abs(midpoints[k] - target) < abs(best - target):
+                best = midpoints[k]
+            k += 1
+
+        if best is not None and best > start:
+            self.start = best
+            return (start, best)
+        self.start = max(start + 1.0, target - self.overlap_sec)
+        return (start, target)
+
+def plan_chunks(duration: float, silences: List[Tuple[float, float]], target_sec: float,
+                search_window_sec: Optional[float] = None, overlap_sec: float = 0.0) -> List[Tuple[float, float]]:
+    """Plans all chunks of a fully analysed file. See ChunkPlanner."""
+    planner = ChunkPlanner(target_sec, search_window_sec, overlap_sec)
+    for start, end in sorted(silences):
+        planner.add_silence(start, end)
+    return planner.finish(duration)
+
+def _normalise(text: str) -> List[str]:
+    return re.sub(r"[^\w\s]", "", text.lower()).split()
+
+def _is_same_utterance(a: str, b: str) -> bool:
+    """True when two segment texts are (near) duplicates, e.g. the same words heard by two chunks."""
+    ta, tb = _normalise(a), _normalise(b)
+    if not ta or not tb:
+        return False
+    if " ".join(ta) in " ".join(tb) or " ".join(tb) in " ".join(ta):
+        return True
+    sa, sb = set(ta), set(tb)
+    return len(sa & sb) / len(sa | sb) >= 0.6
+
+def stitch_chunks(chunk_segments: List[List[Dict]], chunks: List[Tuple[float, float]], tolerance_sec: float = 2.0) -> List[Dict]:
+    """
+    Concatenates per-chunk segments (already shifted to absolute time).
+    Where chunk i+1 starts before chunk i ends (an overlap), chunk i keeps what
+    starts before the middle of the overlap and chunk i+1 what starts near or
+    after it. A boundary utterance heard by both sides (matched by start time
+    and text) is kept once, preferring the longer, i.e. uncut, version.
+    """
+    merged: List[Dict] = []
+    for i, segments in enumerate(chunk_segments):
+        seg_from = None
+        seg_to = None
+        if i > 0 and chunks[i][0] < chunks[i - 1][1]:
+            seg_from = (chunks[i][0] + chunks[i - 1][1]) / 2 - tolerance_sec
+        if i + 1 < len(chunks) and chunks[i + 1][0] < chunks[i][1]:
+            seg_to = (chunks[i + 1][0] + chunks[i][1]) / 2
+
+        boundary = len(merged)
+        for s in segments:
+            if seg_from is not None and s["start_seconds"] < seg_from:
+                continue
+            if seg_to is not None and s["start_seconds"] >= seg_to:
+                continue
+            if seg_from is not None and s["start_seconds"] < seg_from + 2 * tolerance_sec:
+                duplicate = next((
+                    j for j in range(max(0, boundary - 3), boundary)
+                    if abs(s["start_seconds"] - merged[j]["start_seconds"]) <= tolerance_sec
+                    and _is_same_utterance(s["text"], merged[j]["text"])
+                ), None)
+                if duplicate is not None:
+                    if len(s["text"]) > len(merged[duplicate]["text"]):
+                        merged[duplicate] = s
+                    continue
+            merged.append(s)
+    return merged
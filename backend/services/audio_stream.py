@@ -0,0 +1,162 @@
+import os
+import subprocess
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import yt_dlp
+
+from services.audio_chunking import DURATION_RE, SILENCE_START_RE, SILENCE_END_RE, ChunkPlanner
+
+# 16 kHz mono Opus is all speech models need: ~11 MB per hour instead of ~28 MB (64k mp3)
+# or the several hundred MB of the original download.
+SPEECH_CODEC_ARGS = ["-vn", "-ac", "1", "-ar", "16000", "-c:a", "libopus", "-b:a", "24k", "-application", "voip"]
+SPEECH_FORMAT = "ogg"
+# Set AUDIO_STREAMING=false to always download the full file first (the old behaviour)
+STREAMING_ENABLED = os.getenv("AUDIO_STREAMING", "true").lower() == "true"
+PIPE_READ_SIZE = 64 * 1024
+
+def resolve_media_stream(url: str) -> Tuple[Dict, str, Dict[str, str]]:
+    """
+    Asks yt-dlp for the direct URL of the best audio stream without downloading it.
+    Returns (info, media_url, http_headers).
+    """
+    ydl_opts = {
+        'format': 'bestaudio/best',
+        'quiet': True,
+        'no_warnings': True
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+    media_url = info.get('url')
+    if not media_url:
+        raise Exception("No direct media stream available for this URL.")
+    return info, media_url, info.get('http_headers') or {}
+
+def ffmpeg_input_args(media_url: str, headers: Dict[str, str]) -> List[str]:
+    args = []
+    if media_url.startswith("http"):
+        # Long episodes outlive a single HTTP connection; let ffmpeg resume the stream
+        args += ["-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_delay_max", "5"]
+        if headers:
+            args += ["-headers", "".join(f"{k}: {v}\r\n" for k, v in headers.items())]
+    return args + ["-i", media_url]
+
+def _drain(stream, sink: List[str]):
+    for line in iter(stream.readline, b""):
+        sink.append(line.decode("utf-8", errors="replace"))
+        del sink[:-20] # Keep only the tail for error messages
+
+def iter_speech_audio(media_url: str, headers: Dict[str, str]) -> Iterator[bytes]:
+    """
+    Transcodes the remote stream to speech Opus and yields it as it is produced,
+    so an upload can start before the source has finished downloading.
+    """
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", *ffmpeg_input_args(media_url, headers),
+           *SPEECH_CODEC_ARGS, "-f", SPEECH_FORMAT, "pipe:1"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    errors: List[str] = []
+    drain = threading.Thread(target=_drain, args=(proc.stderr, errors), daemon=True)
+    drain.start()
+    try:
+        while True:
+            block = proc.stdout.read(PIPE_READ_SIZE)
+            if not block:
+                break
+            yield block
+        if proc.wait() != 0:
+            drain.join(timeout=1)
+            raise Exception(f"ffmpeg transcoding failed: {''.join(errors).strip()}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+def transcode_to_file(media_url: str, headers: Dict[str, str], out_path: str, on_progress: Optional[Callable[[], None]] = None):
+    """
+    Transcodes the remote stream straight to a speech Opus file (no intermediate download).
+    on_progress() is called as output is written; an exception from it stops ffmpeg.
+    """
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostats", "-progress", "pipe:2", "-y",
+           *ffmpeg_input_args(media_url, headers), *SPEECH_CODEC_ARGS, "-f", SPEECH_FORMAT, out_path]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    errors: List[str] = []
+    try:
+        for raw in iter(proc.stderr.readline, b""):
+            line = raw.decode("utf-8", errors="replace").strip()
+            if line.startswith("out_time_us="):
+                if on_progress: on_progress()
+            elif "=" not in line: # Everything but -progress key=value pairs is an error message
+                errors.append(line)
+                del errors[:-20]
+        if proc.wait() != 0:
+            raise Exception(f"ffmpeg transcoding failed: {' '.join(errors)[-2000:]}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+def probe_duration(path: str) -> Optional[float]:
+    """Duration of a local media file in seconds, from ffmpeg's input summary; None if unknown."""
+    proc = subprocess.run(["ffmpeg", "-hide_banner", "-i", path], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    m = DURATION_RE.search(proc.stderr.decode("utf-8", errors="replace"))
+    if not m:
+        return None
+    return int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3))
+
+def transcode_and_plan(media_url: str, headers: Dict[str, str], out_path: str, planner: ChunkPlanner,
+                       silence_filter: str, on_progress: Optional[Callable[[], None]] = None) -> Iterator[Tuple[float, float]]:
+    """
+    Transcodes to a speech Opus file while running silencedetect in the same
+    decode pass, and yields each planned (start, end) chunk as soon as the
+    audio it covers has been written. Callers can cut and transcribe early
+    chunks while the rest of the episode is still streaming in.
+    If ffmpeg reported no progress, the remaining plan uses the finished
+    file's duration; raises if no chunk could be planned at all.
+    on_progress() is called as output is written; an exception from it stops ffmpeg.
+    """
+    cmd = ["ffmpeg", "-hide_banner", "-nostats", "-progress", "pipe:2", "-y", *ffmpeg_input_args(media_url, headers),
+           "-af", silence_filter, *SPEECH_CODEC_ARGS, "-f", SPEECH_FORMAT, out_path]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    position = 0.0
+    pending_start = None
+    planned = 0
+    tail: List[str] = []
+    try:
+        for raw in iter(proc.stderr.readline, b""):
+            line = raw.decode("utf-8", errors="replace").strip()
+            tail.append(line)
+            del tail[:-20]
+            if line.startswith("out_time_us="):
+                try:
+                    position = int(line.split("=", 1)[1]) / 1_000_000
+                except ValueError:
+                    continue
+                if on_progress: on_progress()
+                # Ogg pages are flushed a little behind the encoder; keep a margin
+                for chunk in planner.advance(position - 2.0):
+                    planned += 1
+                    yield chunk
+                continue
+            m = SILENCE_START_RE.search(line)
+            if m:
+                pending_start = max(0.0, float(m.group(1)))
+                continue
+            m = SILENCE_END_RE.search(line)
+            if m and pending_start is not None:
+                planner.add_silence(pending_start, float(m.group(1)))
+                pending_start = None
+
+        if proc.wait() != 0:
+            raise Exception(f"ffmpeg transcoding failed: {' '.join(tail)}")
+        if position <= 0:
+            # Some builds/inputs never emit out_time_us; fall back to the written file
+            position = probe_duration(out_path) or 0.0
+        for chunk in planner.finish(position):
+            planned += 1
+            yield chunk
+        if not planned:
+            raise Exception("Could not determine the length of the transcoded audio; nothing to transcribe.")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
@@ -2,37 +2,298 @@ import sqlite3
 import json
 import hashlib
 import os
-from typing import Optional, Dict, Any
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Tuple
+from services.prompts import prompt_registry
+
+try:
+    import zstandard
+except ImportError: # Optional: falls back to zlib
+    zstandard = None
 
 DB_PATH = "cache.db"
-PROMPT_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "prompt.md")
+
+# Payload blobs start with a format byte so the codec can change without a migration.
+FORMAT_ZLIB_JSON = 1
+FORMAT_ZSTD_JSON = 2
+
+def pack_payload(obj: Any) -> bytes:
+    """JSON-encodes and compresses obj (zstd if installed, else zlib)."""
+    raw = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+    if zstandard is not None:
+        return bytes([FORMAT_ZSTD_JSON]) + zstandard.ZstdCompressor(level=6).compress(raw)
+    return bytes([FORMAT_ZLIB_JSON]) + zlib.compress(raw, 6)
+
+def unpack_payload(blob: bytes) -> Any:
+    fmt, body = blob[0], blob[1:]
+    if fmt == FORMAT_ZLIB_JSON:
+        raw = zlib.decompress(body)
+    elif fmt == FORMAT_ZSTD_JSON:
+        if zstandard is None:
+            raise RuntimeError("Cache entry is zstd-compressed but the 'zstandard' package is not installed.")
+        raw = zstandard.ZstdDecompressor().decompress(body)
+    else:
+        raise ValueError(f"Unknown cache payload format {fmt}")
+    return json.loads(raw)
+
+# Denormalised columns read by the history listing, filled at write time.
+HISTORY_COLUMNS = (
+    ("title", "TEXT"),
+    ("url", "TEXT"),
+    ("video_id", "TEXT"),
+    ("duration", "REAL"),
+    ("prompt_version", "TEXT"),
+    ("size", "INTEGER"),
+)
+
+# Transcript cache eviction: least-recently-used entries go first once the
+# store exceeds its size budget; entries unused for the TTL are dropped outright.
+TRANSCRIPT_CACHE_MAX_MB = float(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "500"))
+TRANSCRIPT_CACHE_TTL_DAYS = float(os.getenv("TRANSCRIPT_CACHE_TTL_DAYS", "30"))
+
+# Per-call LLM result cache (content-addressed), same LRU + TTL policy as transcripts.
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "200"))
+LLM_CACHE_TTL_DAYS = float(os.getenv("LLM_CACHE_TTL_DAYS", "30"))
+
+# LRU bookkeeping is batched so cache hits stay read-only: hits queue a
+# last_used_at bump that is written with the next insert, or at most every
+# LRU_TOUCH_FLUSH_SEC. Eviction only runs once a table's tracked size crosses
+# its budget, or every CACHE_EVICT_EVERY inserts to apply the TTL.
+LRU_TOUCH_FLUSH_SEC = float(os.getenv("CACHE_LRU_TOUCH_FLUSH_SEC", "30"))
+CACHE_EVICT_EVERY = int(os.getenv("CACHE_EVICT_EVERY", "100"))
+
+def llm_call_key(messages: list, model: str, provider: str, base_url: Optional[str], temperature: float, max_tokens: int) -> str:
+    """Content hash of everything that determines an LLM call's output."""
+    request = {
+        "messages": messages, "model": model, "provider": (provider or "openai").lower(),
+        "base_url": (base_url or "").rstrip("/"), "temperature": temperature, "max_tokens": max_tokens,
+    }
+    return hashlib.sha256(json.dumps(request, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+# Connection tuning. WAL lets history reads proceed while a job writes its result.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",       # Safe with WAL; fsync only at checkpoints
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",        # 64 MB page cache per connection
+    "PRAGMA mmap_size=268435456",      # 256 MB memory-mapped reads
+)
 
 class CacheService:
     def __init__(self, db_path: str = DB_PATH):
-        self.db_path = db_path
+        # Absolute, so connections opened later on other threads find the same file
+        self.db_path = os.path.abspath(db_path)
+        # One long-lived connection per thread (FastAPI runs sync routes on a thread pool).
+        # sqlite3 keeps a per-connection cache of prepared statements, so reusing
+        # connections also means queries are only compiled once.
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        # LRU caches (transcript_cache, llm_call_cache): pending last_used_at per table/key,
+        # and tracked payload bytes / inserts since the last eviction (guarded by _write_lock)
+        self._touch_lock = threading.Lock()
+        self._pending_touches: Dict[str, Dict[str, float]] = {}
+        self._last_touch_flush = time.monotonic()
+        self._table_bytes: Dict[str, int] = {}
+        self._inserts_since_evict: Dict[str, int] = {}
         self._init_db()
 
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, isolation_level=None, cached_statements=256, check_same_thread=False)
+            for pragma in SQLITE_PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _write(self):
+        """Runs a batch of statements as one transaction (one fsync, one lock acquisition)."""
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        """Closes every pooled connection (called on app shutdown)."""
+        try:
+            if self._pending_touches:
+                with self._write() as conn:
+                    self._flush_touches(conn)
+        except Exception as e:
+            print(f"Failed to save cache usage times: {e}")
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._connections = []
+        self._local = threading.local()
+
     def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS analysis_cache (
+        with self._write() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    key TEXT PRIMARY KEY,
+                    data TEXT,
+                    model TEXT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+        self._migrate()
+
+    def _migrate(self):
+        """Applies schema migrations in order, tracked with PRAGMA user_version."""
+        migrations = [self._migrate_history_index, self._migrate_split_payloads, self._migrate_transcript_cache,
+                      self._migrate_summary_cache, self._migrate_llm_call_cache, self._migrate_drop_summary_cache]
+        version = self._conn().execute("PRAGMA user_version").fetchone()[0]
+        for target, migration in enumerate(migrations, start=1):
+            if version < target:
+                print(f"Migrating cache DB to schema v{target}...")
+                with self._write() as conn:
+                    migration(conn)
+                    conn.execute(f"PRAGMA user_version = {target}")
+
+    def _migrate_history_index(self, conn: sqlite3.Connection):
+        """v1: denormalised history columns so /history never parses the data blobs."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(analysis_cache)")}
+        for column, column_type in HISTORY_COLUMNS:
+            if column not in columns:
+                conn.execute(f"ALTER TABLE analysis_cache ADD COLUMN {column} {column_type}")
+        # rowid (insertion order) breaks ties between rows saved in the same second
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_history ON analysis_cache (timestamp)")
+
+        # One-time backfill: parse each existing blob once, in batches
+        cursor = conn.execute("SELECT key, data FROM analysis_cache")
+        while True:
+            batch = cursor.fetchmany(100)
+            if not batch:
+                break
+            updates = []
+            for key, data_str in batch:
+                try:
+                    data = json.loads(data_str)
+                except Exception:
+                    data = {}
+                row = self._history_fields(data, len(data_str or ""))
+                updates.append((*row, key))
+            assignments = ", ".join(f"{column} = ?" for column, _ in HISTORY_COLUMNS)
+            conn.executemany(f"UPDATE analysis_cache SET {assignments} WHERE key = ?", updates)
+
+    def _migrate_split_payloads(self, conn: sqlite3.Connection):
+        """v2: move each data blob into compressed analysis/transcript payload tables."""
+        self._create_payload_tables(conn)
+        cursor = conn.execute("SELECT key, data FROM analysis_cache WHERE data IS NOT NULL")
+        while True:
+            batch = cursor.fetchmany(50)
+            if not batch:
+                break
+            analysis_rows, transcript_rows, sizes = [], [], []
+            for key, data_str in batch:
+                try:
+                    data = json.loads(data_str)
+                except Exception:
+                    continue
+                analysis_blob, transcript_blob = self._split_payload(data)
+                analysis_rows.append((key, analysis_blob))
+                if transcript_blob is not None:
+                    transcript_rows.append((key, transcript_blob))
+                sizes.append((len(analysis_blob) + len(transcript_blob or b""), key))
+            conn.executemany("INSERT OR REPLACE INTO analysis_payloads (key, data) VALUES (?, ?)", analysis_rows)
+            conn.executemany("INSERT OR REPLACE INTO transcript_payloads (key, data) VALUES (?, ?)", transcript_rows)
+            conn.executemany("UPDATE analysis_cache SET size = ? WHERE key = ?", sizes)
+        conn.execute("UPDATE analysis_cache SET data = NULL")
+
+    def _migrate_transcript_cache(self, conn: sqlite3.Connection):
+        """v3: transcripts keyed by media identity, independent of the analysis cache."""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS transcript_cache (
+                key TEXT PRIMARY KEY,
+                video_id TEXT,
+                provider TEXT,
+                language TEXT,
+                data BLOB,
+                size INTEGER,
+                created_at REAL,
+                last_used_at REAL
+            )
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_transcript_cache_last_used ON transcript_cache (last_used_at)")
+
+    def _migrate_summary_cache(self, conn: sqlite3.Connection):
+        """v4: formerly a separate chunk summary table; summaries now live in llm_call_cache (see v6)."""
+
+    def _migrate_llm_call_cache(self, conn: sqlite3.Connection):
+        """v5: individual LLM call results, so resumed/repeated jobs only pay for unfinished calls."""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS llm_call_cache (
                 key TEXT PRIMARY KEY,
-                data TEXT,
                 model TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                data BLOB,
+                size INTEGER,
+                created_at REAL,
+                last_used_at REAL
             )
         ''')
-        conn.commit()
-        conn.close()
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_call_cache_last_used ON llm_call_cache (last_used_at)")
+
+    def _migrate_drop_summary_cache(self, conn: sqlite3.Connection):
+        """v6: drops the v4 summary_cache table; summary calls are cached like any other LLM call."""
+        conn.execute("DROP TABLE IF EXISTS summary_cache")
+
+    @staticmethod
+    def _create_payload_tables(conn: sqlite3.Connection):
+        # Separate tables keep history rows small and let the transcript load lazily
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS analysis_payloads (
+                key TEXT PRIMARY KEY,
+                data BLOB
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS transcript_payloads (
+                key TEXT PRIMARY KEY,
+                data BLOB
+            )
+        ''')
+
+    @staticmethod
+    def _split_payload(data: Dict[str, Any]) -> Tuple[bytes, Optional[bytes]]:
+        """Packs everything but the transcript, and the transcript, as separate blobs."""
+        transcript = data.get("transcript") if isinstance(data, dict) else None
+        rest = {k: v for k, v in data.items() if k != "transcript"} if isinstance(data, dict) else data
+        return pack_payload(rest), (pack_payload(transcript) if transcript is not None else None)
+
+    @staticmethod
+    def _history_fields(data: Dict[str, Any], size: int) -> tuple:
+        """Values for HISTORY_COLUMNS, in order, extracted from a cached result."""
+        meta = data.get("meta", {}) if isinstance(data, dict) else {}
+        return (
+            meta.get("title"),
+            meta.get("url"),
+            meta.get("video_id"),
+            meta.get("duration"),
+            meta.get("prompt_version"),
+            size
+        )
 
     def _get_prompt_hash(self) -> str:
-        """Reads prompt.md and returns its hash."""
-        try:
-            with open(PROMPT_FILE_PATH, "r", encoding="utf-8") as f:
-                return hashlib.md5(f.read().encode()).hexdigest()
-        except Exception:
-            return "default_prompt"
+        """Hash of the current prompt.md (memoized by the prompt registry)."""
+        return prompt_registry.prompt_hash
 
     def _generate_key(self, input_data: str, model: str) -> str:
         """Generates a unique hash for the input (URL or Text), model, and PROMPT content."""
@@ -40,104 +301,248 @@ class CacheService:
         content = f"{input_data}::{model}::{prompt_hash}"
         return hashlib.sha256(content.encode()).hexdigest()
 
-    def get(self, input_data: str, model: str) -> Optional[Dict[str, Any]]:
+    def history_key(self, input_data: str, model: str) -> str:
+        """The /history/{key} key a result for this input and model is saved under."""
+        return self._generate_key(input_data, model)
+
+    def get(self, input_data: str, model: str, include_transcript: bool = True) -> Optional[Dict[str, Any]]:
         key = self._generate_key(input_data, model)
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("SELECT data FROM analysis_cache WHERE key = ?", (key,))
-        row = c.fetchone()
-        conn.close()
+        data = self.get_analysis_by_key(key, include_transcript=include_transcript)
         
-        if row:
+        if data is not None:
             print(f"Cache HIT for {key[:8]}...")
-            try:
-                return json.loads(row[0])
-            except:
-                return None
+            return data
         print(f"Cache MISS for {key[:8]}...")
         return None
 
     def set(self, input_data: str, model: str, data: Dict[str, Any]):
+        """Saves a result (history row and both payloads) in a single transaction."""
         key = self._generate_key(input_data, model)
-        json_data = json.dumps(data)
-        
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("""
-            INSERT OR REPLACE INTO analysis_cache (key, data, model) 
-            VALUES (?, ?, ?)
-        """, (key, json_data, model))
-        conn.commit()
-        conn.close()
+        # Encode and compress outside the write lock so other writers aren't held up
+        analysis_blob, transcript_blob = self._split_payload(data)
+        size = len(analysis_blob) + len(transcript_blob or b"")
+        with self._write() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO analysis_cache (key, model, title, url, video_id, duration, prompt_version, size) 
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (key, model, *self._history_fields(data, size)))
+            conn.execute("INSERT OR REPLACE INTO analysis_payloads (key, data) VALUES (?, ?)", (key, analysis_blob))
+            conn.execute("DELETE FROM transcript_payloads WHERE key = ?", (key,))
+            if transcript_blob is not None:
+                conn.execute("INSERT INTO transcript_payloads (key, data) VALUES (?, ?)", (key, transcript_blob))
         print(f"Cache SAVED for {key[:8]}...")
 
-    def get_history_list(self) -> list:
-        """Retrieves listing of all cached analysis."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("SELECT key, data, model, timestamp FROM analysis_cache ORDER BY timestamp DESC")
-        rows = c.fetchall()
+    def get_history_list(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> Tuple[list, Optional[str]]:
+        """
+        Retrieves listing of cached analyses, newest first, from the indexed
+        history columns (the data blobs are never read).
+        Keyset pagination: pass the returned next_cursor to get the next page.
+        Returns (history, next_cursor).
+        """
+        sql = "SELECT rowid, key, title, url, video_id, duration, model, prompt_version, size, timestamp FROM analysis_cache"
+        params: list = []
+        if cursor:
+            try:
+                cursor_ts, cursor_rowid = cursor.rsplit("|", 1)
+                cursor_rowid = int(cursor_rowid)
+            except ValueError:
+                raise ValueError("Invalid history cursor")
+            sql += " WHERE (timestamp < ? OR (timestamp = ? AND rowid < ?))"
+            params += [cursor_ts, cursor_ts, cursor_rowid]
+        sql += " ORDER BY timestamp DESC, rowid DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        rows = self._conn().execute(sql, params).fetchall()
         
         history = []
-        for row in rows:
-            key, data_str, model, timestamp = row
-            try:
-                data = json.loads(data_str)
-                # Safely extract meta info
-                # Fallback if 'meta' key is missing (legacy cache data)
-                meta = data.get("meta", {})
-                if not meta and "narrative_arc" in data:
-                     # This is likely legacy data { summary, narrative_arc, learning_moments }
-                     # We can't recover the title easily unless we stored it elsewhere or re-fetch.
-                     # For now, show placeholder.
-                     pass
-
-                title = meta.get("title", f"Analysis from {timestamp}")
-                url = meta.get("url", "No URL")
-                
-                history.append({
-                    "key": key,
-                    "title": title,
-                    "url": url,
-                    "model": model,
-                    "timestamp": timestamp
-                })
-            except:
-                continue
-                
-        conn.close()
-        return history
-
-    def get_analysis_by_key(self, key: str) -> Optional[Dict[str, Any]]:
-        """Retrieves full analysis by cache key."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("SELECT data FROM analysis_cache WHERE key = ?", (key,))
-        row = c.fetchone()
-        conn.close()
+        for rowid, key, title, url, video_id, duration, model, prompt_version, size, timestamp in rows:
+            history.append({
+                "key": key,
+                # Legacy rows without 'meta' have no title, show a placeholder
+                "title": title or f"Analysis from {timestamp}",
+                "url": url or "No URL",
+                "video_id": video_id,
+                "duration": duration,
+                "model": model,
+                "prompt_version": prompt_version,
+                "size": size,
+                "timestamp": timestamp
+            })
+
+        next_cursor = None
+        if limit and len(rows) == limit:
+            next_cursor = f"{rows[-1][-1]}|{rows[-1][0]}"
+        return history, next_cursor
+
+    def get_analysis_by_key(self, key: str, include_transcript: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Retrieves full analysis by cache key.
+        With include_transcript=False the transcript blob is not read or
+        decompressed; fetch it separately with get_transcript_by_key().
+        """
+        row = self._conn().execute("SELECT data FROM analysis_payloads WHERE key = ?", (key,)).fetchone()
         
         if row:
             try:
-                return json.loads(row[0])
-            except:
-                return None
+                data = unpack_payload(row[0])
+            except Exception as e:
+                print(f"Failed to decode cache entry {key[:8]}: {e}")
                 return None
+            if include_transcript and isinstance(data, dict):
+                transcript = self.get_transcript_by_key(key)
+                if transcript is not None:
+                    data["transcript"] = transcript
+            return data
         return None
 
+    def get_transcript_by_key(self, key: str) -> Optional[list]:
+        """Retrieves only the transcript segments for a cache key."""
+        row = self._conn().execute("SELECT data FROM transcript_payloads WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None
+        try:
+            return unpack_payload(row[0])
+        except Exception as e:
+            print(f"Failed to decode transcript {key[:8]}: {e}")
+            return None
+
+    def set_pending_transcript(self, input_data: str, model: str, segments: list) -> str:
+        """
+        Saves the transcript of a running analysis under its history key, so
+        /history/{key}/transcript serves it before the result is saved.
+        Returns the key.
+        """
+        key = self._generate_key(input_data, model)
+        blob = pack_payload(segments)
+        with self._write() as conn:
+            conn.execute("INSERT OR REPLACE INTO transcript_payloads (key, data) VALUES (?, ?)", (key, blob))
+        return key
+
+    def discard_pending_transcript(self, key: str):
+        """Removes a transcript saved by set_pending_transcript() whose analysis was never saved."""
+        with self._write() as conn:
+            conn.execute(
+                "DELETE FROM transcript_payloads WHERE key = ? AND key NOT IN (SELECT key FROM analysis_cache)",
+                (key,)
+            )
+
     def delete_keys(self, keys: list):
         """Deletes specific keys from the cache."""
         if not keys:
             return
         
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        # Dynamically build query placeholder
-        placeholders = ','.join('?' for _ in keys)
-        sql = f"DELETE FROM analysis_cache WHERE key IN ({placeholders})"
-        c.execute(sql, tuple(keys))
-        conn.commit()
-        conn.close()
+        # Fixed statement + executemany keeps one prepared statement regardless of len(keys)
+        with self._write() as conn:
+            params = [(k,) for k in keys]
+            conn.executemany("DELETE FROM analysis_cache WHERE key = ?", params)
+            conn.executemany("DELETE FROM analysis_payloads WHERE key = ?", params)
+            conn.executemany("DELETE FROM transcript_payloads WHERE key = ?", params)
         print(f"Deleted {len(keys)} items from cache.")
 
+    # --- Transcript cache (keyed by media, not by model/prompt) ---
+
+    @staticmethod
+    def _transcript_key(video_id: str, provider: str, language: Optional[str]) -> str:
+        return f"{video_id}::{provider}::{language or 'auto'}"
+
+    def get_transcript(self, video_id: str, provider: str, language: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Returns a cached transcript ({video_id, title, duration, segments}) for this media, if any."""
+        key = self._transcript_key(video_id, provider, language)
+        row = self._conn().execute("SELECT data FROM transcript_cache WHERE key = ?", (key,)).fetchone()
+        if not row:
+            print(f"Transcript cache MISS for {key}")
+            return None
+        try:
+            data = unpack_payload(row[0])
+        except Exception as e:
+            print(f"Failed to decode cached transcript {key}: {e}")
+            return None
+        self._touch("transcript_cache", key)
+        print(f"Transcript cache HIT for {key}")
+        return data
+
+    def set_transcript(self, video_id: str, provider: str, language: Optional[str], transcript: Dict[str, Any]):
+        key = self._transcript_key(video_id, provider, language)
+        blob = pack_payload(transcript)
+        now = time.time()
+        with self._write() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO transcript_cache (key, video_id, provider, language, data, size, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (key, video_id, provider, language or "auto", blob, len(blob), now, now))
+            self._after_lru_insert(conn, "transcript_cache", len(blob), TRANSCRIPT_CACHE_MAX_MB, TRANSCRIPT_CACHE_TTL_DAYS, now)
+        print(f"Transcript cached for {key} ({len(blob) / 1024:.0f} KB)")
+
+    # --- LRU bookkeeping shared by transcript_cache and llm_call_cache ---
+
+    def _touch(self, table: str, key: str):
+        """Records a cache hit; the last_used_at update is written in a later batch."""
+        with self._touch_lock:
+            self._pending_touches.setdefault(table, {})[key] = time.time()
+            due = time.monotonic() - self._last_touch_flush >= LRU_TOUCH_FLUSH_SEC
+        if due:
+            with self._write() as conn:
+                self._flush_touches(conn)
+
+    def _flush_touches(self, conn: sqlite3.Connection):
+        with self._touch_lock:
+            pending, self._pending_touches = self._pending_touches, {}
+            self._last_touch_flush = time.monotonic()
+        for table, touches in pending.items():
+            conn.executemany(f"UPDATE {table} SET last_used_at = ? WHERE key = ?",
+                             [(used_at, key) for key, used_at in touches.items()])
+
+    def _after_lru_insert(self, conn: sqlite3.Connection, table: str, size: int, max_mb: float, ttl_days: float, now: float):
+        """Tracks the table's size after an insert and evicts once it is over budget (or the TTL check is due)."""
+        if table in self._table_bytes:
+            self._table_bytes[table] += size # Overcounts replaced rows; the next eviction corrects it
+        else:
+            self._table_bytes[table] = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+        inserts = self._inserts_since_evict.get(table, 0) + 1
+        max_bytes = int(max_mb * 1024 * 1024)
+        if self._table_bytes[table] <= max_bytes and inserts < CACHE_EVICT_EVERY:
+            self._inserts_since_evict[table] = inserts
+            return
+
+        self._flush_touches(conn) # So recent hits count towards recency
+        conn.execute(f"DELETE FROM {table} WHERE last_used_at < ?", (now - ttl_days * 86400,))
+        # Keep the most recently used entries that fit in the size budget
+        conn.execute(f"""
+            DELETE FROM {table} WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY last_used_at DESC, key) AS running_size
+                    FROM {table}
+                ) WHERE running_size > ?
+            )
+        """, (max_bytes,))
+        self._table_bytes[table] = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+        self._inserts_since_evict[table] = 0
+
+    # --- LLM call cache (keyed by llm_call_key) ---
+
+    def get_llm_result(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT data FROM llm_call_cache WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None
+        try:
+            data = unpack_payload(row[0])
+        except Exception as e:
+            print(f"Failed to decode cached LLM result {key[:8]}: {e}")
+            return None
+        self._touch("llm_call_cache", key)
+        return data
+
+    def set_llm_result(self, key: str, model: str, result: Dict[str, Any]):
+        blob = pack_payload(result)
+        now = time.time()
+        with self._write() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO llm_call_cache (key, model, data, size, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (key, model, blob, len(blob), now, now))
+            self._after_lru_insert(conn, "llm_call_cache", len(blob), LLM_CACHE_MAX_MB, LLM_CACHE_TTL_DAYS, now)
+
 # Singleton instance
 cache_service = CacheService()
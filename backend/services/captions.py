@@ -0,0 +1,105 @@
+import re
+from typing import Dict, List, Tuple
+
+TAG_RE = re.compile(r"<[^>]+>")
+SENTENCE_END_RE = re.compile(r"[.!?…][\"')\]]*$")
+SPEAKER_CHANGE_PREFIXES = (">>", "- ")
+
+# Segment shaping: close a segment at a sentence end once it has MIN chars,
+# at a pause of PAUSE_SEC, on a speaker change, or when it reaches MAX chars
+# (auto-captions often have no punctuation at all).
+MIN_SEGMENT_CHARS = 60
+MAX_SEGMENT_CHARS = 320
+PAUSE_SEC = 2.0
+# A cue only repeats lines of the cue before it if it starts within this long of that cue's end
+ROLLING_GAP_SEC = 0.5
+
+def clean_cue_text(text: str) -> str:
+    """Strips inline timing/styling tags and collapses whitespace."""
+    return " ".join(TAG_RE.sub("", text).replace("&nbsp;", " ").split())
+
+def _rolled_over(previous: List[str], current: List[str]) -> int:
+    """Number of leading lines of current that repeat the trailing lines of previous."""
+    for size in range(min(len(previous), len(current)), 0, -1):
+        if previous[-size:] == current[:size]:
+            return size
+    return 0
+
+def dedupe_rolling_lines(cues: List[Dict]) -> List[Tuple[float, float, str]]:
+    """
+    Flattens cues ({start, end, lines}) into unique caption lines.
+
+    YouTube auto-captions "roll": every cue repeats the previous cue's line
+    above the new one, and short bridge cues repeat a line on its own.
+    Only that overlap is dropped (leading lines of a cue that repeat the
+    trailing lines of the cue right before it), so a line someone really
+    says twice is kept. A line is emitted once, at the start of the first
+    cue showing it; a line that only extends the previous one (word-by-word
+    reveal) is merged into it. Returns [(start, end, text)].
+    """
+    lines: List[List] = []
+    previous: List[str] = []
+    previous_end = None
+    for cue in cues:
+        texts = [text for text in (clean_cue_text(raw) for raw in cue["lines"]) if text]
+        if not texts:
+            continue
+        repeated = 0
+        if previous_end is not None and cue["start"] - previous_end <= ROLLING_GAP_SEC:
+            repeated = _rolled_over(previous, texts)
+        if repeated and lines and lines[-1][2] in texts[:repeated]:
+            lines[-1][1] = max(lines[-1][1], cue["end"])
+        for text in texts[repeated:]:
+            if lines and text.startswith(lines[-1][2] + " "):
+                lines[-1][2] = text
+                lines[-1][1] = max(lines[-1][1], cue["end"])
+                continue
+            lines.append([cue["start"], cue["end"], text])
+        previous, previous_end = texts, cue["end"]
+    return [tuple(line) for line in lines]
+
+def merge_into_sentences(lines: List[Tuple[float, float, str]]) -> List[Tuple[float, str]]:
+    """Joins caption lines into sentence/paragraph sized (start, text) segments."""
+    segments: List[Tuple[float, str]] = []
+    start, end, parts, length = None, 0.0, [], 0
+
+    def flush():
+        if parts:
+            segments.append((start, " ".join(parts)))
+
+    for line_start, line_end, text in lines:
+        speaker_change = text.startswith(SPEAKER_CHANGE_PREFIXES)
+        if parts and (speaker_change or line_start - end >= PAUSE_SEC or length + len(text) > MAX_SEGMENT_CHARS):
+            flush()
+            start, parts, length = None, [], 0
+        if start is None:
+            start = line_start
+        parts.append(text)
+        length += len(text) + 1
+        end = line_end
+        if length >= MIN_SEGMENT_CHARS and SENTENCE_END_RE.search(text):
+            flush()
+            start, parts, length = None, [], 0
+    flush()
+    return segments
+
+def compact_cues(cues: List[Dict]) -> Tuple[List[Tuple[float, str]], Dict[str, int]]:
+    """
+    Removes rolling duplicates and re-segments into sentences.
+    Returns ([(start, text)], stats) with before/after segment and character counts.
+    """
+    segments = merge_into_sentences(dedupe_rolling_lines(cues))
+    stats = {
+        "segments_before": len(cues),
+        "chars_before": sum(len(clean_cue_text(" ".join(cue["lines"]))) for cue in cues),
+        "segments_after": len(segments),
+        "chars_after": sum(len(text) for _, text in segments),
+    }
+    return segments, stats
+
+def format_stats(stats: Dict[str, int]) -> str:
+    change = stats["chars_after"] / stats["chars_before"] - 1 if stats["chars_before"] else 0
+    return (
+        f"{stats['segments_before']} cues / {stats['chars_before']} chars -> "
+        f"{stats['segments_after']} segments / {stats['chars_after']} chars ({change:+.0%} chars)"
+    )
@@ -0,0 +1,304 @@
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+
+# Finished jobs are evicted after this many seconds; stuck/abandoned ones after STALE_JOB_TTL.
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+STALE_JOB_TTL_SECONDS = int(os.getenv("STALE_JOB_TTL_SECONDS", "86400"))
+FINISHED_STATUSES = ("completed", "failed")
+
+# Bump whenever the jobs table changes (see SQLiteJobStore._init_db)
+JOB_SCHEMA_VERSION = 1
+
+# Fields holding (potentially large) JSON payloads
+JSON_FIELDS = ("meta", "partial_result", "result")
+
+class JobStore:
+    """Storage backend for JobManager. Jobs are plain dicts keyed by id."""
+    def create(self, job: Dict[str, Any]):
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def update(self, job_id: str, fields: Dict[str, Any]) -> bool:
+        """Merges fields into the job. Returns False if the job does not exist."""
+        raise NotImplementedError
+
+    def append_partial(self, job_id: str, key: str, item: Any) -> bool:
+        """Appends item to job['partial_result'][key] atomically."""
+        raise NotImplementedError
+
+    def updated_at(self, job_id: str) -> Optional[float]:
+        """Time of the job's last write (a cheap change check), or None if it does not exist."""
+        raise NotImplementedError
+
+    def evict_expired(self):
+        raise NotImplementedError
+
+    def close(self):
+        """Flushes pending writes (called on app shutdown)."""
+
+    @staticmethod
+    def _is_expired(status: str, updated_at: float, now: float) -> bool:
+        ttl = JOB_TTL_SECONDS if status in FINISHED_STATUSES else STALE_JOB_TTL_SECONDS
+        return now - updated_at > ttl
+
+class InMemoryJobStore(JobStore):
+    """Single-process store. Finished jobs expire after JOB_TTL_SECONDS to bound memory."""
+    SWEEP_INTERVAL_SEC = 60
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._updated_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+
+    def create(self, job: Dict[str, Any]):
+        with self._lock:
+            self._jobs[job["id"]] = copy.deepcopy(job)
+            self._updated_at[job["id"]] = time.time()
+        self._maybe_sweep()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Returns a copy, so callers cannot change the stored job (as with SQLiteJobStore)."""
+        self._maybe_sweep()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return copy.deepcopy(job) if job is not None else None
+
+    def update(self, job_id: str, fields: Dict[str, Any]) -> bool:
+        with self._lock:
+            if job_id not in self._jobs:
+                return False
+            self._jobs[job_id].update(copy.deepcopy(fields))
+            self._updated_at[job_id] = time.time()
+            return True
+
+    def append_partial(self, job_id: str, key: str, item: Any) -> bool:
+        with self._lock:
+            if job_id not in self._jobs:
+                return False
+            partial = self._jobs[job_id]["partial_result"] or {}
+            partial.setdefault(key, []).append(copy.deepcopy(item))
+            self._jobs[job_id]["partial_result"] = partial
+            self._updated_at[job_id] = time.time()
+            return True
+
+    def updated_at(self, job_id: str) -> Optional[float]:
+        return self._updated_at.get(job_id) if job_id in self._jobs else None
+
+    def evict_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if self._is_expired(job["status"], self._updated_at.get(job_id, now), now)
+            ]
+            for job_id in expired:
+                self._jobs.pop(job_id, None)
+                self._updated_at.pop(job_id, None)
+            self._last_sweep = now
+
+    def _maybe_sweep(self):
+        if time.time() - self._last_sweep > self.SWEEP_INTERVAL_SEC:
+            self.evict_expired()
+
+class SQLiteJobStore(JobStore):
+    """
+    Shared store for multi-worker deployments (uvicorn --workers N).
+    WAL journaling lets every worker read while one writes; each thread
+    keeps its own connection.
+
+    Jobs created by this worker are also kept in an InMemoryJobStore and
+    served from it, and their SQLite writes (JSON encoding included) run in
+    order on one writer thread, so JobManager calls made on the event loop
+    never wait on the database. Only jobs of other workers are read from SQLite.
+    """
+    SWEEP_INTERVAL_SEC = 60
+
+    def __init__(self, db_path: str = "jobs.db"):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._last_sweep = 0.0
+        self._owned = InMemoryJobStore()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-store-writer")
+        self._init_db()
+
+    def _submit(self, fn, *args):
+        def report(future: Future):
+            if future.exception() is not None:
+                print(f"Job store write failed: {future.exception()}")
+        self._writer.submit(fn, *args).add_done_callback(report)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        """
+        The schema version lives in PRAGMA user_version, as in the cache DB.
+        Jobs only live as long as the worker running them, so a table from
+        another version is recreated rather than migrated.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE") # Workers starting together upgrade it once
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != JOB_SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS jobs")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT,
+                    progress INTEGER,
+                    message TEXT,
+                    created_at TEXT,
+                    updated_at REAL,
+                    error TEXT,
+                    meta TEXT,
+                    transcript_key TEXT,
+                    partial_result TEXT,
+                    result TEXT,
+                    seq INTEGER
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_updated_at ON jobs (updated_at)")
+            conn.execute(f"PRAGMA user_version = {JOB_SCHEMA_VERSION}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def create(self, job: Dict[str, Any]):
+        self._owned.create(job)
+        self._submit(self._write_create, copy.deepcopy(job))
+        self._maybe_sweep()
+
+    def _write_create(self, job: Dict[str, Any]):
+        row = self._to_row(job)
+        row["updated_at"] = time.time()
+        columns = ", ".join(row)
+        placeholders = ", ".join("?" for _ in row)
+        self._conn().execute(f"INSERT OR REPLACE INTO jobs ({columns}) VALUES ({placeholders})", tuple(row.values()))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._owned.get(job_id)
+        if job is not None:
+            return job
+        self._maybe_sweep()
+        # Expired rows are skipped even if the sweep on the writer thread has not removed them yet
+        expired, params = self._expired_clause()
+        cur = self._conn().execute(
+            "SELECT id, status, progress, message, created_at, error, meta, transcript_key, partial_result, result, seq "
+            f"FROM jobs WHERE id = ? AND NOT ({expired})",
+            (job_id, *params)
+        )
+        row = cur.fetchone()
+        if not row:
+            return None
+        job = dict(zip(("id", "status", "progress", "message", "created_at", "error", "meta", "transcript_key", "partial_result", "result", "seq"), row))
+        for field in JSON_FIELDS:
+            job[field] = json.loads(job[field]) if job[field] is not None else None
+        return job
+
+    def update(self, job_id: str, fields: Dict[str, Any]) -> bool:
+        if self._owned.update(job_id, fields):
+            self._submit(self._write_update, job_id, copy.deepcopy(fields))
+            return True
+        return self._write_update(job_id, fields)
+
+    def _write_update(self, job_id: str, fields: Dict[str, Any]) -> bool:
+        row = self._to_row(fields)
+        row["updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in row)
+        cur = self._conn().execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*row.values(), job_id))
+        return cur.rowcount > 0
+
+    def append_partial(self, job_id: str, key: str, item: Any) -> bool:
+        if self._owned.append_partial(job_id, key, item):
+            self._submit(self._write_append_partial, job_id, key, copy.deepcopy(item))
+            return True
+        return self._write_append_partial(job_id, key, item)
+
+    def _write_append_partial(self, job_id: str, key: str, item: Any) -> bool:
+        conn = self._conn()
+        # IMMEDIATE takes the write lock up front so concurrent appends from other workers serialise
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT partial_result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if not row:
+                conn.execute("ROLLBACK")
+                return False
+            partial = json.loads(row[0]) if row[0] else {}
+            partial.setdefault(key, []).append(item)
+            conn.execute(
+                "UPDATE jobs SET partial_result = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(partial), time.time(), job_id)
+            )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def updated_at(self, job_id: str) -> Optional[float]:
+        owned = self._owned.updated_at(job_id)
+        if owned is not None:
+            return owned
+        expired, params = self._expired_clause()
+        row = self._conn().execute(f"SELECT updated_at FROM jobs WHERE id = ? AND NOT ({expired})", (job_id, *params)).fetchone()
+        return row[0] if row else None
+
+    def evict_expired(self):
+        self._owned.evict_expired()
+        self._last_sweep = time.time()
+        self._submit(self._write_evict_expired)
+
+    def close(self):
+        self._writer.shutdown(wait=True)
+
+    def _write_evict_expired(self):
+        expired, params = self._expired_clause()
+        self._conn().execute(f"DELETE FROM jobs WHERE {expired}", params)
+
+    @staticmethod
+    def _expired_clause() -> Tuple[str, tuple]:
+        """SQL condition (and its parameters) matching jobs past their TTL."""
+        now = time.time()
+        placeholders = ", ".join("?" for _ in FINISHED_STATUSES)
+        return (
+            f"(status IN ({placeholders}) AND updated_at < ?) OR updated_at < ?",
+            (*FINISHED_STATUSES, now - JOB_TTL_SECONDS, now - STALE_JOB_TTL_SECONDS)
+        )
+
+    def _maybe_sweep(self):
+        if time.time() - self._last_sweep > self.SWEEP_INTERVAL_SEC:
+            self.evict_expired()
+
+    @staticmethod
+    def _to_row(fields: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            k: (json.dumps(v) if k in JSON_FIELDS and v is not None else v)
+            for k, v in fields.items()
+        }
+
+def create_job_store() -> JobStore:
+    """
+    Picks the backend from JOB_STORE: 'sqlite' (default; jobs are visible to
+    every worker sharing JOB_DB_PATH) or 'memory' (single worker only).
+    """
+    backend = os.getenv("JOB_STORE", "sqlite").lower()
+    if backend == "memory":
+        return InMemoryJobStore()
+    return SQLiteJobStore(os.getenv("JOB_DB_PATH", "jobs.db"))
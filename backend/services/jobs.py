@@ -1,7 +1,12 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, AsyncIterator
+import asyncio
+import itertools
+import json
+import threading
 import uuid
 from enum import Enum
 from datetime import datetime
+from services.job_store import JobStore, create_job_store
 
 class JobStatus(Enum):
     QUEUED = "queued"
@@ -9,50 +14,247 @@ class JobStatus(Enum):
     COMPLETED = "completed"
     FAILED = "failed"
 
+# How long an SSE stream waits for an event before sending a keep-alive. Jobs
+# running in another worker are followed by re-reading the store at this
+# interval, and only when the job's updated_at has changed.
+EVENT_STREAM_POLL_SEC = 2.0
+
 class JobManager:
     _instance = None
-    _jobs: Dict[str, Dict[str, Any]] = {}
+    store: JobStore = None
+    # job_id -> list of (queue, loop) for live event subscribers in this process
+    _subscribers: Dict[str, list] = {}
+    # Unfinished jobs created by this process; their events always reach _publish here
+    _local_jobs: set = set()
+    # Every write is numbered (job["seq"], the SSE id) under _write_lock, so a
+    # stream can drop queued events its snapshot already contains
+    _seq = itertools.count(1)
+    _write_lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(JobManager, cls).__new__(cls)
+            cls._instance.store = create_job_store()
         return cls._instance
 
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, []).append((queue, asyncio.get_running_loop()))
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue):
+        subs = [s for s in self._subscribers.get(job_id, []) if s[0] is not queue]
+        if subs:
+            self._subscribers[job_id] = subs
+        else:
+            self._subscribers.pop(job_id, None)
+
+    def _write(self, job_id: str, event: str, data: Dict[str, Any], write) -> bool:
+        """Runs write(seq) with the next sequence number and publishes the event if the job exists."""
+        with self._write_lock:
+            seq = next(self._seq)
+            if not write(seq):
+                return False
+            self._publish(job_id, event, data, seq)
+            return True
+
+    def _publish(self, job_id: str, event: str, data: Dict[str, Any], seq: int):
+        """Pushes an event to every subscriber. The payload is encoded once, not per client."""
+        subs = self._subscribers.get(job_id)
+        if not subs:
+            return
+        message = (event, data, seq, format_sse(event, data, seq))
+        for queue, loop in subs:
+            try:
+                if _running_loop() is loop:
+                    queue.put_nowait(message)
+                else:
+                    loop.call_soon_threadsafe(queue.put_nowait, message)
+            except RuntimeError:
+                pass # Subscriber's loop is gone
+
     def create_job(self) -> str:
         """Creates a new job and returns its ID."""
         job_id = str(uuid.uuid4())
-        self._jobs[job_id] = {
+        self.store.create({
             "id": job_id,
             "status": JobStatus.QUEUED.value,
             "progress": 0,
             "message": "Queued...",
             "created_at": datetime.now().isoformat(),
             "result": None,
-            "error": None
-        }
+            "partial_result": None,
+            "meta": None,
+            "transcript_key": None, # Segments are served by /history/{key}/transcript
+            "error": None,
+            "seq": 0
+        })
+        self._local_jobs.add(job_id)
         return job_id
 
     def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
-        return self._jobs.get(job_id)
+        return self.store.get(job_id)
 
     def update_progress(self, job_id: str, progress: int, message: str):
-        if job_id in self._jobs:
-            self._jobs[job_id]["status"] = JobStatus.PROCESSING.value
-            self._jobs[job_id]["progress"] = progress
-            self._jobs[job_id]["message"] = message
+        fields = {
+            "status": JobStatus.PROCESSING.value,
+            "progress": progress,
+            "message": message
+        }
+        self._write(job_id, "progress", fields, lambda seq: self.store.update(job_id, {**fields, "seq": seq}))
+
+    def set_transcript(self, job_id: str, meta: Dict[str, Any], transcript_key: str):
+        """
+        Points the job at its transcript. Only the key is kept: the segments can be
+        megabytes and the job is re-read on every poll, snapshot and store write.
+        """
+        fields = {"meta": meta, "transcript_key": transcript_key}
+        self._write(job_id, "transcript", fields, lambda seq: self.store.update(job_id, {**fields, "seq": seq}))
+
+    def add_partial_item(self, job_id: str, key: str, item: Any):
+        """Appends a streamed item (e.g. a learning moment) to the job's partial result."""
+        self._write(job_id, "partial", {"key": key, "item": item},
+                    lambda seq: self.store.append_partial(job_id, key, item) and self.store.update(job_id, {"seq": seq}))
 
     def complete_job(self, job_id: str, result: Any):
-        if job_id in self._jobs:
-            self._jobs[job_id]["status"] = JobStatus.COMPLETED.value
-            self._jobs[job_id]["progress"] = 100
-            self._jobs[job_id]["message"] = "Analysis Complete"
-            self._jobs[job_id]["result"] = result
+        fields = {
+            "status": JobStatus.COMPLETED.value,
+            "progress": 100,
+            "message": "Analysis Complete",
+            "result": result,
+            "partial_result": None
+        }
+        self._write(job_id, "complete", {"result": result}, lambda seq: self.store.update(job_id, {**fields, "seq": seq}))
+        self._local_jobs.discard(job_id)
 
     def fail_job(self, job_id: str, error: str):
-        if job_id in self._jobs:
-            self._jobs[job_id]["status"] = JobStatus.FAILED.value
-            self._jobs[job_id]["error"] = error
-            self._jobs[job_id]["message"] = f"Failed: {error}"
+        fields = {
+            "status": JobStatus.FAILED.value,
+            "error": error,
+            "message": f"Failed: {error}"
+        }
+        self._write(job_id, "failed", {"error": error}, lambda seq: self.store.update(job_id, {**fields, "seq": seq}))
+        self._local_jobs.discard(job_id)
+
+    async def event_stream(self, job_id: str) -> AsyncIterator[str]:
+        """
+        Server-sent events for one job: a 'snapshot' first, then 'progress',
+        'transcript', 'partial' and finally 'complete' or 'failed'.
+        Local events are pushed as they happen; the stream subscribes before it
+        reads the snapshot, so events numbered at or below the snapshot's seq are
+        already in it and are dropped. Jobs running in another worker are
+        followed by re-reading the store on idle, once its updated_at moves.
+        """
+        queue = self.subscribe(job_id)
+        try:
+            if job_id in self._local_jobs:
+                # In memory, and consistent with the seq of every published event
+                with self._write_lock:
+                    last_seen = self.store.updated_at(job_id)
+                    job = self.get_job(job_id)
+            else:
+                # Read first, so a write racing the snapshot is re-read. Jobs of other
+                # workers come from SQLite, so those reads stay off the event loop.
+                last_seen = await asyncio.to_thread(self.store.updated_at, job_id)
+                job = await asyncio.to_thread(self.get_job, job_id)
+            if not job:
+                yield format_sse("failed", {"error": "Job not found"})
+                return
+
+            sent = _StreamState()
+            snapshot_seq = job.get("seq") or 0
+            yield format_sse("snapshot", sent.snapshot(job), job.get("seq"))
+            if job["status"] in (JobStatus.COMPLETED.value, JobStatus.FAILED.value):
+                return
+
+            while True:
+                try:
+                    event, data, seq, encoded = await asyncio.wait_for(queue.get(), timeout=EVENT_STREAM_POLL_SEC)
+                except asyncio.TimeoutError:
+                    if job_id in self._local_jobs:
+                        yield ": keep-alive\n\n"
+                        continue
+                    updated_at = await asyncio.to_thread(self.store.updated_at, job_id)
+                    if updated_at is None:
+                        yield format_sse("failed", {"error": "Job expired"})
+                        return
+                    if updated_at == last_seen:
+                        yield ": keep-alive\n\n"
+                        continue
+                    last_seen = updated_at
+                    job = await asyncio.to_thread(self.get_job, job_id)
+                    if not job:
+                        yield format_sse("failed", {"error": "Job expired"})
+                        return
+                    events = sent.diff(job)
+                    if not events:
+                        yield ": keep-alive\n\n"
+                    for event, data in events:
+                        yield format_sse(event, data)
+                        if event in ("complete", "failed"):
+                            return
+                    continue
+
+                if seq <= snapshot_seq:
+                    continue # Already part of the snapshot
+                sent.record(event, data)
+                yield encoded
+                if event in ("complete", "failed"):
+                    return
+        finally:
+            self.unsubscribe(job_id, queue)
+
+class _StreamState:
+    """What a single SSE client has already been sent, used to diff store reads."""
+    def __init__(self):
+        self.progress = None
+        self.has_transcript = False
+        self.partial_counts: Dict[str, int] = {}
+
+    def snapshot(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        self.progress = (job["status"], job["progress"], job["message"])
+        self.has_transcript = job.get("transcript_key") is not None
+        partial = job.get("partial_result") or {}
+        self.partial_counts = {k: len(v) for k, v in partial.items()}
+        return job
+
+    def record(self, event: str, data: Dict[str, Any]):
+        if event == "progress":
+            self.progress = (data["status"], data["progress"], data["message"])
+        elif event == "transcript":
+            self.has_transcript = True
+        elif event == "partial":
+            self.partial_counts[data["key"]] = self.partial_counts.get(data["key"], 0) + 1
+
+    def diff(self, job: Dict[str, Any]) -> list:
+        events = []
+        if not self.has_transcript and job.get("transcript_key") is not None:
+            events.append(("transcript", {"meta": job.get("meta"), "transcript_key": job["transcript_key"]}))
+            self.has_transcript = True
+        for key, items in (job.get("partial_result") or {}).items():
+            seen = self.partial_counts.get(key, 0)
+            for item in items[seen:]:
+                events.append(("partial", {"key": key, "item": item}))
+            self.partial_counts[key] = max(seen, len(items))
+        progress = (job["status"], job["progress"], job["message"])
+        if job["status"] == JobStatus.COMPLETED.value:
+            events.append(("complete", {"result": job["result"]}))
+        elif job["status"] == JobStatus.FAILED.value:
+            events.append(("failed", {"error": job["error"]}))
+        elif progress != self.progress:
+            events.append(("progress", {"status": job["status"], "progress": job["progress"], "message": job["message"]}))
+            self.progress = progress
+        return events
+
+def format_sse(event: str, data: Dict[str, Any], seq: Optional[int] = None) -> str:
+    event_id = f"id: {seq}\n" if seq is not None else ""
+    return f"{event_id}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
 
 # Global instance
 job_manager = JobManager()
@@ -0,0 +1,125 @@
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_INVALID = object()
+
+class IncrementalJSONParser:
+    """
+    Parses a streamed JSON object one text delta at a time.
+
+    Objects inside the tracked top-level arrays (e.g. 'learning_moments')
+    are emitted as soon as their closing brace arrives, and every top-level
+    value that finished is kept, so a truncated response still yields all
+    complete items. Any chatter before the first '{' (code fences, prose) is
+    skipped.
+    """
+    def __init__(self, tracked_keys: Iterable[str] = ("learning_moments", "narrative_arc")):
+        self.tracked_keys = set(tracked_keys)
+        self.buffer = ""
+        self.pos = 0
+        self.started = False
+        self.done = False
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.expect_key = True
+        self.key: Optional[str] = None
+        self.key_start: Optional[int] = None
+        self.value_start: Optional[int] = None
+        self.array_key: Optional[str] = None
+        self.item_start: Optional[int] = None
+        self.values: Dict[str, object] = {}
+        self.items: Dict[str, List] = {k: [] for k in self.tracked_keys}
+
+    def feed(self, text: str) -> List[Tuple[str, Dict]]:
+        """Consumes a text delta and returns newly completed (array_key, item) pairs."""
+        self.buffer += text
+        emitted = []
+        buf = self.buffer
+        i = self.pos
+        while i < len(buf) and not self.done:
+            c = buf[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == '\\':
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    if self.depth == 1:
+                        if self.key_start is not None:
+                            key = self._loads(buf[self.key_start:i + 1])
+                            self.key = key if isinstance(key, str) else None
+                            self.key_start = None
+                        elif self.value_start is not None:
+                            self._finish_value(buf[self.value_start:i + 1])
+            elif not self.started:
+                if c == '{':
+                    self.started = True
+                    self.depth = 1
+                    self.expect_key = True
+            elif c == '"':
+                self.in_string = True
+                if self.depth == 1:
+                    if self.expect_key:
+                        self.key_start = i
+                    elif self.value_start is None:
+                        self.value_start = i
+            elif c in '{[':
+                if self.depth == 1 and self.value_start is None:
+                    self.value_start = i
+                    if c == '[' and self.key in self.tracked_keys:
+                        self.array_key = self.key
+                elif self.depth == 2 and self.array_key and c == '{':
+                    self.item_start = i
+                self.depth += 1
+            elif c in '}]':
+                if self.depth == 1 and self.value_start is not None:
+                    # Scalar value terminated by the closing brace
+                    self._finish_value(buf[self.value_start:i])
+                self.depth -= 1
+                if self.depth == 2 and self.item_start is not None:
+                    item = self._loads(buf[self.item_start:i + 1])
+                    self.item_start = None
+                    if isinstance(item, dict):
+                        self.items[self.array_key].append(item)
+                        emitted.append((self.array_key, item))
+                elif self.depth == 1 and self.value_start is not None:
+                    self._finish_value(buf[self.value_start:i + 1])
+                    self.array_key = None
+                elif self.depth == 0:
+                    self.done = True
+            elif self.depth == 1:
+                if c == ':':
+                    self.expect_key = False
+                elif c == ',':
+                    if self.value_start is not None:
+                        self._finish_value(buf[self.value_start:i])
+                    self.expect_key = True
+                elif not c.isspace() and not self.expect_key and self.value_start is None:
+                    self.value_start = i
+            i += 1
+        self.pos = i
+        return emitted
+
+    def result(self) -> Dict:
+        """Everything parsed so far; tracked arrays fall back to their complete items."""
+        result = dict(self.values)
+        for key, items in self.items.items():
+            if key not in result and items:
+                result[key] = list(items)
+        return result
+
+    def _finish_value(self, raw: str):
+        value = self._loads(raw.strip())
+        if self.key is not None and value is not _INVALID:
+            self.values[self.key] = value
+        self.key = None
+        self.value_start = None
+
+    @staticmethod
+    def _loads(raw: str):
+        try:
+            return json.loads(raw)
+        except (json.JSONDecodeError, ValueError):
+            return _INVALID
@@ -1,25 +1,118 @@
-import requests
+import asyncio
+import hashlib
+import httpx
 import json
-from typing import List, Dict, Any, Optional
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, AsyncIterator
+
+# Connection pool settings shared by every provider client.
+# Keep-alive connections are reused across chunk calls and across jobs.
+HTTP_TIMEOUT = httpx.Timeout(180.0, connect=15.0) # Long contexts can take minutes
+HTTP_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=120.0)
+
+# One pooled client per (provider, base_url), bound to the event loop that created it.
+_http_clients: Dict[tuple, tuple] = {}
+
+def get_http_client(provider_type: str, base_url: str) -> httpx.AsyncClient:
+    """Returns the shared keep-alive client for this provider endpoint."""
+    key = (provider_type, base_url)
+    loop = asyncio.get_running_loop()
+    entry = _http_clients.get(key)
+    if entry:
+        client, client_loop = entry
+        if not client.is_closed and client_loop is loop:
+            return client
+
+    client = httpx.AsyncClient(timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS)
+    _http_clients[key] = (client, loop)
+    return client
+
+async def close_http_clients():
+    """Closes all pooled clients (called on app shutdown)."""
+    for client, _ in list(_http_clients.values()):
+        try:
+            await client.aclose()
+        except Exception:
+            pass
+    _http_clients.clear()
+
+class RateLimitError(Exception):
+    """HTTP 429 from a provider; retry_after is the wait it asked for, in seconds."""
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class TransientAPIError(Exception):
+    """5xx / overloaded / timeout status that is worth retrying."""
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+# 529 is Anthropic's "overloaded"
+RETRYABLE_STATUSES = {408, 409, 425, 500, 502, 503, 504, 529}
+
+def raise_for_rate_limit(response: httpx.Response, body: str = ""):
+    """Raises RateLimitError / TransientAPIError for statuses the caller should retry."""
+    if response.status_code == 429:
+        from services.rate_limiter import parse_retry_after
+        retry_after = parse_retry_after(response.headers.get("retry-after"))
+        raise RateLimitError(f"API Error 429 (retry after {retry_after:.0f}s): {body or response.text}", retry_after)
+    if response.status_code in RETRYABLE_STATUSES:
+        raise TransientAPIError(f"API Error {response.status_code}: {(body or response.text)[:500]}", response.status_code)
 
 class LLMProvider:
     def __init__(self, api_key: str, base_url: str, provider_type: str = "openai"):
-        self.api_key = api_key
+        # Adapters are cached for reuse, so the key is only kept inside its auth header
+        self._auth_headers = self._build_auth_headers(api_key)
         # Ensure base_url doesn't have trailing slash for consistency
         self.base_url = base_url.rstrip('/') if base_url else ""
         self.provider_type = provider_type.lower()
 
-    def generate(self, messages: List[Dict], model: str, max_tokens: int = 4096, temperature: float = 0.3) -> Dict:
+    @staticmethod
+    def _build_auth_headers(api_key: str) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {api_key}"}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return get_http_client(self.provider_type, self.base_url)
+
+    async def generate(self, messages: List[Dict], model: str, max_tokens: int = 4096, temperature: float = 0.3) -> Dict:
         raise NotImplementedError("Subclasses must implement generate")
 
+    async def stream(self, messages: List[Dict], model: str, max_tokens: int = 4096, temperature: float = 0.3) -> AsyncIterator[Dict]:
+        """
+        Yields {'delta': text} events while the completion streams in, then a
+        final {'finish_reason': ..., 'usage': {...}} event.
+        Adapters without a streaming mode fall back to a single delta.
+        """
+        result = await self.generate(messages, model, max_tokens=max_tokens, temperature=temperature)
+        choice = result['choices'][0]
+        yield {"delta": choice['message'].get('content') or ""}
+        yield {"finish_reason": choice.get('finish_reason'), "usage": result.get("usage", {})}
+
+    async def _iter_sse_data(self, response: httpx.Response) -> AsyncIterator[Dict]:
+        """Decodes the JSON payload of each 'data:' line of a server-sent event stream."""
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if not data or data == "[DONE]":
+                continue
+            try:
+                yield json.loads(data)
+            except json.JSONDecodeError:
+                continue
+
 class OpenAICompatibleProvider(LLMProvider):
     """
     Handles OpenAI, DeepSeek, OpenRouter, and AI Builders (default).
     Expects /chat/completions endpoint.
     """
-    def generate(self, messages: List[Dict], model: str, max_tokens: int = 4096, temperature: float = 0.3) -> Dict:
+    def _build_request(self, messages: List[Dict], model: str, max_tokens: int, temperature: float):
         headers = {
-            "Authorization": f"Bearer {self.api_key}",
+            **self._auth_headers,
             "Content-Type": "application/json"
         }
         
@@ -40,6 +133,17 @@ class OpenAICompatibleProvider(LLMProvider):
         if self.provider_type == "openai":
              payload["response_format"] = {"type": "json_object"}
 
+        # OpenAI-style automatic prompt caching matches on an identical prefix, so callers
+        # keep the shared system prompt first and per-call content last. On api.openai.com,
+        # prompt_cache_key also routes calls sharing that prompt to the same cache.
+        if "api.openai.com" in self.base_url and messages and messages[0].get("role") == "system":
+            payload["prompt_cache_key"] = hashlib.sha256(messages[0]["content"].encode("utf-8")).hexdigest()[:32]
+
+        return headers, payload
+
+    async def generate(self, messages: List[Dict], model: str, max_tokens: int = 4096, temperature: float = 0.3) -> Dict:
+        headers, payload = self._build_request(messages, model, max_tokens, temperature)
+
         try:
             # Assume /chat/completions is needed if not present, but usually base_url convention varies.
             # If base_url ends in /v1, we usually add /chat/completions.
@@ -47,8 +151,7 @@ class OpenAICompatibleProvider(LLMProvider):
             url = f"{self.base_url}/chat/completions"
             
             print(f"DEBUG: Sending to {url} with model {model}")
-            # Increased timeout to 180s for long contexts
-            response = requests.post(url, json=payload, headers=headers, timeout=180)
+            response = await self.client.post(url, json=payload, headers=headers)
             
             if response.status_code != 200:
                 # Log detailed error to file for debugging
@@ -60,6 +163,7 @@ class OpenAICompatibleProvider(LLMProvider):
                         f.write(f"Response: {response.text}\n--------------------------\n")
                 except: pass
 
+                raise_for_rate_limit(response)
                 # Try to parse error
                 try:
                     err = response.json()
@@ -73,14 +177,47 @@ class OpenAICompatibleProvider(LLMProvider):
             print(f"LLM Request Failed: {e}")
             raise e
 
+    async def stream(self, messages: List[Dict], model: str, max_tokens: int = 4096, temperature: float = 0.3) -> AsyncIterator[Dict]:
+        headers, payload = self._build_request(messages, model, max_tokens, temperature)
+        payload["stream"] = True
+        if self.provider_type == "openai":
+            payload["stream_options"] = {"include_usage": True}
+
+        url = f"{self.base_url}/chat/completions"
+        print(f"DEBUG: Streaming from {url} with model {model}")
+
+        finish_reason = None
+        usage = {}
+        async with self.client.stream("POST", url, json=payload, headers=headers) as response:
+            if response.status_code != 200:
+                body = (await response.aread()).decode("utf-8", errors="replace")
+                raise_for_rate_limit(response, body)
+                raise Exception(f"API Error {response.status_code}: {body}")
+
+            async for event in self._iter_sse_data(response):
+                if event.get("usage"):
+                    usage = event["usage"]
+                for choice in event.get("choices") or []:
+                    delta = (choice.get("delta") or {}).get("content")
+                    if delta:
+                        yield {"delta": delta}
+                    if choice.get("finish_reason"):
+                        finish_reason = choice["finish_reason"]
+
+        yield {"finish_reason": finish_reason, "usage": usage}
+
 class AnthropicProvider(LLMProvider):
     """
     Handles Anthropic Claude API.
     Expects /messages endpoint.
     """
-    def generate(self, messages: List[Dict], model: str, max_tokens: int = 4096, temperature: float = 0.3) -> Dict:
+    @staticmethod
+    def _build_auth_headers(api_key: str) -> Dict[str, str]:
+        return {"x-api-key": api_key}
+
+    def _build_request(self, messages: List[Dict], model: str, max_tokens: int, temperature: float):
         headers = {
-            "x-api-key": self.api_key,
+            **self._auth_headers,
             "anthropic-version": "2023-06-01",
             "Content-Type": "application/json"
         }
@@ -99,14 +236,23 @@ class AnthropicProvider(LLMProvider):
             "messages": filtered_messages,
             "max_tokens": max_tokens,
             "temperature": temperature,
-            "system": system_prompt.strip()
         }
+        if system_prompt.strip():
+            # The system prompt is identical for every chunk of a job: mark it as a cacheable
+            # prefix so later calls read it from Anthropic's prompt cache (prompts under the
+            # model's minimum cacheable length are simply not cached)
+            payload["system"] = [{"type": "text", "text": system_prompt.strip(), "cache_control": {"type": "ephemeral"}}]
 
+        return headers, payload
+
+    async def generate(self, messages: List[Dict], model: str, max_tokens: int = 4096, temperature: float = 0.3) -> Dict:
+        headers, payload = self._build_request(messages, model, max_tokens, temperature)
         url = f"{self.base_url}/messages"
         
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=180)
+            response = await self.client.post(url, json=payload, headers=headers)
             if response.status_code != 200:
+                 raise_for_rate_limit(response)
                  raise Exception(f"Anthropic API Error {response.status_code}: {response.text}")
             
             # Convert Anthropic response to OpenAI-like format for compatibility
@@ -118,24 +264,76 @@ class AnthropicProvider(LLMProvider):
                     "message": {
                         "content": content
                     },
-                    "finish_reason": data.get("stop_reason")
+                    "finish_reason": "length" if data.get("stop_reason") == "max_tokens" else data.get("stop_reason")
                 }],
                 "usage": data.get("usage", {})
             }
         except Exception as e:
             raise e
 
+    async def stream(self, messages: List[Dict], model: str, max_tokens: int = 4096, temperature: float = 0.3) -> AsyncIterator[Dict]:
+        headers, payload = self._build_request(messages, model, max_tokens, temperature)
+        payload["stream"] = True
+        url = f"{self.base_url}/messages"
+
+        # Anthropic reports stop_reason as 'max_tokens'; normalise to OpenAI's 'length'
+        finish_reason = None
+        usage = {}
+        async with self.client.stream("POST", url, json=payload, headers=headers) as response:
+            if response.status_code != 200:
+                body = (await response.aread()).decode("utf-8", errors="replace")
+                raise_for_rate_limit(response, body)
+                raise Exception(f"Anthropic API Error {response.status_code}: {body}")
+
+            async for event in self._iter_sse_data(response):
+                event_type = event.get("type")
+                if event_type == "message_start":
+                    usage.update(event.get("message", {}).get("usage") or {})
+                elif event_type == "content_block_delta":
+                    delta = (event.get("delta") or {}).get("text")
+                    if delta:
+                        yield {"delta": delta}
+                elif event_type == "message_delta":
+                    usage.update(event.get("usage") or {})
+                    stop_reason = (event.get("delta") or {}).get("stop_reason")
+                    if stop_reason:
+                        finish_reason = "length" if stop_reason == "max_tokens" else stop_reason
+                elif event_type == "error":
+                    raise Exception(f"Anthropic API Error: {event.get('error')}")
+
+        yield {"finish_reason": finish_reason, "usage": usage}
+
+# Provider adapters are stateless apart from their config, so reuse them across calls.
+# Keys come from client requests, so the cache is bounded (least recently used
+# adapters are dropped; they share the pooled HTTP clients, so nothing to close)
+# and holds a hash of the API key rather than the key itself.
+LLM_PROVIDER_CACHE_SIZE = int(os.getenv("LLM_PROVIDER_CACHE_SIZE", "64"))
+_providers: "OrderedDict[tuple, LLMProvider]" = OrderedDict()
+_providers_lock = threading.Lock()
+
 def get_llm_provider(provider_type: str, api_key: str, base_url: str) -> LLMProvider:
     """Factory to return the correct provider instance."""
     p_type = provider_type.lower()
-    
+    cache_key = (p_type, hashlib.sha256((api_key or "").encode()).hexdigest(), base_url)
+    with _providers_lock:
+        provider = _providers.get(cache_key)
+        if provider is not None:
+            _providers.move_to_end(cache_key)
+            return provider
+
     if p_type == 'anthropic':
         # Default Anthropic URL if not provided
         url = base_url if base_url else "https://api.anthropic.com/v1"
-        return AnthropicProvider(api_key, url, p_type)
-    
-    # Default to OpenAI Compatible (Works for OpenAI, DeepSeek, OpenRouter, AI Builders)
-    # If base_url is missing, default to OpenAI? Or AI Builders?
-    # Let's default to AI Builders since that's the current default
-    url = base_url if base_url else "https://space.ai-builders.com/backend/v1"
-    return OpenAICompatibleProvider(api_key, url, p_type)
+        provider = AnthropicProvider(api_key, url, p_type)
+    else:
+        # Default to OpenAI Compatible (Works for OpenAI, DeepSeek, OpenRouter, AI Builders)
+        # If base_url is missing, default to OpenAI? Or AI Builders?
+        # Let's default to AI Builders since that's the current default
+        url = base_url if base_url else "https://space.ai-builders.com/backend/v1"
+        provider = OpenAICompatibleProvider(api_key, url, p_type)
+
+    with _providers_lock:
+        _providers[cache_key] = provider
+        while len(_providers) > LLM_PROVIDER_CACHE_SIZE:
+            _providers.popitem(last=False)
+    return provider
@@ -0,0 +1,148 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import AsyncContextManager, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+import httpx
+
+from services.llm_factory import TransientAPIError
+from services.remote_tasks import backoff_delays
+
+T = TypeVar("T")
+
+# Retries for transient failures (5xx, overloaded, dropped connections, stalls).
+# Override per request with provider_config['max_retries'] / ['attempt_timeout'] / ['hedge'].
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_SEC = float(os.getenv("LLM_RETRY_BASE_SEC", "2"))
+LLM_RETRY_MAX_SEC = float(os.getenv("LLM_RETRY_MAX_SEC", "30"))
+# Hard deadline for one attempt; httpx's read timeout alone never fires on a slow-dripping stream
+LLM_ATTEMPT_TIMEOUT_SEC = float(os.getenv("LLM_ATTEMPT_TIMEOUT_SEC", "240"))
+# Hedging: when an attempt is slower than this percentile of recent calls of the
+# same type to the same model, fire a second identical request and keep whichever finishes first.
+# Costs up to one extra call per slow request, so it is off by default.
+LLM_HEDGE = os.getenv("LLM_HEDGE", "false").lower() in ("1", "true", "yes")
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+def is_retryable(error: BaseException) -> bool:
+    return isinstance(error, (TransientAPIError, httpx.TimeoutException, httpx.TransportError, asyncio.TimeoutError))
+
+class LatencyTracker:
+    """
+    Sliding window of recent successful call latencies per key, e.g.
+    (provider, model, call type): a short summary call and a full macro
+    analysis on the same model have very different latencies.
+    """
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[tuple, Deque[float]] = {}
+
+    def record(self, key: tuple, seconds: float):
+        self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key: tuple, pct: float, min_samples: int = HEDGE_MIN_SAMPLES) -> Optional[float]:
+        samples = self._samples.get(key)
+        if not samples or len(samples) < min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def _config_value(config: Dict, key: str, default, cast):
+    value = config.get(key)
+    if value is None:
+        return default
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return default
+
+class ResilientCaller:
+    """
+    Runs an LLM call with per-attempt deadlines, exponential backoff with jitter
+    on transient errors, and optional hedging against tail latency.
+    Rate limits (429) are not handled here; they propagate to the rate limiter.
+    """
+    def __init__(self):
+        self.latencies = LatencyTracker()
+
+    async def call(self, attempt: Callable[[], Awaitable[T]], key: tuple, config: Optional[Dict] = None,
+                   can_retry: Callable[[], bool] = lambda: True, hedge: Optional[bool] = None,
+                   slot: Optional[Callable[[], AsyncContextManager]] = None) -> T:
+        """
+        attempt() starts one fresh request. can_retry() is checked before a retry
+        (streams must not be retried once output reached the caller).
+        slot() is entered around every request sent, retries and hedges included,
+        so each one is admitted and charged by the rate limiter; the deadline
+        and the latency sample only start once the slot is held.
+        """
+        config = config or {}
+        retries = max(0, _config_value(config, "max_retries", LLM_MAX_RETRIES, int))
+        timeout = _config_value(config, "attempt_timeout", LLM_ATTEMPT_TIMEOUT_SEC, float)
+        if hedge is None:
+            hedge = _config_value(config, "hedge", LLM_HEDGE, bool)
+        delays = backoff_delays(LLM_RETRY_BASE_SEC, LLM_RETRY_MAX_SEC, multiplier=2.0)
+
+        for attempt_no in range(retries + 1):
+            try:
+                hedge_after = self.latencies.percentile(key, LLM_HEDGE_PERCENTILE) if hedge else None
+                if hedge_after is not None and hedge_after < timeout:
+                    return await self._hedged(attempt, key, timeout, hedge_after, slot)
+                return await self._timed(attempt, key, timeout, slot)
+            except Exception as e:
+                if not is_retryable(e) or attempt_no == retries or not can_retry():
+                    raise
+                delay = next(delays)
+                print(f"LLM call {'/'.join(map(str, key))} failed ({type(e).__name__}: {e}); retry {attempt_no + 1}/{retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _timed(self, attempt: Callable[[], Awaitable[T]], key: tuple, timeout: float,
+                     slot: Optional[Callable[[], AsyncContextManager]] = None, sent: Optional[asyncio.Event] = None) -> T:
+        if slot is not None:
+            async with slot():
+                return await self._timed(attempt, key, timeout, sent=sent)
+        if sent is not None:
+            sent.set()
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(attempt(), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise asyncio.TimeoutError(f"no response within {timeout:.0f}s")
+        self.latencies.record(key, time.monotonic() - started)
+        return result
+
+    async def _hedged(self, attempt: Callable[[], Awaitable[T]], key: tuple, timeout: float, hedge_after: float,
+                      slot: Optional[Callable[[], AsyncContextManager]] = None) -> T:
+        sent = asyncio.Event()
+        primary = asyncio.ensure_future(self._timed(attempt, key, timeout, slot, sent))
+        pending = {primary}
+        try:
+            # Time spent queueing for a slot is not latency; start the hedge clock once the request is sent
+            sending = asyncio.ensure_future(sent.wait())
+            try:
+                await asyncio.wait({primary, sending}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                sending.cancel()
+            if not primary.done():
+                await asyncio.wait({primary}, timeout=hedge_after)
+            if primary.done():
+                return primary.result()
+
+            print(f"LLM call {'/'.join(map(str, key))} slower than p{LLM_HEDGE_PERCENTILE:.0f} ({hedge_after:.1f}s); sending hedge request")
+            pending.add(asyncio.ensure_future(self._timed(attempt, key, timeout, slot)))
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                if not task.done():
+                    task.cancel()
+
+# Singleton instance
+resilient_caller = ResilientCaller()
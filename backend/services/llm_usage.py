@@ -0,0 +1,76 @@
+from contextvars import ContextVar, Token
+from typing import Dict, Optional, Tuple
+
+def normalize_usage(usage: Optional[Dict]) -> Dict[str, int]:
+    """
+    Maps an OpenAI or Anthropic usage block to
+    {input_tokens, output_tokens, cached_tokens, cache_write_tokens}.
+    input_tokens includes cached tokens for both providers.
+    """
+    usage = usage or {}
+    if "prompt_tokens" in usage: # OpenAI-compatible
+        details = usage.get("prompt_tokens_details") or {}
+        return {
+            "input_tokens": usage.get("prompt_tokens") or 0,
+            "output_tokens": usage.get("completion_tokens") or 0,
+            "cached_tokens": details.get("cached_tokens") or 0,
+            "cache_write_tokens": 0,
+        }
+    cached = usage.get("cache_read_input_tokens") or 0
+    written = usage.get("cache_creation_input_tokens") or 0
+    return {
+        "input_tokens": (usage.get("input_tokens") or 0) + cached + written,
+        "output_tokens": usage.get("output_tokens") or 0,
+        "cached_tokens": cached,
+        "cache_write_tokens": written,
+    }
+
+class UsageTotals:
+    """Token usage summed over every LLM call of one job."""
+    def __init__(self):
+        self.calls = 0
+        self.result_cache_hits = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cached_tokens = 0
+        self.cache_write_tokens = 0
+
+    def add(self, usage: Optional[Dict]):
+        normalized = normalize_usage(usage)
+        self.calls += 1
+        self.input_tokens += normalized["input_tokens"]
+        self.output_tokens += normalized["output_tokens"]
+        self.cached_tokens += normalized["cached_tokens"]
+        self.cache_write_tokens += normalized["cache_write_tokens"]
+
+    def as_dict(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "result_cache_hits": self.result_cache_hits,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cache_write_tokens": self.cache_write_tokens,
+            "cached_share": round(self.cached_tokens / self.input_tokens, 3) if self.input_tokens else 0.0,
+        }
+
+# Totals of the job running in the current task; tasks created by the job inherit it.
+_current_usage: ContextVar[Optional[UsageTotals]] = ContextVar("llm_usage", default=None)
+
+def start_usage_tracking() -> Tuple[UsageTotals, Token]:
+    """Starts collecting usage for the current job; pass the token to stop_usage_tracking."""
+    totals = UsageTotals()
+    return totals, _current_usage.set(totals)
+
+def stop_usage_tracking(token: Token):
+    _current_usage.reset(token)
+
+def record_call_usage(usage: Optional[Dict]):
+    totals = _current_usage.get()
+    if totals is not None:
+        totals.add(usage)
+
+def record_result_cache_hit():
+    totals = _current_usage.get()
+    if totals is not None:
+        totals.result_cache_hits += 1
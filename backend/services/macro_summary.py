@@ -0,0 +1,111 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from services.transcript_chunking import chunk_segments_by_tokens, count_tokens, format_segment, model_context_tokens
+
+# Share of the context window the macro pass may fill with transcript/summaries;
+# the rest is left for the system prompt and the JSON answer.
+MACRO_INPUT_SHARE = 0.5
+# Target size of one condensed summary; a reduce step merges as many as fit the budget
+SUMMARY_TOKENS = 500
+# Transcript tokens per map call (~24:1 compression into SUMMARY_TOKENS)
+MAP_CHUNK_TOKENS = 12000
+
+SUMMARY_PROMPT = f"""You condense one part of a long podcast / video transcript so that a later step can
+reconstruct the narrative arc of the whole episode from these notes alone.
+
+Keep, in order: who is speaking and their role, the main story beats and topic shifts,
+turning points, tension and emotional shifts, and at most three short notable quotes.
+Prefix every beat with its [timestamp] from the transcript. Write in the transcript's language.
+Stay under {SUMMARY_TOKENS * 3 // 4} words. Do not add analysis or advice.
+
+Return valid JSON ONLY: {{"summary": "..."}}"""
+
+CallFn = Callable[[List[Dict]], Awaitable[Dict]]
+
+def macro_input_budget(model_id: str, provider_config: Optional[Dict], system_prompt: str) -> int:
+    """Tokens of transcript (or summaries) one macro/reduce call may carry for this model."""
+    context = model_context_tokens(model_id, provider_config)
+    return max(2 * SUMMARY_TOKENS, int(context * MACRO_INPUT_SHARE) - count_tokens(system_prompt))
+
+def _time_label(start: float, end: float) -> str:
+    def fmt(sec: float) -> str:
+        sec = int(sec)
+        return f"{sec // 3600:02d}:{sec % 3600 // 60:02d}:{sec % 60:02d}"
+    return f"{fmt(start)}-{fmt(end)}"
+
+class HierarchicalSummarizer:
+    """
+    Condenses a transcript that is too long for one macro call.
+
+    Map: every chunk is summarised in parallel. The requests are deterministic
+    for a given section, so the LLM call cache lets re-runs and shared
+    transcripts skip sections that were already summarised. Reduce: while the
+    summaries still exceed the budget, consecutive summaries are grouped to fit
+    and condensed again. Each level shrinks the input by ~budget/SUMMARY_TOKENS,
+    so the number of levels grows logarithmically with episode length.
+    """
+    def __init__(self, call: CallFn, budget_tokens: int, on_call_done: Optional[Callable[[str], None]] = None):
+        self.call = call
+        self.budget_tokens = budget_tokens
+        self.on_call_done = on_call_done
+        self.calls = 0
+
+    async def condense(self, segments: List[Dict]) -> str:
+        """Returns time-labelled section summaries that together fit budget_tokens."""
+        chunk_tokens = max(SUMMARY_TOKENS * 2, min(self.budget_tokens, MAP_CHUNK_TOKENS))
+        chunks = chunk_segments_by_tokens(segments, chunk_tokens, 0)
+        items = await asyncio.gather(*(
+            self._summarize(chunk["start"], chunk["end"], chunk["text"]) for chunk in chunks
+        ))
+
+        level = 1
+        while sum(count_tokens(text) for _, _, text in items) > self.budget_tokens and len(items) > 1:
+            groups = self._group(items)
+            print(f"Macro reduce level {level}: {len(items)} summaries -> {len(groups)}")
+            if len(groups) == len(items):
+                break # Every summary is already as large as the budget; nothing left to merge
+            items = await asyncio.gather(*(
+                self._summarize(group[0][0], group[-1][1], self._render(group)) for group in groups
+            ))
+            level += 1
+
+        print(f"Macro condense: {len(chunks)} sections, {self.calls} summary calls")
+        return self._render(items)
+
+    def _group(self, items: List[tuple]) -> List[List[tuple]]:
+        groups, current, size = [], [], 0
+        for item in items:
+            tokens = count_tokens(item[2]) + 8
+            if current and size + tokens > self.budget_tokens:
+                groups.append(current)
+                current, size = [], 0
+            current.append(item)
+            size += tokens
+        if current:
+            groups.append(current)
+        return groups
+
+    @staticmethod
+    def _render(items: List[tuple]) -> str:
+        return "\n\n".join(f"[{_time_label(start, end)}] {text}" for start, end, text in items)
+
+    async def _summarize(self, start: float, end: float, text: str) -> tuple:
+        messages = [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": f"Transcript part {_time_label(start, end)}:\n\n{text}"},
+        ]
+        self.calls += 1
+        result = await self.call(messages)
+        summary = result.get("summary") if isinstance(result, dict) else None
+        if self.on_call_done:
+            self.on_call_done(f"Summary {_time_label(start, end)}")
+        if not isinstance(summary, str) or not summary.strip():
+            # Keep the arc intact rather than failing: fall back to the head of the section
+            print(f"Summary for {_time_label(start, end)} failed: {result.get('error') if isinstance(result, dict) else result}")
+            return start, end, text[:SUMMARY_TOKENS * 4] + " ...(summary unavailable)"
+
+        return start, end, summary.strip()
+
+def transcript_text(segments: List[Dict]) -> str:
+    return "\n".join(format_segment(s) for s in segments)
@@ -0,0 +1,129 @@
+import re
+from typing import Dict, List, Optional, Set
+
+# Two moments are the same if their time ranges overlap (allowing this much slack,
+# since the model often quotes the same passage a few seconds apart) ...
+OVERLAP_TOLERANCE_SEC = 20.0
+# ... and their quotes share this share of their combined words (Jaccard),
+QUOTE_SIMILARITY = 0.6
+# ... or they name the same technique and still share some of the quote.
+TECHNIQUE_SIMILARITY = 0.8
+TECHNIQUE_QUOTE_SIMILARITY = 0.3
+# Assumed length of a moment that only has a start time
+DEFAULT_MOMENT_SEC = 30.0
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+CJK_RE = re.compile(r"[぀-ヿ㐀-鿿가-힯]")
+
+def parse_timestamp(value) -> Optional[float]:
+    """'MM:SS' / 'HH:MM:SS' / seconds -> seconds, or None if unparseable."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    parts = value.strip().rstrip("s").split(":")
+    try:
+        seconds = 0.0
+        for part in parts:
+            seconds = seconds * 60 + float(part)
+        return seconds
+    except ValueError:
+        return None
+
+def _tokens(text) -> Set[str]:
+    """Lower-cased word set; CJK text (no spaces) is split into characters."""
+    if not isinstance(text, str):
+        return set()
+    text = text.lower()
+    words = set(WORD_RE.findall(CJK_RE.sub(" ", text)))
+    words.update(CJK_RE.findall(text))
+    return words
+
+def token_set_ratio(a: Set[str], b: Set[str]) -> float:
+    """
+    Shared tokens over all tokens (Jaccard). Dividing by the smaller set instead
+    would make any short quote a 'duplicate' of every longer one containing it.
+    """
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def moment_quality(moment: Dict) -> float:
+    """Ranks duplicates: complete, well-explained moments with a real quote win."""
+    score = 0.0
+    for field in ("timestamp_start", "timestamp_end", "category", "technique_name", "quote", "analysis", "takeaway"):
+        if moment.get(field):
+            score += 1.0
+    for field, cap in (("analysis", 400), ("takeaway", 200), ("quote", 200)):
+        value = moment.get(field)
+        if isinstance(value, str):
+            score += min(len(value), cap) / cap
+    return score
+
+class _Entry:
+    __slots__ = ("index", "moment", "start", "end", "quote", "technique")
+
+    def __init__(self, index: int, moment: Dict):
+        self.index = index
+        self.moment = moment
+        self.start = parse_timestamp(moment.get("timestamp_start"))
+        end = parse_timestamp(moment.get("timestamp_end"))
+        if self.start is not None and (end is None or end < self.start):
+            end = self.start + DEFAULT_MOMENT_SEC
+        self.end = end
+        self.quote = _tokens(moment.get("quote"))
+        self.technique = _tokens(moment.get("technique_name"))
+
+def _is_duplicate(a: _Entry, b: _Entry) -> bool:
+    quote_sim = token_set_ratio(a.quote, b.quote)
+    if quote_sim >= QUOTE_SIMILARITY:
+        return True
+    return quote_sim >= TECHNIQUE_QUOTE_SIMILARITY and token_set_ratio(a.technique, b.technique) >= TECHNIQUE_SIMILARITY
+
+def deduplicate_moments(moments: List[Dict]) -> List[Dict]:
+    """
+    Merges near-duplicate learning moments (typically the same passage reported
+    by two overlapping chunks) and keeps the best of each group, in timeline order.
+
+    Moments are swept in start-time order and only compared with the ones whose
+    time range (plus OVERLAP_TOLERANCE_SEC) is still open, so the cost is
+    O(n log n + n * overlap) rather than O(n^2). Moments without a parseable
+    timestamp are only merged when their text is identical.
+    """
+    entries = [_Entry(i, m) for i, m in enumerate(moments) if isinstance(m, dict)]
+    parent = list(range(len(moments)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    timed = sorted((e for e in entries if e.start is not None), key=lambda e: e.start)
+    window: List[_Entry] = []
+    for entry in timed:
+        window = [w for w in window if w.end + OVERLAP_TOLERANCE_SEC >= entry.start]
+        for other in window:
+            if find(other.index) != find(entry.index) and _is_duplicate(entry, other):
+                parent[find(entry.index)] = find(other.index)
+        window.append(entry)
+
+    seen_untimed: Dict[tuple, int] = {}
+    for entry in entries:
+        if entry.start is None:
+            key = (frozenset(entry.quote), frozenset(entry.technique))
+            if key in seen_untimed:
+                parent[find(entry.index)] = find(seen_untimed[key])
+            else:
+                seen_untimed[key] = entry.index
+
+    best: Dict[int, _Entry] = {}
+    for entry in entries:
+        root = find(entry.index)
+        if root not in best or moment_quality(entry.moment) > moment_quality(best[root].moment):
+            best[root] = entry
+
+    kept = sorted(best.values(), key=lambda e: (e.start if e.start is not None else float("inf"), e.index))
+    if len(kept) < len(entries):
+        print(f"Deduplicated learning moments: {len(entries)} -> {len(kept)}")
+    return [e.moment for e in kept]
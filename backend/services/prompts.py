@@ -0,0 +1,76 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
+PROMPT_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "prompt.md")
+DEFAULT_PROMPT = "You are an expert storytelling coach..."
+
+class PromptRegistry:
+    """
+    Loads prompt.md once and hashes it once.
+    The file is only re-read when its mtime, inode or size changes, and the
+    stat() itself is throttled to CHECK_INTERVAL_SEC, so cache lookups do no file I/O.
+    """
+    CHECK_INTERVAL_SEC = 1.0
+
+    def __init__(self, path: str = PROMPT_FILE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature: Optional[tuple] = None
+        self._content = DEFAULT_PROMPT
+        self._hash = "default_prompt"
+        self._last_check = 0.0
+        self._refresh(force=True)
+
+    @property
+    def content(self) -> str:
+        return self.get()[0]
+
+    @property
+    def prompt_hash(self) -> str:
+        """Full content hash, used in cache keys."""
+        return self.get()[1]
+
+    @property
+    def version(self) -> str:
+        """Short, human-readable prompt version recorded with analyses and history entries."""
+        return self.prompt_hash[:12]
+
+    def get(self) -> Tuple[str, str]:
+        """Returns (content, hash), reloading only if the file changed."""
+        if time.monotonic() - self._last_check > self.CHECK_INTERVAL_SEC:
+            self._refresh()
+        return self._content, self._hash
+
+    def _refresh(self, force: bool = False):
+        with self._lock:
+            self._last_check = time.monotonic()
+            try:
+                st = os.stat(self.path)
+                signature = (st.st_mtime_ns, st.st_ino, st.st_size)
+            except FileNotFoundError:
+                signature = None
+
+            if not force and signature == self._signature:
+                return
+            self._signature = signature
+
+            if signature is None:
+                print(f"Warning: prompt.md not found at {self.path}")
+                self._content, self._hash = DEFAULT_PROMPT, "default_prompt"
+                return
+
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    content = f.read()
+            except OSError as e:
+                print(f"Warning: failed to read prompt.md: {e}")
+                return
+            self._content = content
+            self._hash = hashlib.md5(content.encode()).hexdigest()
+            print(f"Loaded prompt.md (version {self._hash[:12]})")
+
+# Singleton instance
+prompt_registry = PromptRegistry()
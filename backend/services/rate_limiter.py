@@ -0,0 +1,257 @@
+import asyncio
+import hashlib
+import itertools
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, List, Optional
+
+# Defaults for LLM providers; 0 means unlimited. Override per request with
+# provider_config['rpm'] / ['tpm'] / ['max_concurrency'], or per provider with
+# RATE_LIMIT_<PROVIDER>_RPM / _TPM / _CONCURRENCY (e.g. RATE_LIMIT_DEEPGRAM_CONCURRENCY=2).
+DEFAULT_LLM_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+DEFAULT_LLM_RPM = int(os.getenv("LLM_RPM", "0"))
+DEFAULT_LLM_TPM = int(os.getenv("LLM_TPM", "0"))
+# Non-head waiters re-check at least this often in case a wake-up is missed
+WAKE_INTERVAL_SEC = 0.5
+
+class TokenBucket:
+    """Continuously refilling bucket holding at most one minute's worth of capacity."""
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.per_minute <= 0
+
+    def refill(self, now: float):
+        if not self.unlimited:
+            self.tokens = min(self.per_minute, self.tokens + (now - self.updated) * self.per_minute / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available (amounts above capacity wait for a full bucket)."""
+        if self.unlimited:
+            return 0.0
+        amount = min(amount, self.per_minute)
+        return max(0.0, (amount - self.tokens) * 60.0 / self.per_minute)
+
+    def take(self, amount: float):
+        if not self.unlimited:
+            self.tokens -= min(amount, self.per_minute)
+
+    def give_back(self, amount: float):
+        if not self.unlimited:
+            self.tokens = min(self.per_minute, self.tokens + amount)
+
+class _Waiter:
+    __slots__ = ("job", "seq", "tokens", "wake")
+
+    def __init__(self, job: str, seq: int, tokens: float, wake):
+        self.job = job
+        self.seq = seq
+        self.tokens = tokens
+        self.wake = wake
+
+class ProviderLimiter:
+    """
+    Admission control for one (provider, API key): requests/min and tokens/min
+    token buckets, a concurrency cap, and a pause after a 429's Retry-After.
+
+    Waiting calls are served by start-time fair queuing across jobs: the call
+    whose job has been served least goes first, so one 40-chunk job cannot
+    starve a job that arrived after it. Usable from the event loop (slot)
+    and from worker threads (slot_blocking).
+    """
+    def __init__(self, name: str, rpm: int = 0, tpm: int = 0, max_concurrency: int = 0):
+        self.name = name
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._waiters: List[_Waiter] = []
+        self._served: Dict[str, int] = {}
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self.configure(rpm, tpm, max_concurrency)
+
+    def configure(self, rpm: int, tpm: int, max_concurrency: int):
+        with self._lock:
+            if getattr(self, "_rpm", None) is None or self._rpm.per_minute != rpm:
+                self._rpm = TokenBucket(rpm)
+            if getattr(self, "_tpm", None) is None or self._tpm.per_minute != tpm:
+                self._tpm = TokenBucket(tpm)
+            self.max_concurrency = max_concurrency
+
+    def pause(self, seconds: float):
+        """Holds every call for `seconds` (the provider's Retry-After)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        print(f"Rate limiter {self.name}: provider asked to back off for {seconds:.1f}s")
+
+    def record_usage(self, estimated_tokens: float, actual_tokens: Optional[float]):
+        """Corrects the tokens/min bucket once the real usage of a call is known."""
+        if actual_tokens is None:
+            return
+        with self._lock:
+            if actual_tokens < estimated_tokens:
+                self._tpm.give_back(estimated_tokens - actual_tokens)
+            else:
+                self._tpm.take(actual_tokens - estimated_tokens)
+
+    @asynccontextmanager
+    async def slot(self, job: Optional[str] = None, tokens: float = 0):
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = self._enqueue(job, tokens, lambda: loop.call_soon_threadsafe(event.set))
+        try:
+            while True:
+                delay = self._try_admit(waiter)
+                if delay == 0:
+                    break
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=min(delay, WAKE_INTERVAL_SEC) if delay else WAKE_INTERVAL_SEC)
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    @contextmanager
+    def slot_blocking(self, job: Optional[str] = None, tokens: float = 0):
+        event = threading.Event()
+        waiter = self._enqueue(job, tokens, event.set)
+        try:
+            while True:
+                delay = self._try_admit(waiter)
+                if delay == 0:
+                    break
+                event.wait(timeout=min(delay, WAKE_INTERVAL_SEC) if delay else WAKE_INTERVAL_SEC)
+                event.clear()
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _enqueue(self, job: Optional[str], tokens: float, wake) -> _Waiter:
+        job = job or "anonymous"
+        with self._lock:
+            # A job (re)joining the queue starts level with the least-served active job
+            active = [self._served[w.job] for w in self._waiters]
+            floor = min(active) if active else 0
+            self._served[job] = max(self._served.get(job, 0), floor)
+            waiter = _Waiter(job, next(self._seq), tokens, wake)
+            self._waiters.append(waiter)
+            return waiter
+
+    def _head(self) -> Optional[_Waiter]:
+        if not self._waiters:
+            return None
+        return min(self._waiters, key=lambda w: (self._served[w.job], w.seq))
+
+    def _try_admit(self, waiter: _Waiter) -> Optional[float]:
+        """0 = admitted, >0 = seconds until capacity, None = not this waiter's turn."""
+        with self._lock:
+            if self._head() is not waiter:
+                return None
+            if self.max_concurrency > 0 and self._in_flight >= self.max_concurrency:
+                return None # Woken by _release
+            now = time.monotonic()
+            self._rpm.refill(now)
+            self._tpm.refill(now)
+            delay = max(self._paused_until - now, self._rpm.wait_time(1), self._tpm.wait_time(waiter.tokens))
+            if delay > 0:
+                return delay
+
+            self._rpm.take(1)
+            self._tpm.take(waiter.tokens)
+            self._in_flight += 1
+            self._served[waiter.job] += 1
+            self._waiters.remove(waiter)
+            self._wake_head()
+            return 0
+
+    def _abandon(self, waiter: _Waiter):
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                self._wake_head()
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+            self._wake_head()
+            if not self._waiters:
+                self._served.clear() # Idle: forget history so counters stay small
+
+    def _wake_head(self):
+        head = self._head()
+        if head:
+            head.wake()
+
+_limiters: Dict[tuple, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def _env_limit(provider: str, kind: str, default: int) -> int:
+    value = os.getenv(f"RATE_LIMIT_{provider.upper()}_{kind}")
+    try:
+        return int(value) if value is not None else default
+    except ValueError:
+        return default
+
+def _config_limit(config: Dict, key: str, default: int) -> int:
+    try:
+        return max(0, int(config.get(key) or default))
+    except (TypeError, ValueError):
+        return default
+
+def get_limiter(provider: str, api_key: Optional[str], config: Optional[Dict] = None,
+                default_concurrency: int = 0, default_rpm: int = 0, default_tpm: int = 0) -> ProviderLimiter:
+    """
+    Returns the limiter shared by every job using this provider and API key.
+    Limits come from config (rpm / tpm / max_concurrency), then
+    RATE_LIMIT_<PROVIDER>_* env vars, then the given defaults.
+    """
+    provider = (provider or "openai").lower()
+    config = config or {}
+    key_id = hashlib.sha256((api_key or "").encode()).hexdigest()[:12]
+    rpm = _config_limit(config, "rpm", _env_limit(provider, "RPM", default_rpm))
+    tpm = _config_limit(config, "tpm", _env_limit(provider, "TPM", default_tpm))
+    concurrency = _config_limit(config, "max_concurrency", _env_limit(provider, "CONCURRENCY", default_concurrency))
+
+    with _limiters_lock:
+        limiter = _limiters.get((provider, key_id))
+        if limiter is None:
+            limiter = ProviderLimiter(f"{provider}:{key_id}", rpm, tpm, concurrency)
+            _limiters[(provider, key_id)] = limiter
+        elif (limiter._rpm.per_minute, limiter._tpm.per_minute, limiter.max_concurrency) != (rpm, tpm, concurrency):
+            limiter.configure(rpm, tpm, concurrency)
+    return limiter
+
+def get_llm_limiter(provider_config: Dict) -> ProviderLimiter:
+    api_key = provider_config.get("api_key") or os.getenv("SUPER_MIND_API_KEY")
+    return get_limiter(provider_config.get("provider") or "openai", api_key, provider_config,
+                       DEFAULT_LLM_CONCURRENCY, DEFAULT_LLM_RPM, DEFAULT_LLM_TPM)
+
+def estimate_tokens(messages: List[Dict], max_output_tokens: int = 0) -> int:
+    """Rough token count for admission (~4 chars/token); corrected via record_usage afterwards."""
+    chars = sum(len(m.get("content") or "") for m in messages if isinstance(m.get("content"), str))
+    return chars // 4 + max_output_tokens
+
+def parse_retry_after(value: Optional[str], default: float = 5.0) -> float:
+    """Parses a Retry-After header (seconds; HTTP dates fall back to default)."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return default
@@ -0,0 +1,89 @@
+import asyncio
+import os
+import random
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+# Backoff schedule for polling remote transcription tasks.
+POLL_INITIAL_SEC = float(os.getenv("REMOTE_POLL_INITIAL_SEC", "2"))
+POLL_MAX_SEC = float(os.getenv("REMOTE_POLL_MAX_SEC", "30"))
+POLL_MULTIPLIER = 1.6
+# With a webhook configured, polling is only a safety net (e.g. the callback hit another worker)
+WEBHOOK_POLL_MAX_SEC = float(os.getenv("REMOTE_WEBHOOK_POLL_MAX_SEC", "120"))
+POLL_TIMEOUT_SEC = float(os.getenv("REMOTE_POLL_TIMEOUT_SEC", str(4 * 3600)))
+# Malformed status responses in a row before the wait gives up
+POLL_MAX_MALFORMED = int(os.getenv("REMOTE_POLL_MAX_MALFORMED", "10"))
+# What a status response that is not valid JSON or lacks expected fields raises
+MALFORMED_ERRORS = (KeyError, TypeError, ValueError)
+
+def backoff_delays(initial: float, maximum: float, multiplier: float = POLL_MULTIPLIER):
+    """Yields exponentially growing delays with jitter (50-100% of the nominal delay)."""
+    delay = initial
+    while True:
+        yield delay * random.uniform(0.5, 1.0)
+        delay = min(maximum, delay * multiplier)
+
+class RemoteTaskWaiter:
+    """
+    Waits for many remote tasks (Uniscribe jobs etc.) on one event loop.
+
+    Each waiter polls its task with exponential backoff and jitter instead of
+    parking a worker thread in time.sleep(). A webhook callback can wake a
+    waiter early via notify(); the waiter then re-checks the task through the
+    provider API, so the callback payload itself is never trusted.
+    """
+    def __init__(self):
+        self._wakeups: Dict[Tuple[str, str], Tuple[asyncio.Event, asyncio.AbstractEventLoop]] = {}
+
+    async def wait(self, provider: str, task_id: str, check: Callable[[], Awaitable[Optional[Dict]]],
+                   webhook: bool = False) -> Dict:
+        """
+        Calls check() until it returns a result (not None) and returns it.
+        check() raises to abort (e.g. the task failed). A malformed response
+        (KeyError / TypeError / ValueError, JSON decode errors included) is
+        retried on the same backoff, up to POLL_MAX_MALFORMED times in a row.
+        """
+        key = (provider, task_id)
+        wakeup = asyncio.Event()
+        self._wakeups[key] = (wakeup, asyncio.get_running_loop())
+        delays = backoff_delays(POLL_INITIAL_SEC, WEBHOOK_POLL_MAX_SEC if webhook else POLL_MAX_SEC)
+        deadline = asyncio.get_running_loop().time() + POLL_TIMEOUT_SEC
+        malformed = 0
+        try:
+            while True:
+                try:
+                    result = await check()
+                    malformed = 0
+                except MALFORMED_ERRORS as e:
+                    malformed += 1
+                    if malformed >= POLL_MAX_MALFORMED:
+                        raise Exception(f"{provider} task {task_id}: {malformed} malformed status responses in a row ({e!r})")
+                    print(f"{provider} task {task_id}: malformed status response ({e!r}), retrying")
+                    result = None
+                if result is not None:
+                    return result
+                if asyncio.get_running_loop().time() > deadline:
+                    raise Exception(f"{provider} task {task_id} did not finish within {POLL_TIMEOUT_SEC / 3600:.1f}h")
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=next(delays))
+                    print(f"{provider} task {task_id}: woken by callback")
+                except asyncio.TimeoutError:
+                    pass
+                wakeup.clear()
+        finally:
+            self._wakeups.pop(key, None)
+
+    def notify(self, provider: str, task_id: str) -> bool:
+        """Wakes the waiter for this task, from any thread. Returns False if nobody here is waiting."""
+        entry = self._wakeups.get((provider, task_id))
+        if not entry:
+            return False
+        wakeup, loop = entry
+        loop.call_soon_threadsafe(wakeup.set)
+        return True
+
+    @property
+    def pending(self) -> int:
+        return len(self._wakeups)
+
+# Singleton instance
+remote_task_waiter = RemoteTaskWaiter()
@@ -0,0 +1,198 @@
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+# Where per-job scratch directories live. SCRATCH_TMPFS=true puts them in
+# /dev/shm (RAM-backed) when available; SCRATCH_DIR overrides both.
+SCRATCH_TMPFS = os.getenv("SCRATCH_TMPFS", "false").lower() == "true"
+SCRATCH_QUOTA_MB = int(os.getenv("SCRATCH_QUOTA_MB", "4096"))
+# Space set aside for each job when it starts; a job that outgrows it takes
+# more from the unreserved part of the quota as long as there is some left
+SCRATCH_JOB_RESERVE_MB = int(os.getenv("SCRATCH_JOB_RESERVE_MB", "1024"))
+# Running jobs re-check their usage from their download/transcode progress, at most this often
+SCRATCH_QUOTA_CHECK_SEC = float(os.getenv("SCRATCH_QUOTA_CHECK_SEC", "5"))
+# Directories of live workers are only removed once they are this old
+SCRATCH_STALE_SEC = int(os.getenv("SCRATCH_STALE_SEC", "21600"))
+
+JOB_DIR_RE = re.compile(r"^job_(\d+)_[0-9a-f]{32}$")
+# Files older versions wrote into the process cwd
+LEGACY_TEMP_RE = re.compile(r"^temp_(subs_|whisper_|uniscribe_)?[0-9a-f-]{36}")
+
+def _default_root() -> str:
+    if os.getenv("SCRATCH_DIR"):
+        return os.getenv("SCRATCH_DIR")
+    if SCRATCH_TMPFS and os.path.isdir("/dev/shm"):
+        return "/dev/shm/storyflow"
+    return os.path.join(tempfile.gettempdir(), "storyflow")
+
+class ScratchQuotaExceeded(Exception):
+    """A job could not get (or outgrew) its share of the scratch quota."""
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        return True # os.kill would terminate the process on Windows; rely on SCRATCH_STALE_SEC there
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+class ScratchSpace:
+    """
+    Hands out one private temp directory per transcription job and removes it
+    (with everything the job wrote) when the job ends, even on error.
+    Total usage is capped at SCRATCH_QUOTA_MB so a burst of concurrent
+    jobs fails fast instead of filling the disk. Each job reserves
+    SCRATCH_JOB_RESERVE_MB up front (new jobs are refused when that does not
+    fit) and is only charged for its own directory, so a job that runs out
+    of room stops itself without failing the others (see progress_hook).
+    """
+    def __init__(self, root: Optional[str] = None, quota_mb: int = SCRATCH_QUOTA_MB,
+                 job_reserve_mb: int = SCRATCH_JOB_RESERVE_MB):
+        self.root = root or _default_root()
+        self.quota_bytes = quota_mb * 1024 * 1024
+        self.job_reserve_bytes = min(job_reserve_mb, quota_mb) * 1024 * 1024
+        self._lock = threading.Lock()
+        self._reserved: Dict[str, int] = {} # job dir -> bytes set aside for it
+        os.makedirs(self.root, exist_ok=True)
+
+    @contextmanager
+    def job_dir(self, label: str = "job") -> Iterator[str]:
+        """Yields a fresh directory for one job and deletes it afterwards."""
+        path = os.path.join(self.root, f"job_{os.getpid()}_{uuid.uuid4().hex}")
+        self._reserve(path)
+        try:
+            os.makedirs(path)
+            print(f"Scratch: {label} using {path}")
+            yield path
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+            with self._lock:
+                self._reserved.pop(path, None)
+
+    def usage_bytes(self, path: Optional[str] = None) -> int:
+        """Bytes on disk under path (default: the whole scratch root)."""
+        total = 0
+        for dirpath, _, filenames in os.walk(path or self.root):
+            for name in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, name))
+                except OSError:
+                    pass # Removed while we were walking
+        return total
+
+    def _unreserved_usage(self) -> int:
+        """Usage outside this process's job reservations (other workers, leftovers)."""
+        with self._lock:
+            reserved = set(self._reserved)
+        total = 0
+        try:
+            with os.scandir(self.root) as entries:
+                for entry in entries:
+                    if entry.path in reserved:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        total += self.usage_bytes(entry.path)
+                    else:
+                        try:
+                            total += entry.stat().st_size
+                        except OSError:
+                            pass
+        except FileNotFoundError:
+            pass
+        return total
+
+    def _quota_error(self, needed: int, available: int) -> ScratchQuotaExceeded:
+        return ScratchQuotaExceeded(
+            f"Scratch space quota exceeded (needed {needed / 1024 / 1024:.0f}MB, {max(0, available) / 1024 / 1024:.0f}MB "
+            f"of {self.quota_bytes / 1024 / 1024:.0f}MB free). Too many transcriptions are running; please retry shortly."
+        )
+
+    def _reserve(self, path: str):
+        unreserved = self._unreserved_usage()
+        with self._lock:
+            available = self.quota_bytes - unreserved - sum(self._reserved.values())
+            if self.job_reserve_bytes > available:
+                raise self._quota_error(self.job_reserve_bytes, available)
+            self._reserved[path] = self.job_reserve_bytes
+
+    def charge(self, path: str):
+        """
+        Checks the job in path against its reservation, growing the reservation
+        into free quota when the job needs more. Raises ScratchQuotaExceeded
+        (for this job only) when there is not enough left.
+        """
+        used = self.usage_bytes(path)
+        with self._lock:
+            if used <= self._reserved.get(path, 0):
+                return
+        unreserved = self._unreserved_usage()
+        with self._lock:
+            others = sum(size for job, size in self._reserved.items() if job != path)
+            available = self.quota_bytes - unreserved - others
+            if used > available:
+                raise self._quota_error(used, available)
+            self._reserved[path] = used
+
+    def progress_hook(self, path: str) -> Callable[..., None]:
+        """
+        Returns a hook that charges the job in path while it writes. The hook
+        takes (and ignores) any arguments so it can be passed as a yt-dlp
+        progress/postprocessor hook or an ffmpeg progress callback; it walks
+        the job directory at most every SCRATCH_QUOTA_CHECK_SEC.
+        """
+        last_check = [0.0]
+
+        def hook(*_):
+            now = time.monotonic()
+            if now - last_check[0] < SCRATCH_QUOTA_CHECK_SEC:
+                return
+            last_check[0] = now
+            self.charge(path)
+        return hook
+
+    def cleanup_stale(self, legacy_dir: Optional[str] = None) -> int:
+        """
+        Removes job directories left behind by crashed processes (owner pid gone,
+        or older than SCRATCH_STALE_SEC) and temp_* files older versions wrote
+        into legacy_dir. Returns the number of entries removed.
+        """
+        removed = 0
+        now = time.time()
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                m = JOB_DIR_RE.match(entry.name)
+                if not m or not entry.is_dir():
+                    continue
+                pid = int(m.group(1))
+                try:
+                    age = now - entry.stat().st_mtime
+                except OSError:
+                    continue
+                if (pid != os.getpid() and not _pid_alive(pid)) or age > SCRATCH_STALE_SEC:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    removed += 1
+
+        if legacy_dir and os.path.isdir(legacy_dir):
+            with os.scandir(legacy_dir) as entries:
+                for entry in entries:
+                    if entry.is_file() and LEGACY_TEMP_RE.match(entry.name):
+                        try:
+                            os.remove(entry.path)
+                            removed += 1
+                        except OSError:
+                            pass
+        if removed:
+            print(f"Scratch: removed {removed} leftover temp entries")
+        return removed
+
+# Singleton instance
+scratch_space = ScratchSpace()
@@ -0,0 +1,203 @@
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+# Micro-pass chunk size in tokens. Speech runs ~150 wpm (~200 tokens/min), so the
+# defaults match the former 300 s windows with 60 s overlap; larger chunks mean
+# fewer parallel calls and fewer moments found. Override per request with
+# provider_config['chunk_tokens'] / ['chunk_overlap_tokens'].
+CHUNK_TOKENS = int(os.getenv("ANALYSIS_CHUNK_TOKENS", "1500"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("ANALYSIS_CHUNK_OVERLAP_TOKENS", "300"))
+# A cut may move back by up to this share of the chunk to land on a speaker turn
+SNAP_WINDOW = 0.2
+# Speaking rate used to date the pieces of the transcript's last segment when it has to be split
+SPEECH_TOKENS_PER_SEC = 200 / 60
+
+# Context windows of the models offered in the UI; unknown models get DEFAULT_CONTEXT_TOKENS.
+MODEL_CONTEXT_TOKENS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4o": 128000,
+    "gemini-2.5-pro": 1000000,
+    "deepseek": 64000,
+    "supermind-agent-v1": 32000,
+    "grok-2-1212": 131072,
+}
+DEFAULT_CONTEXT_TOKENS = 32000
+
+WORD_RE = re.compile(r"\S+\s*")
+SENTENCE_END_RE = re.compile(r"[.!?…。！？][\"')\]」]*$")
+CJK_RE = re.compile(r"[぀-ヿ㐀-鿿가-힯]")
+
+@lru_cache(maxsize=1)
+def _encoder():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None # Optional dependency; fall back to the estimate below
+
+def count_tokens(text: str) -> int:
+    """Token count via tiktoken when installed, else ~4 chars/token (1 per CJK character)."""
+    encoder = _encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    cjk = len(CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+def model_context_tokens(model_id: Optional[str], provider_config: Optional[Dict] = None) -> int:
+    """Context window of model_id; provider_config['context_tokens'] overrides it (custom models)."""
+    try:
+        override = int((provider_config or {}).get("context_tokens") or 0)
+    except (TypeError, ValueError):
+        override = 0
+    if override > 0:
+        return override
+    model = (model_id or "").lower()
+    for name, tokens in MODEL_CONTEXT_TOKENS.items():
+        if model.startswith(name):
+            return tokens
+    return DEFAULT_CONTEXT_TOKENS
+
+def chunk_token_budget(model_id: Optional[str], provider_config: Optional[Dict] = None) -> int:
+    """Chunk size for this model: the configured size, capped at a quarter of its context (prompt + output need the rest)."""
+    provider_config = provider_config or {}
+    try:
+        budget = int(provider_config.get("chunk_tokens") or CHUNK_TOKENS)
+    except (TypeError, ValueError):
+        budget = CHUNK_TOKENS
+    return max(200, min(budget, model_context_tokens(model_id, provider_config) // 4))
+
+def format_segment(segment: Dict) -> str:
+    return f"[{segment['time']}] {segment.get('speaker', 'Speaker')}: {segment['text']}"
+
+def _format_time(seconds: float) -> str:
+    seconds = int(seconds)
+    h, m, s = seconds // 3600, seconds % 3600 // 60, seconds % 60
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
+
+def _split_text(text: str, budget: int) -> List[str]:
+    """Splits text into pieces of at most ~budget tokens, between words where possible."""
+    pieces, current, size = [], [], 0
+    for word in WORD_RE.findall(text) or [text]:
+        tokens = count_tokens(word)
+        if tokens > budget:
+            # No usable word boundary (e.g. unspaced CJK): hard-cut by characters
+            step = max(1, len(word) * budget // tokens)
+            parts = [word[i:i + step] for i in range(0, len(word), step)]
+        else:
+            parts = [word]
+        for part in parts:
+            part_tokens = count_tokens(part)
+            if current and size + part_tokens > budget:
+                pieces.append("".join(current).strip())
+                current, size = [], 0
+            current.append(part)
+            size += part_tokens
+    if current:
+        pieces.append("".join(current).strip())
+    return [p for p in pieces if p]
+
+def _split_oversized(segments: List[Dict], max_tokens: int) -> List[Dict]:
+    """
+    Splits any segment whose line alone exceeds max_tokens into consecutive
+    pieces of the same speaker, so no chunk can outgrow the model's context.
+    Each piece gets a start_seconds interpolated (by length) up to the next
+    segment's start.
+    """
+    result = []
+    for i, segment in enumerate(segments):
+        if count_tokens(format_segment(segment)) + 1 <= max_tokens:
+            result.append(segment)
+            continue
+        # Room left for text once the "[time] Speaker: " prefix and newline are paid for
+        overhead = count_tokens(format_segment({**segment, "text": ""})) + 2
+        # Word counts are only additive approximately, so keep a margin
+        pieces = _split_text(segment["text"], max(1, int((max_tokens - overhead) * 0.9)))
+        start = segment["start_seconds"]
+        if i + 1 < len(segments) and segments[i + 1]["start_seconds"] > start:
+            end = segments[i + 1]["start_seconds"]
+        else:
+            end = start + count_tokens(segment["text"]) / SPEECH_TOKENS_PER_SEC
+        total = sum(len(p) for p in pieces) or 1
+        offset = 0
+        for piece in pieces:
+            piece_start = start + (end - start) * offset / total
+            result.append({**segment, "text": piece, "start_seconds": piece_start, "time": _format_time(piece_start)})
+            offset += len(piece)
+        print(f"Split a {count_tokens(segment['text'])}-token segment at {segment.get('time')} into {len(pieces)} pieces")
+    return result
+
+def _is_boundary(segments: List[Dict], i: int) -> bool:
+    """True if a chunk may start at segment i: a speaker turn, or after a sentence end."""
+    if i <= 0 or i >= len(segments):
+        return True
+    if segments[i].get("speaker", "Speaker") != segments[i - 1].get("speaker", "Speaker"):
+        return True
+    return bool(SENTENCE_END_RE.search(segments[i - 1]["text"].rstrip()))
+
+def _snap(segments: List[Dict], cut: int, lowest: int) -> int:
+    """Moves a cut back to the nearest boundary >= lowest, or leaves it if there is none."""
+    for i in range(cut, lowest - 1, -1):
+        if _is_boundary(segments, i):
+            return i
+    return cut
+
+def chunk_segments_by_tokens(segments: List[Dict], max_tokens: int = CHUNK_TOKENS,
+                             overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> List[Dict]:
+    """
+    Packs transcript segments into chunks of at most max_tokens, in one pass
+    with two pointers. A single segment larger than that (a long caption or
+    Whisper segment) is first split between words into several segments.
+
+    Cuts prefer speaker turns (then sentence ends) within the last SNAP_WINDOW
+    of a chunk; each chunk after the first starts ~overlap_tokens back, also
+    snapped to a boundary.
+
+    Returns [{'index', 'start', 'end', 'text', 'tokens'}] with start/end in seconds,
+    the same shape chunk_transcript produces.
+    """
+    if not segments:
+        return []
+    overlap_tokens = max(0, min(overlap_tokens, max_tokens // 2))
+    segments = _split_oversized(segments, max_tokens)
+    n = len(segments)
+    lines = [format_segment(s) for s in segments]
+    prefix = [0]
+    for line in lines:
+        prefix.append(prefix[-1] + count_tokens(line) + 1) # +1 for the newline
+
+    chunks: List[Dict] = []
+    lo = 0 # first segment of the current chunk
+    hi = 0 # one past its last segment
+    while lo < n:
+        hi = max(hi, lo + 1)
+        while hi < n and prefix[hi + 1] - prefix[lo] <= max_tokens:
+            hi += 1
+        if hi < n:
+            # Snap the cut back to a turn, but never below SNAP_WINDOW of the chunk
+            floor_tokens = prefix[lo] + (prefix[hi] - prefix[lo]) * (1 - SNAP_WINDOW)
+            lowest = hi
+            while lowest - 1 > lo and prefix[lowest - 1] >= floor_tokens:
+                lowest -= 1
+            hi = _snap(segments, hi, lowest)
+
+        chunks.append({
+            "index": len(chunks),
+            "start": segments[lo]["start_seconds"],
+            "end": segments[hi]["start_seconds"] if hi < n else segments[-1]["start_seconds"] + 10,
+            "text": "\n".join(lines[lo:hi]),
+            "tokens": prefix[hi] - prefix[lo],
+        })
+        if hi >= n:
+            break
+
+        # Next chunk starts overlap_tokens before the cut, always past lo so we progress
+        nxt = hi
+        while nxt - 1 > lo and prefix[hi] - prefix[nxt - 1] <= overlap_tokens:
+            nxt -= 1
+        if nxt < hi:
+            snapped = _snap(segments, nxt, lo + 1)
+            nxt = snapped if prefix[hi] - prefix[snapped] <= overlap_tokens * 2 else nxt
+        lo = nxt
+    return chunks
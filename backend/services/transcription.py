@@ -1,14 +1,23 @@
-from services.transcription_factory import get_transcription_provider
+import asyncio
+from services.transcription_factory import get_transcription_provider, TranscriptionProvider
+from services.cache import cache_service
 
-def fetch_transcript(url: str, provider_config: dict = None):
-    """
-    Fetches transcript using the configured provider.
-    provider_config = { 'transcription_provider': 'youtube' | 'deepgram', 'deepgram_key': '...' }
-    """
-    provider_config = provider_config or {}
-    provider_type = provider_config.get('transcription_provider', 'youtube')
+def _media_cache_identity(url: str, provider_config: dict):
+    """(video_id, provider, language) identifying a transcript independent of model/prompt."""
+    provider_type = provider_config.get('transcription_provider') or 'youtube'
+    video_id = TranscriptionProvider()._get_video_id(url)
+    return video_id, provider_type, provider_config.get('input_language') or 'auto'
+
+def get_cached_transcript(url: str, provider_config: dict = None):
+    """Returns the cached transcript for this media/provider/language, or None."""
+    try:
+        return cache_service.get_transcript(*_media_cache_identity(url, provider_config or {}))
+    except ValueError:
+        return None # Not a URL we can identify
+
+def _provider_for(provider_config: dict):
     provider_type = provider_config.get('transcription_provider', 'youtube')
-    
+
     # Extract appropriate key
     api_key = None
     if provider_type == 'deepgram':
@@ -18,10 +27,49 @@ def fetch_transcript(url: str, provider_config: dict = None):
     elif provider_type == 'uniscribe':
         api_key = provider_config.get('uniscribe_key')
     
-    input_language = provider_config.get('input_language')
+    return get_transcription_provider(provider_type, api_key)
+
+def _cache_fetched(url: str, provider_config: dict, transcript: dict):
+    if transcript.get("segments"):
+        try:
+            cache_service.set_transcript(*_media_cache_identity(url, provider_config), transcript)
+        except Exception as e:
+            print(f"Warning: failed to cache transcript: {e}")
+
+def fetch_transcript(url: str, provider_config: dict = None):
+    """
+    Fetches transcript using the configured provider.
+    provider_config = { 'transcription_provider': 'youtube' | 'deepgram', 'deepgram_key': '...' }
+    Transcripts are cached per (video_id, provider, language), so re-analysing the
+    same episode with another model or prompt skips the download and transcription.
+    """
+    provider_config = provider_config or {}
+    cached = get_cached_transcript(url, provider_config)
+    if cached:
+        return cached
     
-    provider = get_transcription_provider(provider_type, api_key)
-    return provider.fetch(url, language=input_language)
+    provider = _provider_for(provider_config)
+    transcript = provider.fetch(url, language=provider_config.get('input_language'))
+    _cache_fetched(url, provider_config, transcript)
+    return transcript
+
+async def fetch_transcript_async(url: str, provider_config: dict = None, check_cache: bool = True):
+    """
+    Same as fetch_transcript, for the event loop. Blocking providers run on a
+    worker thread; providers that wait on a remote job (Uniscribe) wait on
+    the loop itself instead of holding a thread.
+    Pass check_cache=False when the caller has just looked the transcript up.
+    """
+    provider_config = provider_config or {}
+    if check_cache:
+        cached = await asyncio.to_thread(get_cached_transcript, url, provider_config)
+        if cached:
+            return cached
+
+    provider = _provider_for(provider_config)
+    transcript = await provider.fetch_async(url, language=provider_config.get('input_language'))
+    await asyncio.to_thread(_cache_fetched, url, provider_config, transcript)
+    return transcript
 
 def process_manual_transcript(text: str):
     """
@@ -1,26 +1,68 @@
+import asyncio
+import hashlib
 import os
+import glob
 import shutil
 import re
-from typing import Dict, Optional, List
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api.formatters import JSONFormatter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, Optional, List, Tuple
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+from youtube_transcript_api import YouTubeTranscriptApi, NoTranscriptFound, TranscriptsDisabled
+import httpx
+import requests
 import yt_dlp
+from services.audio_chunking import ChunkPlanner, parse_silencedetect, plan_chunks, stitch_chunks
+from services.audio_stream import (
+    STREAMING_ENABLED, SPEECH_FORMAT, iter_speech_audio, resolve_media_stream, transcode_and_plan, transcode_to_file
+)
+from services.captions import compact_cues, format_stats
+from services.llm_factory import HTTP_LIMITS, HTTP_TIMEOUT, get_http_client
+from services.rate_limiter import get_limiter, parse_retry_after
+from services.remote_tasks import remote_task_waiter
+from services.scratch import ScratchQuotaExceeded, scratch_space
+
+YOUTUBE_ID_RE = re.compile(r"^[0-9A-Za-z_-]{11}$")
+YOUTUBE_PATH_RE = re.compile(r"^/(?:embed|shorts|live|v)/([0-9A-Za-z_-]{11})")
+
+def _is_host(host: str, domain: str) -> bool:
+    return host == domain or host.endswith("." + domain)
 
 class TranscriptionProvider:
     def fetch(self, url: str, language: str = None) -> Dict:
         raise NotImplementedError("Subclasses must implement fetch")
 
+    async def fetch_async(self, url: str, language: str = None) -> Dict:
+        """Providers are blocking by default (yt-dlp, ffmpeg, SDKs), so run them on a worker thread."""
+        return await asyncio.to_thread(self.fetch, url, language)
+
     def _get_video_id(self, url: str) -> str:
-        # 1. Try YouTube patterns
-        patterns = [r'(?:v=|\/)([0-9A-Za-z_-]{11}).*', r'(?:youtu\.be\/)([0-9A-Za-z_-]{11})']
-        for p in patterns:
-            match = re.search(p, url)
-            if match: return match.group(1)
-        
+        """
+        The YouTube video id for youtube.com / youtu.be URLs; for any other
+        URL 'url_' + a hash of the whole normalised URL (this keys the
+        transcript cache, so two episodes must never share an id).
+        """
+        parts = urlsplit(url.strip())
+        host = (parts.hostname or "").lower()
+
+        # 1. YouTube: the id lives in a known place, never in an arbitrary path segment
+        if _is_host(host, "youtu.be"):
+            candidate = parts.path.strip("/").split("/")[0]
+            if YOUTUBE_ID_RE.match(candidate):
+                return candidate
+        elif _is_host(host, "youtube.com") or _is_host(host, "youtube-nocookie.com"):
+            candidate = (parse_qs(parts.query).get("v") or [""])[0]
+            if YOUTUBE_ID_RE.match(candidate):
+                return candidate
+            match = YOUTUBE_PATH_RE.match(parts.path)
+            if match:
+                return match.group(1)
+
         # 2. Generic URL Support (return hash)
-        if url.startswith("http"):
-            import hashlib
-            return f"url_{hashlib.md5(url.encode()).hexdigest()[:8]}"
+        if parts.scheme.lower() in ("http", "https") and host:
+            netloc = host if parts.port in (None, 80, 443) else f"{host}:{parts.port}"
+            normalised = urlunsplit((parts.scheme.lower(), netloc, parts.path or "/", parts.query, ""))
+            return f"url_{hashlib.sha256(normalised.encode()).hexdigest()[:16]}"
 
         raise ValueError("Invalid URL")
 
@@ -51,11 +93,13 @@ class YouTubeCaptionsProvider(TranscriptionProvider):
     Default free provider using community captions or auto-generated captions.
     Fast, free, but NO speaker labels (Diarization).
     """
+    CAPTION_LANGUAGES = ['en', 'es', 'fr', 'de', 'it', 'pt', 'ru', 'ja', 'zh-Hans']
+    OEMBED_URL = "https://www.youtube.com/oembed"
+    # Shared so caption and oEmbed requests reuse warm keep-alive connections
+    _session: Optional[requests.Session] = None
+    _api: Optional[YouTubeTranscriptApi] = None
+
     def fetch(self, url: str, language: str = None) -> Dict:
-        # Captions usually don't need ffmpeg unless burning/converting, 
-        # but yt-dlp might use it for merging. Safe to ensure.
-        self._ensure_ffmpeg() 
-        
         # Restrict to YouTube
         if not ("youtube.com" in url or "youtu.be" in url) and not ("mock" in url or "test_video" in url):
              raise ValueError("Free transcription (Captions) is restricted to YouTube. Please use Deepgram or Whisper for direct audio/video files.")
@@ -66,45 +110,50 @@ class YouTubeCaptionsProvider(TranscriptionProvider):
         if "mock" in url or "test_video" in url:
              return self._get_mock(video_id)
 
+        # 1. Fast path: caption track fetched and parsed in memory
+        try:
+            return self._fetch_in_memory(video_id, language)
+        except (NoTranscriptFound, TranscriptsDisabled) as e:
+            # yt-dlp reads the same caption list, so it would not find anything either
+            print(f"No captions listed for {video_id}: {type(e).__name__}")
+            raise Exception("No English captions available for this video.")
+        except Exception as e:
+            print(f"In-memory caption fetch failed ({type(e).__name__}: {e}), falling back to yt-dlp...")
+
+        # 2. Fallback: yt-dlp writes a .vtt file. It might use ffmpeg for conversions.
+        self._ensure_ffmpeg() 
         print(f"Fetching YouTube Captions (via yt-dlp) for {video_id}...")
-        import uuid
-        temp_uuid = str(uuid.uuid4())
-        base_filename = f"temp_subs_{temp_uuid}"
-        
         try:
-            # 1. Download Subtitles using yt-dlp
-            ydl_opts = {
-                'skip_download': True,
-                'writeautomaticsub': True,
-                'writesubtitles': True,
-                'subtitleslangs': [language] if language and language != 'auto' else ['en', 'es', 'fr', 'de', 'it', 'pt', 'ru', 'ja', 'zh-Hans', 'auto'],
-                'outtmpl': base_filename,
-                'quiet': True,
-                'no_warnings': True
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                title = info.get('title', f"YouTube Video ({video_id})")
-                duration = info.get('duration', 0)
-
-            # 2. Find the .vtt file
-            vtt_path = f"{base_filename}.en.vtt"
-            if not os.path.exists(vtt_path):
-                # Try finding any vtt that starts with base_filename
-                files = [f for f in os.listdir('.') if f.startswith(base_filename) and f.endswith('.vtt')]
-                if files:
-                    vtt_path = files[0]
-                else:
-                    raise Exception("No subtitles found for this video. (yt-dlp failed to download .vtt)")
-            
-            # 3. Parse VTT
-            segments = self._parse_vtt(vtt_path)
-            
-            # Cleanup
-            try:
-                if os.path.exists(vtt_path): os.remove(vtt_path)
-            except: pass
+            with scratch_space.job_dir("captions") as workdir:
+                base_filename = os.path.join(workdir, "subs")
+
+                # 1. Download Subtitles using yt-dlp
+                ydl_opts = {
+                    'skip_download': True,
+                    'writeautomaticsub': True,
+                    'writesubtitles': True,
+                    'subtitleslangs': [language] if language and language != 'auto' else ['en', 'es', 'fr', 'de', 'it', 'pt', 'ru', 'ja', 'zh-Hans', 'auto'],
+                    'outtmpl': base_filename,
+                    'quiet': True,
+                    'no_warnings': True
+                }
+                
+                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    info = ydl.extract_info(url, download=True)
+                    title = info.get('title', f"YouTube Video ({video_id})")
+                    duration = info.get('duration', 0)
+
+                # 2. Find the .vtt file (the job directory holds nothing else)
+                vtt_path = f"{base_filename}.en.vtt"
+                if not os.path.exists(vtt_path):
+                    files = sorted(glob.glob(os.path.join(workdir, "*.vtt")))
+                    if files:
+                        vtt_path = files[0]
+                    else:
+                        raise Exception("No subtitles found for this video. (yt-dlp failed to download .vtt)")
+                
+                # 3. Parse VTT
+                segments = self._parse_vtt(vtt_path)
 
             return {
                 "video_id": video_id,
@@ -114,29 +163,76 @@ class YouTubeCaptionsProvider(TranscriptionProvider):
             }
             
         except Exception as e:
-            # Cleanup in case of error
-            try:
-                for f in os.listdir('.'):
-                    if f.startswith(base_filename): os.remove(f)
-            except: pass
-            
             err = str(e)
             print(f"yt-dlp subs error: {err}")
             if "No subtitles found" in err:
                 raise Exception("No English captions available for this video.")
             raise Exception(f"Failed to fetch captions: {err}")
 
+    def _fetch_in_memory(self, video_id: str, language: Optional[str]) -> Dict:
+        """
+        Reads the caption track through youtube_transcript_api: two HTTP requests,
+        no subprocess, no files. The title comes from oEmbed, fetched in parallel.
+        """
+        print(f"Fetching YouTube Captions (in memory) for {video_id}...")
+        if YouTubeCaptionsProvider._api is None:
+            YouTubeCaptionsProvider._session = requests.Session()
+            YouTubeCaptionsProvider._api = YouTubeTranscriptApi(http_client=YouTubeCaptionsProvider._session)
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            title_future = pool.submit(self._fetch_title, video_id)
+
+            transcripts = self._api.list(video_id)
+            if language and language != 'auto':
+                transcript = transcripts.find_transcript([language])
+            else:
+                try:
+                    # Manually created tracks win over auto-generated ones in the same language
+                    transcript = transcripts.find_transcript(self.CAPTION_LANGUAGES)
+                except NoTranscriptFound:
+                    transcript = next(iter(transcripts), None)
+                    if transcript is None:
+                        raise
+            snippets = transcript.fetch()
+
+            segments = self._segments_from_cues([
+                {"start": snippet.start, "end": snippet.start + snippet.duration, "lines": [snippet.text]}
+                for snippet in snippets
+            ])
+            if not segments:
+                raise Exception("Caption track is empty.")
+
+            last = snippets[-1]
+            return {
+                "video_id": video_id,
+                "title": title_future.result() or f"YouTube Video ({video_id})",
+                "duration": int(last.start + last.duration),
+                "segments": segments
+            }
+
+    def _fetch_title(self, video_id: str) -> Optional[str]:
+        try:
+            resp = self._session.get(
+                self.OEMBED_URL,
+                params={"url": f"https://www.youtube.com/watch?v={video_id}", "format": "json"},
+                timeout=5
+            )
+            resp.raise_for_status()
+            return resp.json().get("title")
+        except Exception as e:
+            print(f"oEmbed title lookup failed: {e}")
+            return None
+
     def _parse_vtt(self, vtt_path: str) -> List[Dict]:
-        segments = []
         with open(vtt_path, 'r', encoding='utf-8') as f:
             lines = f.readlines()
         
-        # Simple VTT parser
-        # Skip header
-        current_start = 0.0
-        current_text = []
-        
+        # Simple VTT parser: collect cues, then compact them (rolling duplicates, sentences)
+        cues = []
         time_pattern = re.compile(r'(\d{2}:)?(\d{2}):(\d{2})\.(\d{3}) --> (\d{2}:)?(\d{2}):(\d{2})\.(\d{3})')
+
+        def to_seconds(h, m, s, ms):
+            return (int(h.replace(':', '')) if h else 0) * 3600 + int(m) * 60 + int(s) + int(ms) / 1000.0
         
         for line in lines:
             line = line.strip()
@@ -147,45 +243,29 @@ class YouTubeCaptionsProvider(TranscriptionProvider):
             
             match = time_pattern.search(line)
             if match:
-                # If we have previous text, save it
-                if current_text:
-                    text = " ".join(current_text)
-                    # Filter out purely metadata tags if any, simpler validation
-                    text = re.sub(r'<[^>]+>', '', text) 
-                    if text.strip():
-                        segments.append({
-                            "speaker": "Speaker",
-                            "time": self._format_timestamp(current_start),
-                            "start_seconds": current_start,
-                            "text": text
-                        })
-                
-                # Parse new start time
-                # match groups: 1=h, 2=m, 3=s, 4=ms
-                h = int(match.group(1).replace(':', '')) if match.group(1) else 0
-                m = int(match.group(2))
-                s = int(match.group(3))
-                ms = int(match.group(4))
-                current_start = h * 3600 + m * 60 + s + ms / 1000.0
-                current_text = []
-            else:
-                 # It's text (or IDs), append if not just digits
-                 if not line.isdigit():
-                     current_text.append(line)
-        
-        # Append last
-        if current_text:
-            text = " ".join(current_text)
-            text = re.sub(r'<[^>]+>', '', text)
-            if text.strip():
-                segments.append({
-                    "speaker": "Speaker",
-                    "time": self._format_timestamp(current_start),
-                    "start_seconds": current_start,
-                    "text": text
+                cues.append({
+                    "start": to_seconds(*match.group(1, 2, 3, 4)),
+                    "end": to_seconds(*match.group(5, 6, 7, 8)),
+                    "lines": []
                 })
+            elif cues and not line.isdigit():
+                # It's text (cue IDs are bare digits)
+                cues[-1]["lines"].append(line)
         
-        return segments
+        return self._segments_from_cues(cues)
+
+    def _segments_from_cues(self, cues: List[Dict]) -> List[Dict]:
+        compacted, stats = compact_cues(cues)
+        print(f"Caption compaction: {format_stats(stats)}")
+        return [
+            {
+                "speaker": "Speaker",
+                "time": self._format_timestamp(start),
+                "start_seconds": start,
+                "text": text
+            }
+            for start, text in compacted
+        ]
 
     def _get_mock(self, video_id):
         return {
@@ -213,38 +293,57 @@ class DeepgramProvider(TranscriptionProvider):
         video_id = self._get_video_id(url)
         print(f"Deepgram: extracting audio for {video_id}...")
         
-        # 1. Download Audio
-        import uuid
-        temp_uuid = str(uuid.uuid4())
-        audio_path_base = f"temp_{temp_uuid}"
+        with scratch_space.job_dir("deepgram") as workdir:
+            return self._fetch(url, video_id, language, workdir)
+
+    def _fetch(self, url: str, video_id: str, language: Optional[str], workdir: str) -> Dict:
+        # 1. Download Audio (only used when streaming is unavailable)
+        audio_path_base = os.path.join(workdir, "audio")
         final_audio_path = f"{audio_path_base}.mp3"
         
         try:
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }],
-                'outtmpl': audio_path_base, # yt-dlp adds extension
-                'quiet': True,
-                'no_warnings': True
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            # Prefer streaming: ffmpeg transcodes the remote stream and the upload
+            # consumes it as it is produced, so nothing touches the disk.
+            audio_stream = None
+            if STREAMING_ENABLED:
                 try:
-                    info = ydl.extract_info(url, download=True)
+                    info, media_url, http_headers = resolve_media_stream(url)
                     title = info.get('title', f"Video {video_id}")
                     duration = info.get('duration', 0)
-                except Exception as dl_err:
-                    # Fallback: if yt-dlp fails on generic URL but it IS a file, maybe wget/requests?
-                    # For now, rely on yt-dlp specific error
-                    raise Exception(f"Download Validation Failed: {str(dl_err)}")
+                    audio_stream = iter_speech_audio(media_url, http_headers)
+                except Exception as stream_err:
+                    print(f"Deepgram: streaming unavailable ({stream_err}), downloading instead...")
+
+            if audio_stream is None:
+                quota_hook = scratch_space.progress_hook(workdir)
+                ydl_opts = {
+                    'format': 'bestaudio/best',
+                    'postprocessors': [{
+                        'key': 'FFmpegExtractAudio',
+                        'preferredcodec': 'mp3',
+                        'preferredquality': '192',
+                    }],
+                    'outtmpl': audio_path_base, # yt-dlp adds extension
+                    'quiet': True,
+                    'no_warnings': True,
+                    # Stop the download once scratch space runs out, not only at job start
+                    'progress_hooks': [quota_hook],
+                    'postprocessor_hooks': [quota_hook]
+                }
                 
-            # Check file existence (yt-dlp might produce temp_id.mp3)
-            if not os.path.exists(final_audio_path):
-                 raise Exception("Audio download failed or file not found.")
+                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    try:
+                        info = ydl.extract_info(url, download=True)
+                        title = info.get('title', f"Video {video_id}")
+                        duration = info.get('duration', 0)
+                    except Exception as dl_err:
+                        # Fallback: if yt-dlp fails on generic URL but it IS a file, maybe wget/requests?
+                        # For now, rely on yt-dlp specific error
+                        raise Exception(f"Download Validation Failed: {str(dl_err)}")
+                    
+                # Check file existence (yt-dlp might produce audio.mp3)
+                if not os.path.exists(final_audio_path):
+                     raise Exception("Audio download failed or file not found.")
 
             # 2. Call Deepgram
             # 2. Call Deepgram
@@ -256,7 +355,7 @@ class DeepgramProvider(TranscriptionProvider):
             # Increasing timeout for large file uploads
             deepgram = DeepgramClient(api_key=self.api_key)
             
-            with open(final_audio_path, "rb") as audio:
+            with (nullcontext(audio_stream) if audio_stream is not None else open(final_audio_path, "rb")) as audio:
                 # Prepare options dict
                 options = {
                     "model": "nova-2", 
@@ -276,11 +375,14 @@ class DeepgramProvider(TranscriptionProvider):
                 print(f"Deepgram Options: {options}")
 
                 # Deepgram v3: transcribe_file request must be the file object itself (bytes/iterator)
+                # (a generator when streaming, sent with chunked transfer encoding)
                 # NOT a dict wrapper like {'buffer': audio}
-                response = deepgram.listen.v1.media.transcribe_file(
-                    request=audio,
-                    **options
-                )
+                # Shared with every other job on this key (RATE_LIMIT_DEEPGRAM_* env vars)
+                with get_limiter("deepgram", self.api_key).slot_blocking(f"deepgram-{video_id}"):
+                    response = deepgram.listen.v1.media.transcribe_file(
+                        request=audio,
+                        **options
+                    )
                 
             # 3. Parse Response
             # Deepgram SDK v3 returns objects, not dicts. Use attribute access.
@@ -335,15 +437,6 @@ class DeepgramProvider(TranscriptionProvider):
                  print(f"Response dir: {dir(response)}")
                  raise parse_err
 
-            # Cleanup
-            try:
-                if os.path.exists(final_audio_path):
-                    os.remove(final_audio_path)
-            except PermissionError:
-                print(f"Warning: Could not remove temp file {final_audio_path} (locked by process). It will remain until next cleanup.")
-            except Exception as e:
-                print(f"Warning: Error removing temp file: {e}")
-            
             return {
                 "video_id": video_id,
                 "title": title,
@@ -353,12 +446,6 @@ class DeepgramProvider(TranscriptionProvider):
             
         except Exception as e:
             print(f"Deepgram Error: {e}")
-            # Try cleanup in error case too
-            try:
-                if 'final_audio_path' in locals() and os.path.exists(final_audio_path):
-                     os.remove(final_audio_path)
-            except: 
-                pass
             raise e
 
 
@@ -366,7 +453,8 @@ class DeepgramProvider(TranscriptionProvider):
 
 
 import subprocess
-import glob
+import random
+import time
 
 class BaseWhisperProvider(TranscriptionProvider):
     """
@@ -374,7 +462,16 @@ class BaseWhisperProvider(TranscriptionProvider):
     Handles download, size check, chunking (if needed), and transcription loop.
     """
     CHUNK_SIZE_LIMIT_MB = 24
-    SEGMENT_TIME_SEC = 900
+    # Target chunk length. Cuts land on the pause nearest this point, so chunks
+    # can stay short (more parallelism) without splitting words.
+    SEGMENT_TIME_SEC = int(os.getenv("WHISPER_CHUNK_SEC", "300"))
+    CHUNK_OVERLAP_SEC = float(os.getenv("WHISPER_CHUNK_OVERLAP_SEC", "1.5")) # Only used when no pause is near a cut
+    SILENCE_NOISE_DB = "-35dB"
+    SILENCE_MIN_SEC = 0.4
+    MAX_CONCURRENT_CHUNKS = int(os.getenv("WHISPER_MAX_CONCURRENCY", "6"))
+    MAX_RETRIES = int(os.getenv("WHISPER_MAX_RETRIES", "3"))
+    RETRY_BASE_DELAY_SEC = 2.0
+    RATE_LIMIT_NAME = "whisper" # Cross-job limits via RATE_LIMIT_WHISPER_RPM / _CONCURRENCY
 
     def __init__(self, api_key: str, base_url: str = None):
         self.api_key = api_key
@@ -386,149 +483,205 @@ class BaseWhisperProvider(TranscriptionProvider):
     def _get_model_name(self):
         return "whisper-1"
 
-    def _get_audio_duration(self, file_path: str) -> float:
+    def _detect_silences(self, audio_path: str) -> Tuple[List[Tuple[float, float]], Optional[float]]:
+        """Runs ffmpeg silencedetect (decode only, no output file). Returns ([(start, end)], duration)."""
+        cmd = [
+            "ffmpeg", "-hide_banner", "-nostats", "-i", audio_path,
+            "-af", f"silencedetect=noise={self.SILENCE_NOISE_DB}:d={self.SILENCE_MIN_SEC}",
+            "-f", "null", "-"
+        ]
         try:
-            cmd = [
-                "ffprobe", 
-                "-v", "error", 
-                "-show_entries", "format=duration", 
-                "-of", "default=noprint_wrappers=1:nokey=1", 
-                file_path
-            ]
-            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            return float(result.stdout.strip())
-        except:
-            return 0.0
+            proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors="replace", check=True)
+        except Exception as e:
+            print(f"Silence detection failed, falling back to fixed cuts: {e}")
+            return [], None
+        return parse_silencedetect(proc.stderr)
+
+    def _plan_audio_chunks(self, audio_path: str, duration: float) -> List[Tuple[float, float]]:
+        """Plans [(start, end)] chunks of ~SEGMENT_TIME_SEC, cut at pauses where possible."""
+        silences, detected_duration = self._detect_silences(audio_path)
+        plan = plan_chunks(detected_duration or duration, silences, self.SEGMENT_TIME_SEC, overlap_sec=self.CHUNK_OVERLAP_SEC)
+        print(f"Planned {len(plan)} chunks from {len(silences)} detected pauses.")
+        return plan
+
+    def _cut_chunk(self, audio_path: str, audio_path_base: str, index: int, start: float, end: float) -> str:
+        chunk_file = f"{audio_path_base}_chunk_{index:03d}{os.path.splitext(audio_path)[1]}"
+        cmd = [
+            "ffmpeg", "-y", "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}",
+            "-i", audio_path, "-c", "copy", chunk_file
+        ]
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        return chunk_file
+
+    def _transcribe_span(self, client, audio_path: str, audio_path_base: str, start: float, end: float,
+                         language: Optional[str], index: int, total: Optional[int]) -> List[Dict]:
+        """Cuts one planned chunk (inside the worker, so cutting overlaps uploads) and transcribes it."""
+        chunk_file = audio_path if total == 1 else self._cut_chunk(audio_path, audio_path_base, index, start, end)
+        return self._transcribe_chunk(client, chunk_file, start, language, index, total)
+
+    def _transcribe_chunk(self, client, chunk_file: str, time_offset: float, language: Optional[str], index: int, total: Optional[int]) -> List[Dict]:
+        """Transcribes one chunk with retry/backoff and returns its segments shifted by time_offset."""
+        transcript = None
+        limiter = get_limiter(self.RATE_LIMIT_NAME, self.api_key)
+        for attempt in range(self.MAX_RETRIES):
+            try:
+                print(f"Transcribing segment {index+1}/{total or '?'} (attempt {attempt+1})...")
+                with limiter.slot_blocking(f"whisper-{id(self)}"), open(chunk_file, "rb") as audio_file:
+                    transcript = client.audio.transcriptions.create(
+                        model=self._get_model_name(), 
+                        file=audio_file, 
+                        response_format="verbose_json",
+                        language=language if language and language != 'auto' else None
+                    )
+                break
+            except Exception as e:
+                print(f"Error transcribing chunk {index+1} (Attempt {attempt+1}): {e}")
+                if "403" in str(e) or "authorized" in str(e).lower():
+                    raise Exception("Provider Access Denied (403). This API key (likely Grok/X.ai) does not support Audio Transcription. Please use Deepgram or OpenAI.")
+                if attempt + 1 >= self.MAX_RETRIES:
+                    raise e
+                delay = self.RETRY_BASE_DELAY_SEC * (2 ** attempt) + random.uniform(0, 1)
+                if getattr(e, "status_code", None) == 429:
+                    # Honour Retry-After and hold the other chunks/jobs on this key too
+                    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+                    delay = parse_retry_after(headers.get("retry-after"), default=delay)
+                    limiter.pause(delay)
+                time.sleep(delay)
+        
+        segments = []
+        if hasattr(transcript, 'segments') and transcript.segments:
+            for s in transcript.segments:
+                start = s.start + time_offset
+                segments.append({
+                    "speaker": "Speaker",
+                    "time": self._format_timestamp(start),
+                    "start_seconds": start,
+                    "text": s.text.strip()
+                })
+        else:
+             # Fallback
+             segments.append({
+                 "speaker": "Speaker",
+                 "time": self._format_timestamp(time_offset),
+                 "start_seconds": time_offset,
+                 "text": transcript.text
+             })
+        return segments
 
     def fetch(self, url: str, language: str = None) -> Dict:
         self._ensure_ffmpeg()
         video_id = self._get_video_id(url)
         print(f"{self.__class__.__name__}: extracting audio for {video_id}...")
-        
-        import uuid
-        temp_uuid = str(uuid.uuid4())
-        audio_path_base = f"temp_whisper_{temp_uuid}"
+
+        if STREAMING_ENABLED:
+            try:
+                info, media_url, http_headers = resolve_media_stream(url)
+            except Exception as e:
+                print(f"{self.__class__.__name__}: streaming unavailable ({e}), downloading instead...")
+            else:
+                with scratch_space.job_dir("whisper") as workdir:
+                    return self._fetch_streaming(info, media_url, http_headers, video_id, language, workdir)
+        with scratch_space.job_dir("whisper") as workdir:
+            return self._fetch_downloaded(url, video_id, language, workdir)
+
+    def _fetch_streaming(self, info: Dict, media_url: str, http_headers: Dict[str, str], video_id: str,
+                         language: Optional[str], workdir: str) -> Dict:
+        """
+        Single decode pass: ffmpeg transcodes the remote stream to speech Opus and
+        runs silencedetect at the same time. Each chunk is cut and sent to the
+        worker pool as soon as its audio exists, so the first segments come back
+        while a multi-hour episode is still being read.
+        """
+        audio_path_base = os.path.join(workdir, "audio")
+        audio_path = f"{audio_path_base}.{SPEECH_FORMAT}"
+        planner = ChunkPlanner(self.SEGMENT_TIME_SEC, overlap_sec=self.CHUNK_OVERLAP_SEC)
+        silence_filter = f"silencedetect=noise={self.SILENCE_NOISE_DB}:d={self.SILENCE_MIN_SEC}"
+
+        client = self._get_client()
+        chunks, futures = [], []
+        with ThreadPoolExecutor(max_workers=self.MAX_CONCURRENT_CHUNKS) as pool:
+            try:
+                plan = transcode_and_plan(media_url, http_headers, audio_path, planner, silence_filter,
+                                          on_progress=scratch_space.progress_hook(workdir))
+                for i, (start, end) in enumerate(plan):
+                    failed = next((f for f in futures if f.done() and f.exception()), None)
+                    if failed:
+                        failed.result() # Stop transcoding early; re-raises the chunk error
+                    chunks.append((start, end))
+                    futures.append(pool.submit(self._transcribe_span, client, audio_path, audio_path_base, start, end, language, i, None))
+                print(f"Audio fully read: {len(chunks)} chunk(s) planned.")
+                chunk_results = [f.result() for f in futures]
+            except Exception:
+                for f in futures: f.cancel()
+                raise
+
+        return {
+            "video_id": video_id,
+            "title": info.get('title', f"Video {video_id}"),
+            "duration": info.get('duration') or (chunks[-1][1] if chunks else 0),
+            "segments": stitch_chunks(chunk_results, chunks)
+        }
+
+    def _fetch_downloaded(self, url: str, video_id: str, language: Optional[str], workdir: str) -> Dict:
+        audio_path_base = os.path.join(workdir, "audio")
         final_audio_path = f"{audio_path_base}.mp3"
-        chunk_pattern = f"{audio_path_base}_chunk_*.mp3"
         
-        try:
-            # 1. Download Audio
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '64', 
-                }],
-                'outtmpl': audio_path_base,
-                'quiet': True,
-                'no_warnings': True
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                title = info.get('title', f"Video {video_id}")
-                duration = info.get('duration', 0)
+        # 1. Download Audio
+        quota_hook = scratch_space.progress_hook(workdir)
+        ydl_opts = {
+            'format': 'bestaudio/best',
+            'postprocessors': [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': 'mp3',
+                'preferredquality': '64', 
+            }],
+            'outtmpl': audio_path_base,
+            'quiet': True,
+            'no_warnings': True,
+            'progress_hooks': [quota_hook],
+            'postprocessor_hooks': [quota_hook]
+        }
+        
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=True)
+            title = info.get('title', f"Video {video_id}")
+            duration = info.get('duration', 0)
 
-            if not os.path.exists(final_audio_path):
-                 raise Exception("Audio download failed.")
+        if not os.path.exists(final_audio_path):
+             raise Exception("Audio download failed.")
 
-            # 2. Check Size
-            file_size_mb = os.path.getsize(final_audio_path) / (1024 * 1024)
-            chunks = [final_audio_path]
-            is_chunked = False
-            
-            if file_size_mb > self.CHUNK_SIZE_LIMIT_MB: # Safety margin for 25MB limit
-                print(f"File size {file_size_mb:.2f}MB > {self.CHUNK_SIZE_LIMIT_MB}MB. Chunking...")
-                is_chunked = True
-                # Chunk using ffmpeg
-                split_cmd = [
-                    "ffmpeg", "-i", final_audio_path,
-                    "-f", "segment",
-                    "-segment_time", str(self.SEGMENT_TIME_SEC),
-                    "-c", "copy",
-                    f"{audio_path_base}_chunk_%03d.mp3"
-                ]
-                subprocess.run(split_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-                
-                # Get chunks
-                chunks = sorted(glob.glob(chunk_pattern))
-                print(f"Split into {len(chunks)} chunks.")
-
-            # 3. Transcribe Loop
-            client = self._get_client()
-            all_segments = []
-            time_offset = 0.0
-            
-            for i, chunk_file in enumerate(chunks):
-                print(f"Transcribing segment {i+1}/{len(chunks)}...")
-                
-                # Get duration BEFORE processing (for offset calculation of next chunk)
-                # Getting precise duration of chunk is important if using -c copy
-                chunk_duration = self._get_audio_duration(chunk_file) if is_chunked else duration
-                
-                # Retry logic for API
-                transcript = None
-                for attempt in range(2):
-                    try:
-                        print(f"DEBUG: Attempting transcription with client base_url: {client.base_url}")
-                        with open(chunk_file, "rb") as audio_file:
-                            transcript = client.audio.transcriptions.create(
-                                model=self._get_model_name(), 
-                                file=audio_file, 
-                                response_format="verbose_json",
-                                language=language if language and language != 'auto' else None
-                            )
-                        break
-                    except Exception as e:
-                        print(f"Error transcribing chunk {i+1} (Attempt {attempt+1}): {e}")
-                        print(f"DEBUG: Full error details: {str(e)}")
-                        if "403" in str(e) or "authorized" in str(e).lower():
-                            raise Exception("Provider Access Denied (403). This API key (likely Grok/X.ai) does not support Audio Transcription. Please use Deepgram or OpenAI.")
-                        raise e
-                
-                if hasattr(transcript, 'segments'):
-                    for s in transcript.segments:
-                        start = s.start + time_offset
-                        text = s.text.strip()
-                        all_segments.append({
-                            "speaker": "Speaker",
-                            "time": self._format_timestamp(start),
-                            "start_seconds": start,
-                            "text": text
-                        })
-                else:
-                     # Fallback
-                     all_segments.append({
-                         "speaker": "Speaker",
-                         "time": self._format_timestamp(time_offset),
-                         "start_seconds": time_offset,
-                         "text": transcript.text
-                     })
-                
-                time_offset += chunk_duration
-
-            # Cleanup
+        # 2. Check Size
+        file_size_mb = os.path.getsize(final_audio_path) / (1024 * 1024)
+        chunks = [(0.0, float(duration or 0))]
+        
+        if file_size_mb > self.CHUNK_SIZE_LIMIT_MB or (duration or 0) > self.SEGMENT_TIME_SEC * 1.5: # Safety margin for 25MB limit
+            print(f"File is {file_size_mb:.2f}MB / {duration}s. Chunking...")
+            chunks = self._plan_audio_chunks(final_audio_path, duration or 0) or chunks
+
+        # 3. Transcribe chunks concurrently, then stitch in order
+        client = self._get_client()
+        max_workers = max(1, min(self.MAX_CONCURRENT_CHUNKS, len(chunks)))
+        print(f"Transcribing {len(chunks)} chunk(s) with up to {max_workers} in parallel...")
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [
+                pool.submit(self._transcribe_span, client, final_audio_path, audio_path_base, start, end, language, i, len(chunks))
+                for i, (start, end) in enumerate(chunks)
+            ]
             try:
-                if os.path.exists(final_audio_path): os.remove(final_audio_path)
-                for f in glob.glob(chunk_pattern): os.remove(f)
-            except: pass
+                chunk_results = [f.result() for f in futures]
+            except Exception:
+                for f in futures: f.cancel()
+                raise
+        
+        all_segments = stitch_chunks(chunk_results, chunks)
 
-            return {
-                "video_id": video_id,
-                "title": title,
-                "duration": duration,
-                "segments": all_segments
-            }
-            
-        except Exception as e:
-            try:
-                if 'final_audio_path' in locals() and os.path.exists(final_audio_path):
-                     os.remove(final_audio_path)
-                if 'chunk_pattern' in locals():
-                    for f in glob.glob(chunk_pattern): os.remove(f)
-            except: pass
-            raise e
+        return {
+            "video_id": video_id,
+            "title": title,
+            "duration": duration,
+            "segments": all_segments
+        }
 
 
 
@@ -543,28 +696,60 @@ class UniscribeProvider(TranscriptionProvider):
     Supports direct YouTube URLs and file uploads.
     """
     BASE_URL = "https://api.uniscribe.co/api/v1"
+    # Optional public URL of our /webhooks/uniscribe endpoint. When set it is sent
+    # with each task so completion wakes the waiter instead of waiting for the next poll.
+    WEBHOOK_URL = os.getenv("UNISCRIBE_WEBHOOK_URL")
+    _session: Optional[requests.Session] = None # Shared keep-alive session for the start/upload calls
 
     def __init__(self, api_key: str):
         self.api_key = api_key.strip() # Ensure no whitespace
         self.headers = {"X-API-Key": self.api_key}
 
+    @property
+    def session(self) -> requests.Session:
+        if UniscribeProvider._session is None:
+            UniscribeProvider._session = requests.Session()
+        return UniscribeProvider._session
+
     def fetch(self, url: str, language: str = None) -> Dict:
+        return asyncio.run(self._fetch_with_own_client(url, language))
+
+    async def _fetch_with_own_client(self, url: str, language: Optional[str]) -> Dict:
+        # asyncio.run() makes a throwaway loop: poll with a client closed before it
+        # ends instead of the pooled one, which would be left open (and displace
+        # the pooled client of the app's loop)
+        async with httpx.AsyncClient(timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS) as client:
+            return await self.fetch_async(url, language, client=client)
+
+    async def fetch_async(self, url: str, language: str = None, client: Optional[httpx.AsyncClient] = None) -> Dict:
+        """
+        Starting the task (and any download/upload) runs on a worker thread;
+        waiting for Uniscribe to finish happens on the event loop, so a long
+        transcription no longer holds a thread. Polls with the pooled client
+        unless one is given.
+        """
         video_id = self._get_video_id(url)
-        
+        task_id, title, duration = await asyncio.to_thread(self._start_task_limited, url, video_id, language)
+        return await self._poll_and_parse(task_id, video_id, title, duration, client=client)
+
+    def _start_task_limited(self, url: str, video_id: str, language: Optional[str]) -> Tuple[str, Optional[str], Optional[float]]:
+        """Task creation counts against RATE_LIMIT_UNISCRIBE_* (shared by all jobs on this key)."""
+        with get_limiter("uniscribe", self.api_key).slot_blocking(f"uniscribe-{video_id}"):
+            return self._start_task(url, video_id, language)
+
+    def _start_task(self, url: str, video_id: str, language: Optional[str]) -> Tuple[str, Optional[str], Optional[float]]:
         # Check if it's a YouTube URL
         if "youtube.com" in url or "youtu.be" in url:
             print(f"Uniscribe: Using YouTube endpoint for {video_id}...")
-            return self._transcribe_youtube(url, video_id, language)
+            return self._start_youtube_task(url, video_id, language), None, None
         
         # Fallback to file download & upload
         print(f"Uniscribe: Downloading generic URL for {video_id}...")
         self._ensure_ffmpeg()
-        return self._transcribe_file(url, video_id, language)
+        with scratch_space.job_dir("uniscribe") as workdir:
+            return self._start_file_task(url, video_id, language, workdir)
 
-    def _transcribe_youtube(self, url: str, video_id: str, language: str = None) -> Dict:
-        import requests
-        import time
-        
+    def _start_youtube_task(self, url: str, video_id: str, language: str = None) -> str:
         # 1. Start Job
         try:
             # Helper to run request with configurable language
@@ -576,8 +761,10 @@ class UniscribeProvider(TranscriptionProvider):
                 }
                 if lang_code:
                     payload["language_code"] = lang_code
+                if self.WEBHOOK_URL:
+                    payload["webhook_url"] = self.WEBHOOK_URL
                 
-                r = requests.post(
+                r = self.session.post(
                     f"{self.BASE_URL}/transcriptions/youtube",
                     headers=self.headers,
                     json=payload
@@ -605,7 +792,7 @@ class UniscribeProvider(TranscriptionProvider):
             
             print(f"Uniscribe Task Started: {task_id}")
             
-            return self._poll_and_parse(task_id, video_id)
+            return task_id
             
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 401:
@@ -614,31 +801,46 @@ class UniscribeProvider(TranscriptionProvider):
                  raise Exception("Uniscribe Forbidden (403). Possible reasons: 1) Invalid Key, 2) Quota Exceeded, 3) 'Auto-Detect' not supported on this plan.")
             raise e
 
-    def _transcribe_file(self, url: str, video_id: str, language: str = None) -> Dict:
-        import requests
-        import time
-        import uuid
-        
-        # 1. Download File locally first
-        temp_uuid = str(uuid.uuid4())
-        audio_path = f"temp_uniscribe_{temp_uuid}.mp3"
+    def _start_file_task(self, url: str, video_id: str, language: Optional[str], workdir: str) -> Tuple[str, str, float]:
+        # 1. Get the audio locally first (the upload URL needs the final file size)
+        audio_path = os.path.join(workdir, "audio.mp3")
         
         try:
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '128',
-                }],
-                'outtmpl': audio_path.replace('.mp3', ''), 
-                'quiet': True
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                title = info.get('title', f"Video {video_id}")
-                duration = info.get('duration', 0)
+            info = None
+            if STREAMING_ENABLED:
+                # Transcode the remote stream straight to compact speech Opus:
+                # no full-size download, no mp3 re-encode, a much smaller upload.
+                try:
+                    info, media_url, http_headers = resolve_media_stream(url)
+                    audio_path = os.path.join(workdir, f"audio.{SPEECH_FORMAT}")
+                    transcode_to_file(media_url, http_headers, audio_path, on_progress=scratch_space.progress_hook(workdir))
+                except ScratchQuotaExceeded:
+                    raise # Downloading instead would need even more space
+                except Exception as stream_err:
+                    print(f"Uniscribe: streaming unavailable ({stream_err}), downloading instead...")
+                    if os.path.exists(audio_path): os.remove(audio_path)
+                    info = None
+                    audio_path = os.path.join(workdir, "audio.mp3")
+
+            if info is None:
+                quota_hook = scratch_space.progress_hook(workdir)
+                ydl_opts = {
+                    'format': 'bestaudio/best',
+                    'postprocessors': [{
+                        'key': 'FFmpegExtractAudio',
+                        'preferredcodec': 'mp3',
+                        'preferredquality': '128',
+                    }],
+                    'outtmpl': audio_path.replace('.mp3', ''), 
+                    'quiet': True,
+                    'progress_hooks': [quota_hook],
+                    'postprocessor_hooks': [quota_hook]
+                }
+                
+                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    info = ydl.extract_info(url, download=True)
+            title = info.get('title', f"Video {video_id}")
+            duration = info.get('duration', 0)
             
             if not os.path.exists(audio_path):
                  raise Exception("Audio download failed.")
@@ -648,7 +850,7 @@ class UniscribeProvider(TranscriptionProvider):
             
             # 2. Get Upload URL
             print("Getting Uniscribe upload URL...")
-            resp = requests.post(
+            resp = self.session.post(
                 f"{self.BASE_URL}/files/upload-url",
                 headers=self.headers,
                 json={
@@ -664,25 +866,27 @@ class UniscribeProvider(TranscriptionProvider):
             # 3. Upload File
             print("Uploading file to Uniscribe...")
             with open(audio_path, 'rb') as f:
-                requests.put(upload_url, data=f).raise_for_status()
+                self.session.put(upload_url, data=f).raise_for_status()
             
             # 4. Start Transcription
             print("Starting transcription task...")
             
             # Retry logic for language code
             task_id = None
+            webhook = {"webhook_url": self.WEBHOOK_URL} if self.WEBHOOK_URL else {}
             try:
                 # Attempt 1: Provided language or Auto
                 target_lang = language if language and language != 'auto' else 'auto'
                 print(f"Uniscribe: Attempting language='{target_lang}'...")
                 
-                resp = requests.post(
+                resp = self.session.post(
                     f"{self.BASE_URL}/transcriptions",
                     headers=self.headers,
                     json={
                         "file_key": file_key,
                         "language_code": target_lang, 
-                        "enable_speaker_diarization": True
+                        "enable_speaker_diarization": True,
+                        **webhook
                     }
                 )
                 resp.raise_for_status()
@@ -691,13 +895,14 @@ class UniscribeProvider(TranscriptionProvider):
                 # If 400/403, Fallback to 'en'
                 if e.response.status_code in [400, 403]:
                     print(f"Uniscribe: Language '{target_lang}' failed ({e.response.status_code}). Fallback to English ('en').")
-                    resp = requests.post(
+                    resp = self.session.post(
                         f"{self.BASE_URL}/transcriptions",
                         headers=self.headers,
                         json={
                             "file_key": file_key,
                             "language_code": "en",
-                            "enable_speaker_diarization": True
+                            "enable_speaker_diarization": True,
+                            **webhook
                         }
                     )
                     resp.raise_for_status()
@@ -708,68 +913,75 @@ class UniscribeProvider(TranscriptionProvider):
             # Cleanup local file early
             os.remove(audio_path)
             
-            return self._poll_and_parse(task_id, video_id, title, duration)
+            return task_id, title, duration
 
         except Exception as e:
             if os.path.exists(audio_path): os.remove(audio_path)
             raise e
 
-    def _poll_and_parse(self, task_id: str, video_id: str, title=None, duration=None) -> Dict:
-        import requests
-        import time
-        
-        print(f"Polling Uniscribe Task {task_id}...")
-        while True:
-            resp = requests.get(f"{self.BASE_URL}/transcriptions/{task_id}", headers=self.headers)
+    async def _poll_and_parse(self, task_id: str, video_id: str, title=None, duration=None,
+                              client: Optional[httpx.AsyncClient] = None) -> Dict:
+        client = client or get_http_client("uniscribe", self.BASE_URL)
+        status_url = f"{self.BASE_URL}/transcriptions/{task_id}"
+
+        async def check() -> Optional[Dict]:
+            try:
+                resp = await client.get(status_url, headers=self.headers)
+            except httpx.HTTPError as e:
+                print(f"Polling Error: {e}")
+                return None
+            if resp.status_code in (401, 404):
+                raise Exception(f"Uniscribe Polling Failed ({resp.status_code}): {resp.text}")
             if resp.status_code != 200:
                 print(f"Polling Error: {resp.status_code}")
-                time.sleep(5)
-                continue
-                
+                return None
+
+            # A body that is not JSON or lacks these fields raises KeyError/ValueError: the waiter retries
             data = resp.json()["data"]
             status = data["status"]
-            
-            if status == "completed":
-                print("Uniscribe Task Completed!")
-                # Parse Result
-                result_data = data["result"]
-                
-                # Use metadata from API if local not provided
-                final_title = title or data.get("filename", video_id)
-                final_duration = duration or data.get("duration", 0)
-                
-                parsed_segments = []
-                # Uniscribe segments: {start, end, text, speaker}
-                raw_segments = result_data.get("segments", [])
-                
-                for s in raw_segments:
-                    start = s.get("start", 0)
-                    speaker = s.get("speaker", "Speaker")
-                    # Clean speaker name? "A", "B" -> "Speaker A"
-                    if len(speaker) < 3 and speaker.isalnum(): 
-                        speaker = f"Speaker {speaker}"
-                        
-                    parsed_segments.append({
-                        "speaker": speaker,
-                        "time": self._format_timestamp(start),
-                        "start_seconds": start,
-                        "text": s.get("text", "").strip()
-                    })
-                
-                return {
-                    "video_id": video_id,
-                    "title": final_title,
-                    "duration": final_duration,
-                    "segments": parsed_segments
-                }
-                
-            elif status == "failed":
+            if status == "failed":
                 error_msg = data.get("error_message", "Unknown error")
                 raise Exception(f"Uniscribe Transcription Failed: {error_msg}")
-            
-            else:
-                # queued, preprocessing, processing
-                time.sleep(3)
+            if status != "completed":
+                return None # queued, preprocessing, processing -> keep waiting
+            if not isinstance(data.get("result"), dict):
+                raise KeyError("result") # Completed without a usable result: re-check
+            return data
+
+        print(f"Polling Uniscribe Task {task_id}...")
+        data = await remote_task_waiter.wait("uniscribe", task_id, check, webhook=bool(self.WEBHOOK_URL))
+        print("Uniscribe Task Completed!")
+        # Parse Result
+        result_data = data["result"]
+        
+        # Use metadata from API if local not provided
+        final_title = title or data.get("filename", video_id)
+        final_duration = duration or data.get("duration", 0)
+        
+        parsed_segments = []
+        # Uniscribe segments: {start, end, text, speaker}
+        raw_segments = result_data.get("segments", [])
+        
+        for s in raw_segments:
+            start = s.get("start", 0)
+            speaker = s.get("speaker", "Speaker")
+            # Clean speaker name? "A", "B" -> "Speaker A"
+            if len(speaker) < 3 and speaker.isalnum(): 
+                speaker = f"Speaker {speaker}"
+                
+            parsed_segments.append({
+                "speaker": speaker,
+                "time": self._format_timestamp(start),
+                "start_seconds": start,
+                "text": s.get("text", "").strip()
+            })
+        
+        return {
+            "video_id": video_id,
+            "title": final_title,
+            "duration": final_duration,
+            "segments": parsed_segments
+        }
 
 def get_transcription_provider(provider_type: str, api_key: str = None) -> TranscriptionProvider:
     if provider_type == 'deepgram':
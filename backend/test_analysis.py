@@ -0,0 +1,141 @@
+import asyncio
+import random
+
+import pytest
+
+from services import analysis
+from services.cache import CacheService
+from services.transcript_chunking import chunk_segments_by_tokens
+
+
+def _segments(minutes: int):
+    return [
+        {"speaker": "Speaker", "time": f"{m:02d}:00", "start_seconds": m * 60.0, "text": f"minute {m}"}
+        for m in range(minutes)
+    ]
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(monkeypatch, tmp_path):
+    cache = CacheService(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(analysis, "cache_service", cache)
+    yield cache
+    cache.close()
+
+
+def test_chunks_run_concurrently_and_keep_timeline_order(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path) # analysis writes debug logs to cwd
+    in_flight = 0
+    peak = 0
+
+    class FakeProvider:
+        async def generate(self, messages, model, max_tokens=4096, temperature=0.3):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(random.uniform(0, 0.01))
+            in_flight -= 1
+            user = messages[-1]["content"]
+            if "Narrative Arc" in user:
+                content = '{"summary": "s", "narrative_arc": []}'
+            else:
+                start = user.split("(")[1].split("s to")[0]
+                content = '{"learning_moments": [{"timestamp_start": "%s"}]}' % start
+            return {"choices": [{"message": {"content": content}, "finish_reason": "stop"}]}
+
+    # Rate-limit slots are taken inside call_ai_api, so measure at the provider
+    monkeypatch.setattr(analysis, "get_llm_provider", lambda *args: FakeProvider())
+    transcript = {"segments": _segments(60)}
+    result = asyncio.run(analysis.analyze_transcript(transcript, "m", provider_config={"api_key": "k", "max_concurrency": 3, "chunk_tokens": 200, "chunk_overlap_tokens": 20}))
+
+    starts = [float(m["timestamp_start"]) for m in result["learning_moments"]]
+    assert starts == sorted(starts)
+    assert len(starts) == len(chunk_segments_by_tokens(transcript["segments"], 200, 20)) > 1
+    assert 1 < peak <= 3
+
+
+def test_long_transcript_macro_pass_is_condensed_not_truncated(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    macro_requests = []
+
+    async def fake_call_ai_api(messages, model_id, provider_config, on_item=None, **kwargs):
+        user = messages[-1]["content"]
+        if "Narrative Arc" in user:
+            macro_requests.append(user)
+            return {"summary": "s", "narrative_arc": []}
+        if user.startswith("Transcript part"):
+            return {"summary": f"summary of {user.splitlines()[0]}"}
+        return {"learning_moments": []}
+
+    monkeypatch.setattr(analysis, "call_ai_api", fake_call_ai_api)
+    transcript = {"segments": _segments(600)}
+    config = {"api_key": "k", "context_tokens": 6000}
+    result = asyncio.run(analysis.analyze_transcript(transcript, "m", provider_config=config))
+
+    assert result["summary"] == "s"
+    assert len(macro_requests) == 1
+    assert "condensed, time-labelled summaries" in macro_requests[0]
+    assert "truncated" not in macro_requests[0]
+    # Every section reaches the arc, including the end of the episode
+    assert "Transcript part 00:00:00" in macro_requests[0] and "09:59:" in macro_requests[0]
+
+
+def test_identical_llm_calls_are_served_from_cache(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    requests_sent = []
+
+    class FakeProvider:
+        async def generate(self, messages, model, max_tokens=4096, temperature=0.3):
+            requests_sent.append(messages[-1]["content"])
+            finish = "length" if "long" in messages[-1]["content"] else "stop"
+            content = '{"learning_moments": [{"quote": "q"}]}'
+            return {"choices": [{"message": {"content": content}, "finish_reason": finish}], "usage": {"total_tokens": 10}}
+
+    monkeypatch.setattr(analysis, "get_llm_provider", lambda *args: FakeProvider())
+    config = {"api_key": "k", "stream": False}
+    messages = [{"role": "system", "content": "p"}, {"role": "user", "content": "chunk 1"}]
+    items = []
+
+    first = asyncio.run(analysis.call_ai_api(messages, "m", config))
+    second = asyncio.run(analysis.call_ai_api(messages, "m", config, on_item=lambda k, i: items.append(k)))
+    assert first == second == {"learning_moments": [{"quote": "q"}]}
+    assert len(requests_sent) == 1
+    assert items == ["learning_moments"] # Cached items are replayed to the job
+
+    # Different model, truncated answers and opted-out requests are not served from the cache
+    asyncio.run(analysis.call_ai_api(messages, "other", config))
+    truncated = [{"role": "user", "content": "long chunk"}]
+    asyncio.run(analysis.call_ai_api(truncated, "m", config))
+    asyncio.run(analysis.call_ai_api(truncated, "m", config))
+    asyncio.run(analysis.call_ai_api(messages, "m", {**config, "llm_cache": False}))
+    assert len(requests_sent) == 5
+
+
+def test_rate_limited_call_frees_its_slot_and_is_charged_again(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    from services.llm_factory import RateLimitError
+    from services.rate_limiter import get_llm_limiter
+    config = {"api_key": "rate-limited", "stream": False, "llm_cache": False, "rpm": 60, "max_concurrency": 1}
+    limiter = get_llm_limiter(config)
+    attempts = []
+
+    class FakeProvider:
+        async def generate(self, messages, model, max_tokens=4096, temperature=0.3):
+            attempts.append(limiter._in_flight)
+            if len(attempts) == 1:
+                raise RateLimitError("429", retry_after=0.1)
+            return {"choices": [{"message": {"content": '{"summary": "s"}'}, "finish_reason": "stop"}]}
+
+    monkeypatch.setattr(analysis, "get_llm_provider", lambda *args: FakeProvider())
+
+    async def run():
+        call = asyncio.create_task(analysis.call_ai_api([{"role": "user", "content": "x"}], "m", config))
+        await asyncio.sleep(0.05)
+        in_flight_during_backoff = limiter._in_flight
+        return await call, in_flight_during_backoff
+
+    result, in_flight_during_backoff = asyncio.run(run())
+    assert result == {"summary": "s"}
+    assert in_flight_during_backoff == 0
+    assert attempts == [1, 1]
+    assert limiter._rpm.tokens < 58.5 # Both attempts took a request from the bucket
@@ -0,0 +1,82 @@
+from services.audio_chunking import ChunkPlanner, parse_silencedetect, plan_chunks, stitch_chunks
+
+SILENCEDETECT_OUTPUT = """
+  Duration: 00:20:00.50, start: 0.000000, bitrate: 64 kb/s
+[silencedetect @ 0x1] silence_start: 290.2
+[silencedetect @ 0x1] silence_end: 291.0 | silence_duration: 0.8
+[silencedetect @ 0x1] silence_start: 610.0
+[silencedetect @ 0x1] silence_end: 611.0 | silence_duration: 1.0
+"""
+
+def seg(start, text):
+    return {"speaker": "Speaker", "time": "", "start_seconds": start, "text": text}
+
+def test_parse_silencedetect():
+    silences, duration = parse_silencedetect(SILENCEDETECT_OUTPUT)
+    assert silences == [(290.2, 291.0), (610.0, 611.0)]
+    assert duration == 1200.5
+
+def test_plan_cuts_at_pauses_and_falls_back_to_hard_cuts():
+    silences, duration = parse_silencedetect(SILENCEDETECT_OUTPUT)
+    plan = plan_chunks(duration, silences, target_sec=300, overlap_sec=2)
+    # First two cuts land mid-pause, the third has no pause nearby so it is a hard cut with overlap
+    assert plan[0] == (0.0, 290.6)
+    assert plan[1] == (290.6, 610.5)
+    assert plan[2] == (610.5, 910.5)
+    assert plan[3][0] == 908.5
+    assert plan[-1][1] == duration
+
+def test_short_audio_is_one_chunk():
+    assert plan_chunks(200, [], target_sec=300) == [(0.0, 200)]
+
+def test_stitch_drops_overlap_duplicates():
+    plan = [(0.0, 300.0), (298.0, 500.0)]
+    first = [seg(0, "Hello there."), seg(297.5, "We cut right here")]
+    second = [seg(298.3, "we cut right here, mid sentence."), seg(305, "Next part.")]
+    merged = stitch_chunks([first, second], plan)
+    assert [s["text"] for s in merged] == ["Hello there.", "we cut right here, mid sentence.", "Next part."]
+
+def test_stitch_without_overlap_is_concatenation():
+    plan = [(0.0, 290.6), (290.6, 600.0)]
+    merged = stitch_chunks([[seg(0, "a")], [seg(291, "b")]], plan)
+    assert [s["text"] for s in merged] == ["a", "b"]
+
+def test_incremental_planner_matches_batch_plan():
+    silences, duration = parse_silencedetect(SILENCEDETECT_OUTPUT)
+    planner = ChunkPlanner(target_sec=300, overlap_sec=2)
+    streamed = []
+    for position in range(0, int(duration), 10):
+        for start, end in silences:
+            if end <= position and (start + end) / 2 not in planner.midpoints:
+                planner.add_silence(start, end)
+        streamed += planner.advance(position)
+    streamed += planner.finish(duration)
+    assert streamed == plan_chunks(duration, silences, target_sec=300, overlap_sec=2)
+    assert streamed[0] == (0.0, 290.6) # first chunk is released long before the end
+
+
+def test_streamed_plan_falls_back_to_probed_duration(monkeypatch):
+    import io
+    import subprocess
+    import pytest
+    from services import audio_stream
+
+    class SilentFfmpeg: # Transcodes fine but never reports out_time_us
+        def __init__(self, *args, **kwargs):
+            self.stderr = io.BytesIO(b"silence_start: 290\nsilence_end: 310\n")
+        def wait(self):
+            return 0
+        def poll(self):
+            return 0
+
+    monkeypatch.setattr(audio_stream.subprocess, "Popen", SilentFfmpeg)
+    probed = {"stderr": b"  Duration: 00:10:00.00, start: 0.000000, bitrate: 24 kb/s\n"}
+    monkeypatch.setattr(audio_stream.subprocess, "run",
+                        lambda *args, **kwargs: subprocess.CompletedProcess(args, 1, b"", probed["stderr"]))
+
+    plan = list(audio_stream.transcode_and_plan("in.mp3", {}, "out.ogg", ChunkPlanner(300), "silencedetect"))
+    assert plan == [(0.0, 300.0), (300.0, 600.0)]
+
+    probed["stderr"] = b"out.ogg: Invalid data found when processing input\n"
+    with pytest.raises(Exception, match="nothing to transcribe"):
+        list(audio_stream.transcode_and_plan("in.mp3", {}, "out.ogg", ChunkPlanner(300), "silencedetect"))
@@ -0,0 +1,107 @@
+import json
+import sqlite3
+
+from services.cache import CacheService
+
+
+def _legacy_db(path, count):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE analysis_cache (key TEXT PRIMARY KEY, data TEXT, model TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)")
+    for i in range(count):
+        data = json.dumps({"meta": {"title": f"Episode {i}", "url": f"https://example.com/{i}"}})
+        conn.execute("INSERT INTO analysis_cache (key, data, model, timestamp) VALUES (?, ?, 'gpt-4o', ?)", (f"k{i}", data, f"2025-01-01 00:00:{i:02d}"))
+    conn.commit()
+    conn.close()
+
+
+def test_history_is_backfilled_and_paginated(tmp_path):
+    path = str(tmp_path / "cache.db")
+    _legacy_db(path, 5)
+    cache = CacheService(path)
+
+    first, cursor = cache.get_history_list(limit=3)
+    assert [h["title"] for h in first] == ["Episode 4", "Episode 3", "Episode 2"]
+    second, cursor = cache.get_history_list(limit=3, cursor=cursor)
+    assert [h["title"] for h in second] == ["Episode 1", "Episode 0"]
+    assert cursor is None
+    # Legacy blobs were migrated into the payload tables
+    assert cache.get_analysis_by_key("k0")["meta"]["url"] == "https://example.com/0"
+
+
+def test_new_results_fill_history_columns(tmp_path):
+    cache = CacheService(str(tmp_path / "cache.db"))
+    cache.set("https://youtu.be/x", "gpt-4o", {"meta": {"title": "First", "video_id": "x", "duration": 60}})
+    cache.set("https://youtu.be/y", "gpt-4o", {"meta": {"title": "Second"}})
+
+    history, _ = cache.get_history_list()
+    assert [h["title"] for h in history] == ["Second", "First"]
+    assert history[1]["video_id"] == "x"
+    assert history[1]["size"] > 0
+
+
+def test_transcript_is_stored_compressed_and_loaded_lazily(tmp_path):
+    cache = CacheService(str(tmp_path / "cache.db"))
+    transcript = [{"time": "00:00", "start_seconds": 0.0, "speaker": "Speaker", "text": "hello " * 200}]
+    cache.set("https://youtu.be/x", "gpt-4o", {"meta": {"title": "T"}, "transcript": transcript, "analysis": {"summary": "s"}})
+    history, _ = cache.get_history_list()
+    key = history[0]["key"]
+
+    light = cache.get_analysis_by_key(key, include_transcript=False)
+    assert light == {"meta": {"title": "T"}, "analysis": {"summary": "s"}}
+    assert cache.get_transcript_by_key(key) == transcript
+    assert cache.get("https://youtu.be/x", "gpt-4o")["transcript"] == transcript
+    assert history[0]["size"] < len(json.dumps(transcript))
+
+
+def test_pending_transcript_is_served_by_history_key_until_discarded(tmp_path):
+    cache = CacheService(str(tmp_path / "cache.db"))
+    segments = [{"time": "00:00", "start_seconds": 0.0, "speaker": "Speaker", "text": "hello"}]
+    key = cache.set_pending_transcript("https://youtu.be/x", "gpt-4o", segments)
+    assert key == cache.history_key("https://youtu.be/x", "gpt-4o")
+    assert cache.get_transcript_by_key(key) == segments
+    cache.discard_pending_transcript(key) # The analysis failed
+    assert cache.get_transcript_by_key(key) is None
+
+    key = cache.set_pending_transcript("https://youtu.be/x", "gpt-4o", segments)
+    cache.set("https://youtu.be/x", "gpt-4o", {"meta": {"title": "T"}, "transcript": segments})
+    cache.discard_pending_transcript(key) # Kept: the result was saved
+    assert cache.get_transcript_by_key(key) == segments
+
+
+def test_transcript_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    from services import cache as cache_module
+    cache = CacheService(str(tmp_path / "cache.db"))
+    transcript = {"video_id": "a", "title": "A", "duration": 1, "segments": [{"text": "x"}]}
+    cache.set_transcript("a", "deepgram", "en", transcript)
+    assert cache.get_transcript("a", "deepgram", "en") == transcript
+    assert cache.get_transcript("a", "youtube", "en") is None
+
+    # Budget only fits one entry: the older one goes
+    monkeypatch.setattr(cache_module, "TRANSCRIPT_CACHE_MAX_MB", 1.5 * len(cache_module.pack_payload(transcript)) / (1024 * 1024))
+    cache.set_transcript("b", "deepgram", "en", {**transcript, "video_id": "b"})
+    assert cache.get_transcript("a", "deepgram", "en") is None
+    assert cache.get_transcript("b", "deepgram", "en")["video_id"] == "b"
+
+
+def test_llm_cache_hits_are_batched_and_eviction_waits_for_the_budget(tmp_path, monkeypatch):
+    from services import cache as cache_module
+    path = str(tmp_path / "cache.db")
+    cache = CacheService(path)
+    result = {"learning_moments": [{"quote": "q" * 100}]}
+    size = len(cache_module.pack_payload(result))
+    monkeypatch.setattr(cache_module, "LLM_CACHE_MAX_MB", 2.5 * size / (1024 * 1024))
+    cache.set_llm_result("a", "m", result)
+    cache.set_llm_result("b", "m", result)
+
+    # A hit only queues the recency update; nothing is written yet
+    def last_used(key):
+        return sqlite3.connect(path).execute("SELECT last_used_at FROM llm_call_cache WHERE key = ?", (key,)).fetchone()[0]
+    before = last_used("a")
+    assert cache.get_llm_result("a") == result
+    assert last_used("a") == before
+
+    # Crossing the budget flushes the queued hit first, so the untouched entry goes
+    cache.set_llm_result("c", "m", result)
+    assert cache.get_llm_result("b") is None
+    assert cache.get_llm_result("a") == result
+    assert cache.get_llm_result("c") == result
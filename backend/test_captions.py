@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+
+from youtube_transcript_api import NoTranscriptFound
+
+from services.transcription_factory import YouTubeCaptionsProvider
+
+
+class FakeTranscript:
+    def __init__(self, language_code, snippets):
+        self.language_code = language_code
+        self.snippets = snippets
+
+    def fetch(self):
+        return [SimpleNamespace(text=t, start=s, duration=d) for s, d, t in self.snippets]
+
+
+class FakeTranscriptList:
+    def __init__(self, transcripts):
+        self.transcripts = transcripts
+
+    def __iter__(self):
+        return iter(self.transcripts)
+
+    def find_transcript(self, languages):
+        for code in languages:
+            for t in self.transcripts:
+                if t.language_code == code:
+                    return t
+        raise NoTranscriptFound("vid", languages, self)
+
+
+def make_provider(monkeypatch, transcripts):
+    api = SimpleNamespace(list=lambda video_id: FakeTranscriptList(transcripts))
+    monkeypatch.setattr(YouTubeCaptionsProvider, "_api", api)
+    provider = YouTubeCaptionsProvider()
+    monkeypatch.setattr(provider, "_fetch_title", lambda video_id: "A Talk")
+    return provider
+
+
+def test_captions_are_parsed_in_memory(monkeypatch):
+    provider = make_provider(monkeypatch, [FakeTranscript("en", [(0.0, 2.0, "Hello\nworld"), (2.0, 1.5, " "), (6.0, 2.5, "Bye")])])
+    monkeypatch.setattr(provider, "_ensure_ffmpeg", lambda: (_ for _ in ()).throw(AssertionError("yt-dlp path used")))
+
+    result = provider.fetch("https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+
+    assert result["title"] == "A Talk"
+    assert result["duration"] == 8
+    assert [s["text"] for s in result["segments"]] == ["Hello world", "Bye"] # split at the pause
+    assert result["segments"][1]["time"] == "00:06"
+
+
+def test_any_language_is_used_when_preferred_ones_are_missing(monkeypatch):
+    provider = make_provider(monkeypatch, [FakeTranscript("nl", [(1.0, 1.0, "Hallo")])])
+    result = provider.fetch("https://youtu.be/dQw4w9WgXcQ", language="auto")
+    assert result["segments"][0]["text"] == "Hallo"
+
+
+ROLLING_VTT = """WEBVTT
+Kind: captions
+Language: en
+
+00:00:00.000 --> 00:00:02.000 align:start position:0%
+so<00:00:00.500><c> today</c><00:00:01.000><c> we</c>
+
+00:00:02.000 --> 00:00:02.010 align:start position:0%
+so today we
+
+00:00:02.010 --> 00:00:04.000 align:start position:0%
+so today we
+talk<00:00:02.500><c> about</c><00:00:03.000><c> stories.</c>
+
+00:00:04.000 --> 00:00:04.010 align:start position:0%
+talk about stories.
+
+00:00:04.010 --> 00:00:06.000 align:start position:0%
+talk about stories.
+>> Great to be here.
+"""
+
+
+def test_vtt_rolling_duplicates_are_removed(tmp_path):
+    path = tmp_path / "subs.en.vtt"
+    path.write_text(ROLLING_VTT, encoding="utf-8")
+    segments = YouTubeCaptionsProvider()._parse_vtt(str(path))
+    assert [(s["start_seconds"], s["text"]) for s in segments] == [
+        (0.0, "so today we talk about stories."),
+        (4.01, ">> Great to be here."),
+    ]
+
+
+def test_lines_said_twice_are_kept():
+    from services.captions import dedupe_rolling_lines
+    cues = [
+        {"start": 0.0, "end": 1.0, "lines": ["Yes."]},
+        {"start": 1.0, "end": 2.0, "lines": ["Really?"]},
+        {"start": 2.0, "end": 3.0, "lines": ["Yes."]}, # Not a roll-over: the cue before shows another line
+        {"start": 3.0, "end": 4.0, "lines": ["Yes.", "No."]}, # Rolls "Yes." over, adds "No."
+        {"start": 4.0, "end": 5.0, "lines": ["No.", "No."]}, # Rolls one "No." over, says it again
+    ]
+    assert [text for _, _, text in dedupe_rolling_lines(cues)] == ["Yes.", "Really?", "Yes.", "No.", "No."]
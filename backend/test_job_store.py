@@ -0,0 +1,152 @@
+import time
+
+from services import job_store
+from services.job_store import InMemoryJobStore, SQLiteJobStore
+
+
+def _job(job_id, status="queued"):
+    return {
+        "id": job_id, "status": status, "progress": 0, "message": "Queued...", "created_at": "now",
+        "result": None, "partial_result": None, "meta": None, "transcript_key": None, "error": None
+    }
+
+
+def _check_store(store):
+    store.create(_job("a"))
+    assert store.update("a", {"progress": 50, "meta": {"title": "T"}})
+    assert not store.update("missing", {"progress": 1})
+    store.append_partial("a", "learning_moments", {"quote": "one"})
+    store.append_partial("a", "learning_moments", {"quote": "two"})
+
+    job = store.get("a")
+    assert job["progress"] == 50
+    assert job["meta"] == {"title": "T"}
+    assert [m["quote"] for m in job["partial_result"]["learning_moments"]] == ["one", "two"]
+
+
+def test_in_memory_store():
+    _check_store(InMemoryJobStore())
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = SQLiteJobStore(path)
+    _check_store(store)
+    store.close() # Waits for the writer thread
+    # A second store on the same file sees the same jobs (as another worker would)
+    job = SQLiteJobStore(path).get("a")
+    assert job["progress"] == 50
+    assert [m["quote"] for m in job["partial_result"]["learning_moments"]] == ["one", "two"]
+
+
+def test_sqlite_store_reads_own_jobs_before_they_are_written(tmp_path):
+    store = SQLiteJobStore(str(tmp_path / "jobs.db"))
+    store._writer.submit(time.sleep, 0.2) # Holds up the writer thread
+    store.create(_job("a"))
+    assert store.update("a", {"progress": 10})
+    assert store.get("a")["progress"] == 10
+    assert store.updated_at("a") is not None
+    store.close()
+
+
+def test_get_returns_a_copy(tmp_path):
+    for store in (InMemoryJobStore(), SQLiteJobStore(str(tmp_path / "jobs.db"))):
+        store.create(_job("a"))
+        store.append_partial("a", "learning_moments", {"quote": "one"})
+        job = store.get("a")
+        job["progress"] = 99
+        job["partial_result"]["learning_moments"].append({"quote": "two"})
+        assert store.get("a")["progress"] == 0
+        assert len(store.get("a")["partial_result"]["learning_moments"]) == 1
+
+
+def test_finished_jobs_expire(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_store, "JOB_TTL_SECONDS", -1)
+    for store in (InMemoryJobStore(), SQLiteJobStore(str(tmp_path / "jobs.db"))):
+        store.create(_job("done", status="completed"))
+        store.create(_job("running", status="processing"))
+        store.evict_expired()
+        assert store.get("done") is None
+        assert store.get("running") is not None
+
+
+def test_updated_at_changes_on_every_write(tmp_path):
+    for store in (InMemoryJobStore(), SQLiteJobStore(str(tmp_path / "jobs.db"))):
+        assert store.updated_at("a") is None
+        store.create(_job("a"))
+        created = store.updated_at("a")
+        store.append_partial("a", "learning_moments", {"quote": "one"})
+        assert store.updated_at("a") > created
+
+
+def test_event_stream_only_rereads_jobs_of_other_workers_when_they_change(monkeypatch):
+    import asyncio
+    from services import jobs
+    store = InMemoryJobStore()
+    manager = jobs.JobManager()
+    monkeypatch.setattr(manager, "store", store)
+    monkeypatch.setattr(jobs, "EVENT_STREAM_POLL_SEC", 0.01)
+    store.create(_job("remote")) # Created by another worker: never published locally
+    reads = []
+    real_get = store.get
+    monkeypatch.setattr(store, "get", lambda job_id: reads.append(job_id) or real_get(job_id))
+
+    async def follow():
+        received = []
+        async for message in manager.event_stream("remote"):
+            received.append(message)
+            if len(received) == 4:
+                store.update("remote", {"status": "completed", "result": {"summary": "s"}})
+        return received
+
+    received = asyncio.run(follow())
+    assert received[0].startswith("event: snapshot")
+    assert received[1:4] == [": keep-alive\n\n"] * 3
+    assert received[-1].startswith("event: complete")
+    assert len(reads) == 2 # The snapshot, then once after the job changed
+
+
+def test_event_stream_drops_events_already_in_the_snapshot(monkeypatch):
+    import asyncio
+    import json
+    from services import jobs
+    manager = jobs.JobManager()
+    monkeypatch.setattr(manager, "store", InMemoryJobStore())
+    job_id = manager.create_job()
+    real_subscribe = manager.subscribe
+
+    def subscribe_then_write(job_id):
+        queue = real_subscribe(job_id)
+        manager.add_partial_item(job_id, "learning_moments", {"quote": "one"}) # Lands before the snapshot read
+        return queue
+    monkeypatch.setattr(manager, "subscribe", subscribe_then_write)
+
+    async def follow():
+        received = []
+        async for message in manager.event_stream(job_id):
+            received.append(message)
+            if len(received) == 1:
+                manager.complete_job(job_id, {"summary": "s"})
+        return received
+
+    received = asyncio.run(follow())
+    assert len(received) == 2
+    snapshot = json.loads(received[0].split("data: ", 1)[1])
+    assert snapshot["partial_result"] == {"learning_moments": [{"quote": "one"}]}
+    assert "event: complete" in received[1]
+    assert int(received[1].split("id: ", 1)[1].split("\n", 1)[0]) > snapshot["seq"]
+
+
+def test_sqlite_store_recreates_a_table_from_another_schema_version(tmp_path):
+    import sqlite3
+    path = str(tmp_path / "jobs.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE jobs (id TEXT PRIMARY KEY, status TEXT, transcript TEXT)") # Unversioned, older layout
+    conn.commit()
+    conn.close()
+
+    store = SQLiteJobStore(path)
+    store.create(_job("a"))
+    store.close()
+    assert SQLiteJobStore(path).get("a")["transcript_key"] is None
+    assert sqlite3.connect(path).execute("PRAGMA user_version").fetchone()[0] == job_store.JOB_SCHEMA_VERSION
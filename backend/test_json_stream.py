@@ -0,0 +1,37 @@
+import json
+
+from services.json_stream import IncrementalJSONParser
+
+
+SAMPLE = {
+    "summary": "He said \"hi\" {not a brace}",
+    "narrative_arc": [{"phase": "Setup", "range": [0, 60]}, {"phase": "Release}"}],
+    "learning_moments": [{"quote": "a ] b"}, {"quote": "c"}],
+    "extra": None,
+}
+
+
+def _feed_in_pieces(parser, text, size):
+    emitted = []
+    for i in range(0, len(text), size):
+        emitted += parser.feed(text[i:i + size])
+    return emitted
+
+
+def test_emits_items_as_they_complete():
+    text = "```json\n" + json.dumps(SAMPLE, indent=2) + "\n```"
+    for size in (1, 3, 17, len(text)):
+        parser = IncrementalJSONParser()
+        emitted = _feed_in_pieces(parser, text, size)
+        assert [k for k, _ in emitted] == ["narrative_arc", "narrative_arc", "learning_moments", "learning_moments"]
+        assert parser.result() == SAMPLE
+
+
+def test_truncated_output_keeps_complete_items():
+    text = json.dumps(SAMPLE)
+    parser = IncrementalJSONParser()
+    parser.feed(text[:text.index('"c"')])
+    result = parser.result()
+    assert result["summary"] == SAMPLE["summary"]
+    assert result["narrative_arc"] == SAMPLE["narrative_arc"]
+    assert result["learning_moments"] == [{"quote": "a ] b"}]
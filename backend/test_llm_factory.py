@@ -0,0 +1,27 @@
+from services import llm_factory
+from services.llm_factory import get_llm_provider
+
+
+def test_provider_cache_is_bounded_and_never_holds_raw_keys(monkeypatch):
+    monkeypatch.setattr(llm_factory, "_providers", llm_factory.OrderedDict())
+    monkeypatch.setattr(llm_factory, "LLM_PROVIDER_CACHE_SIZE", 2)
+
+    first = get_llm_provider("openai", "sk-one", None)
+    assert get_llm_provider("OpenAI", "sk-one", None) is first
+    get_llm_provider("openai", "sk-two", None)
+    get_llm_provider("openai", "sk-one", None) # Most recently used again
+    get_llm_provider("anthropic", "sk-three", None)
+
+    assert len(llm_factory._providers) == 2
+    assert get_llm_provider("openai", "sk-one", None) is first # sk-two was evicted instead
+    assert not any("sk-" in str(key) for key in llm_factory._providers)
+
+
+def test_cached_adapters_keep_the_key_only_in_the_auth_header(monkeypatch):
+    monkeypatch.setattr(llm_factory, "_providers", llm_factory.OrderedDict())
+    openai = get_llm_provider("openai", "sk-one", None)
+    anthropic = get_llm_provider("anthropic", "sk-two", None)
+
+    assert not hasattr(openai, "api_key")
+    assert openai._build_request([{"role": "user", "content": "hi"}], "gpt-4o", 10, 0.3)[0]["Authorization"] == "Bearer sk-one"
+    assert anthropic._build_request([{"role": "user", "content": "hi"}], "claude", 10, 0.3)[0]["x-api-key"] == "sk-two"
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from services import llm_retry
+from services.llm_factory import TransientAPIError
+from services.llm_retry import ResilientCaller
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(llm_retry, "LLM_RETRY_BASE_SEC", 0.001)
+
+
+def test_transient_errors_are_retried_with_backoff():
+    calls = []
+
+    async def attempt():
+        calls.append(1)
+        if len(calls) < 3:
+            raise TransientAPIError("API Error 503: overloaded", 503)
+        return "ok"
+
+    result = asyncio.run(ResilientCaller().call(attempt, ("openai", "m"), {"max_retries": 2}))
+    assert result == "ok"
+    assert len(calls) == 3
+
+
+def test_non_retryable_errors_and_started_streams_fail_fast():
+    calls = []
+
+    async def bad_request():
+        calls.append(1)
+        raise Exception("API Error 400: bad request")
+
+    with pytest.raises(Exception, match="400"):
+        asyncio.run(ResilientCaller().call(bad_request, ("openai", "m"), {"max_retries": 3}))
+
+    async def dropped_stream():
+        calls.append(1)
+        raise TransientAPIError("API Error 502", 502)
+
+    with pytest.raises(TransientAPIError):
+        asyncio.run(ResilientCaller().call(dropped_stream, ("openai", "m"), {"max_retries": 3}, can_retry=lambda: False))
+    assert len(calls) == 2
+
+
+def test_stalled_attempt_hits_its_deadline_and_is_retried():
+    calls = []
+
+    async def attempt():
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(10)
+        return "ok"
+
+    result = asyncio.run(ResilientCaller().call(attempt, ("openai", "m"), {"attempt_timeout": 0.05, "max_retries": 1}))
+    assert result == "ok"
+    assert len(calls) == 2
+
+
+def test_hedge_fires_after_latency_percentile():
+    caller = ResilientCaller()
+    key = ("openai", "m")
+    for _ in range(llm_retry.HEDGE_MIN_SAMPLES):
+        caller.latencies.record(key, 0.02)
+    calls = []
+
+    async def attempt():
+        calls.append(1)
+        await asyncio.sleep(5 if len(calls) == 1 else 0.01)
+        return len(calls)
+
+    async def run():
+        return await asyncio.wait_for(caller.call(attempt, key, {"hedge": True}), timeout=1)
+
+    assert asyncio.run(run()) == 2
+    assert len(calls) == 2
+
+
+def test_every_attempt_and_hedge_takes_a_limiter_slot():
+    from contextlib import asynccontextmanager
+    caller = ResilientCaller()
+    key = ("openai", "m", "micro")
+    for _ in range(llm_retry.HEDGE_MIN_SAMPLES):
+        caller.latencies.record(key, 0.02)
+    slots = []
+    calls = []
+
+    @asynccontextmanager
+    async def slot():
+        slots.append(1)
+        if len(slots) == 1:
+            await asyncio.sleep(0.1) # Queueing for the slot does not count towards the hedge delay
+        yield
+
+    async def attempt():
+        calls.append(1)
+        await asyncio.sleep(5 if len(calls) == 2 else 0.01)
+        return len(calls)
+
+    async def run():
+        first = await caller.call(attempt, key, {"hedge": True}, slot=slot)
+        # Second call stalls, gets hedged; both of its requests hold a slot
+        second = await asyncio.wait_for(caller.call(attempt, key, {"hedge": True}, slot=slot), timeout=1)
+        return first, second
+
+    assert asyncio.run(run()) == (1, 3)
+    assert len(slots) == len(calls) == 3
+    # Latencies are kept per call type
+    assert caller.latencies.percentile(("openai", "m", "macro"), 95) is None
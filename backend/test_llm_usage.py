@@ -0,0 +1,55 @@
+import asyncio
+
+from services import analysis
+from services.cache import CacheService
+from services.llm_factory import AnthropicProvider, OpenAICompatibleProvider
+from services.llm_usage import normalize_usage, start_usage_tracking, stop_usage_tracking
+
+
+def test_usage_blocks_are_normalized():
+    openai = normalize_usage({"prompt_tokens": 1200, "completion_tokens": 80, "prompt_tokens_details": {"cached_tokens": 1024}})
+    assert openai == {"input_tokens": 1200, "output_tokens": 80, "cached_tokens": 1024, "cache_write_tokens": 0}
+    anthropic = normalize_usage({"input_tokens": 50, "output_tokens": 70, "cache_read_input_tokens": 2000, "cache_creation_input_tokens": 0})
+    assert anthropic["input_tokens"] == 2050 and anthropic["cached_tokens"] == 2000
+    assert normalize_usage(None)["input_tokens"] == 0
+
+
+def test_requests_keep_the_shared_system_prompt_cacheable():
+    messages = [{"role": "system", "content": "long shared prompt"}, {"role": "user", "content": "chunk"}]
+    _, payload = AnthropicProvider("k", "https://api.anthropic.com/v1", "anthropic")._build_request(messages, "claude", 100, 0.3)
+    assert payload["system"] == [{"type": "text", "text": "long shared prompt", "cache_control": {"type": "ephemeral"}}]
+    assert payload["messages"] == messages[1:]
+
+    _, first = OpenAICompatibleProvider("k", "https://api.openai.com/v1", "openai")._build_request(messages, "gpt-4o", 100, 0.3)
+    other = [messages[0], {"role": "user", "content": "another chunk"}]
+    _, second = OpenAICompatibleProvider("k", "https://api.openai.com/v1", "openai")._build_request(other, "gpt-4o", 100, 0.3)
+    assert first["prompt_cache_key"] == second["prompt_cache_key"]
+    _, proxy = OpenAICompatibleProvider("k", "https://proxy.example/v1", "openai")._build_request(messages, "gpt-4o", 100, 0.3)
+    assert "prompt_cache_key" not in proxy
+
+
+def test_cached_tokens_are_totalled_per_job(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(analysis, "cache_service", CacheService(str(tmp_path / "cache.db")))
+
+    class FakeProvider:
+        async def generate(self, messages, model, max_tokens=4096, temperature=0.3):
+            return {"choices": [{"message": {"content": "{}"}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 1000, "completion_tokens": 10, "prompt_tokens_details": {"cached_tokens": 900}}}
+
+    monkeypatch.setattr(analysis, "get_llm_provider", lambda *args: FakeProvider())
+    config = {"api_key": "k", "stream": False}
+
+    async def job():
+        totals, token = start_usage_tracking()
+        try:
+            for text in ("a", "b", "a"): # The repeated call is served by the result cache
+                await analysis.call_ai_api([{"role": "user", "content": text}], "m", config)
+        finally:
+            stop_usage_tracking(token)
+        return totals.as_dict()
+
+    usage = asyncio.run(job())
+    assert usage["calls"] == 2 and usage["result_cache_hits"] == 1
+    assert usage["input_tokens"] == 2000 and usage["cached_tokens"] == 1800
+    assert usage["cached_share"] == 0.9
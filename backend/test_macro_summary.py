@@ -0,0 +1,47 @@
+import asyncio
+
+from services.macro_summary import HierarchicalSummarizer, SUMMARY_TOKENS
+from services.transcript_chunking import count_tokens
+
+
+def _segments(n: int):
+    return [
+        {"speaker": "Host", "time": f"{i // 60:02d}:{i % 60:02d}", "start_seconds": float(i), "text": f"sentence number {i} " * 20 + "."}
+        for i in range(n)
+    ]
+
+
+def test_condense_reduces_in_levels_and_fits_budget():
+    calls = []
+
+    async def call(messages):
+        calls.append(messages[-1]["content"])
+        return {"summary": "beat " * (SUMMARY_TOKENS // 2)}
+
+    budget = 3 * SUMMARY_TOKENS
+    summarizer = HierarchicalSummarizer(call, budget)
+    condensed = asyncio.run(summarizer.condense(_segments(2000)))
+
+    assert count_tokens(condensed) <= budget
+    map_calls = sum(1 for c in calls if "sentence number" in c)
+    reduce_calls = len(calls) - map_calls
+    assert map_calls > 20
+    assert 0 < reduce_calls < map_calls
+
+
+def test_requests_are_deterministic_and_failures_fall_back():
+    requests = []
+
+    async def call(messages):
+        requests.append(messages)
+        return {"summary": "ok"} if len(requests) % 2 else {"error": "boom"}
+
+    segments = _segments(300)
+    text = asyncio.run(HierarchicalSummarizer(call, 10 ** 6).condense(segments))
+    assert "ok" in text and "summary unavailable" in text
+
+    # Same sections produce byte-identical requests, so the LLM call cache serves re-runs
+    first_run = list(requests)
+    requests.clear()
+    asyncio.run(HierarchicalSummarizer(call, 10 ** 6).condense(segments))
+    assert requests == first_run
@@ -0,0 +1,64 @@
+import random
+import time
+
+from services.moments import deduplicate_moments, parse_timestamp
+
+
+def _moment(start, end, quote, technique="Open question", analysis="Because it invites a story."):
+    return {"timestamp_start": start, "timestamp_end": end, "category": "Host Technique",
+            "technique_name": technique, "quote": quote, "analysis": analysis, "takeaway": "Ask it."}
+
+
+def test_overlapping_chunk_duplicates_merge_into_best_version():
+    moments = [
+        _moment("04:10", "04:40", "So what was going through your head when the bank called?", analysis="Short."),
+        _moment("06:00", "06:30", "I had never failed at anything before", technique="Vulnerability"),
+        # Same passage from the next (overlapping) chunk: shifted times, slightly different quote
+        _moment("04:12", "04:45", "what was going through your head when the bank called",
+                analysis="An open, sensory question that puts the guest back in the moment."),
+    ]
+    result = deduplicate_moments(moments)
+    assert len(result) == 2
+    assert result[0]["analysis"].startswith("An open, sensory question")
+    assert result[1]["technique_name"] == "Vulnerability"
+
+
+def test_similar_quotes_far_apart_and_different_quotes_nearby_are_kept():
+    moments = [
+        _moment("01:00", "01:20", "tell me more about that"),
+        _moment("45:00", "45:20", "tell me more about that"),
+        _moment("01:05", "01:25", "the company almost went bankrupt twice", technique="Stakes"),
+    ]
+    assert len(deduplicate_moments(moments)) == 3
+
+
+def test_untimed_moments_only_merge_when_identical():
+    a = _moment(None, None, "same words here")
+    result = deduplicate_moments([a, dict(a), _moment("bad", None, "other words entirely")])
+    assert len(result) == 2
+    assert parse_timestamp("1:02:03") == 3723
+    assert parse_timestamp("bad") is None
+
+
+def test_thousands_of_moments_dedupe_quickly():
+    random.seed(1)
+    words = [f"w{i}" for i in range(500)]
+    moments = []
+    for i in range(3000):
+        quote = " ".join(random.sample(words, 12))
+        start = i * 10
+        moments.append(_moment(f"{start // 60}:{start % 60:02d}", f"{(start + 20) // 60}:{(start + 20) % 60:02d}", quote, technique=f"t{i}"))
+        if i % 3 == 0: # Duplicate reported by the overlapping chunk
+            moments.append(_moment(f"{(start + 3) // 60}:{(start + 3) % 60:02d}", None, quote + " indeed", technique=f"t{i}"))
+    started = time.perf_counter()
+    result = deduplicate_moments(moments)
+    assert len(result) == 3000
+    assert time.perf_counter() - started < 2
+
+
+def test_short_quote_inside_a_long_one_is_not_a_duplicate():
+    long_quote = ("when we lost the biggest client I sat in the car for an hour and "
+                  "realised that nobody else was coming to save the company except the two of us")
+    assert len(long_quote.split()) == 30
+    moments = [_moment("10:00", "10:40", long_quote), _moment("10:05", "10:10", "lost the company")]
+    assert len(deduplicate_moments(moments)) == 2
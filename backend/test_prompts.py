@@ -0,0 +1,31 @@
+import os
+
+from services.prompts import PromptRegistry
+
+
+def test_prompt_reloads_only_when_file_changes(tmp_path, monkeypatch):
+    path = tmp_path / "prompt.md"
+    path.write_text("first prompt", encoding="utf-8")
+    registry = PromptRegistry(str(path))
+    monkeypatch.setattr(PromptRegistry, "CHECK_INTERVAL_SEC", -1) # stat on every call
+
+    content, first_hash = registry.get()
+    assert content == "first prompt"
+    assert registry.version == first_hash[:12]
+
+    reads = []
+    real_open = open
+    monkeypatch.setattr("builtins.open", lambda *a, **kw: reads.append(a[0]) or real_open(*a, **kw))
+    registry.get()
+    assert reads == [] # unchanged file is not re-read
+
+    path.write_text("second prompt!", encoding="utf-8")
+    os.utime(path, ns=(1, 1))
+    content, second_hash = registry.get()
+    assert content == "second prompt!"
+    assert second_hash != first_hash
+
+
+def test_missing_prompt_falls_back_to_default(tmp_path):
+    registry = PromptRegistry(str(tmp_path / "missing.md"))
+    assert registry.prompt_hash == "default_prompt"
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+
+from services.rate_limiter import ProviderLimiter, TokenBucket, get_limiter, parse_retry_after
+
+
+def test_concurrency_cap_holds_across_jobs():
+    limiter = ProviderLimiter("test", max_concurrency=2)
+    state = {"active": 0, "peak": 0}
+
+    async def call(job):
+        async with limiter.slot(job):
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            await asyncio.sleep(0.01)
+            state["active"] -= 1
+
+    async def run():
+        await asyncio.gather(*(call(f"job{i % 3}") for i in range(12)))
+
+    asyncio.run(run())
+    assert state["peak"] == 2
+
+
+def test_late_job_is_not_starved_by_a_big_one():
+    limiter = ProviderLimiter("test", max_concurrency=1)
+    order = []
+
+    async def call(job):
+        async with limiter.slot(job):
+            order.append(job)
+            await asyncio.sleep(0.005)
+
+    async def run():
+        big = [asyncio.create_task(call("big")) for _ in range(8)]
+        await asyncio.sleep(0.001)
+        small = [asyncio.create_task(call("small")) for _ in range(2)]
+        await asyncio.gather(*big, *small)
+
+    asyncio.run(run())
+    # Both small calls run long before the big job's backlog drains
+    assert order.index("small") <= 3
+    assert [i for i, job in enumerate(order) if job == "small"][-1] <= 5
+
+
+def test_token_bucket_and_pause_delay_admission():
+    bucket = TokenBucket(60) # 1 per second
+    bucket.take(60)
+    assert 0.9 < bucket.wait_time(1) <= 1.0
+    assert TokenBucket(0).wait_time(10 ** 6) == 0
+
+    limiter = ProviderLimiter("test")
+    limiter.pause(0.2)
+    started = time.monotonic()
+    with limiter.slot_blocking("job"):
+        pass
+    assert time.monotonic() - started >= 0.19
+
+
+def test_blocking_slots_share_the_limit_with_threads():
+    limiter = ProviderLimiter("test", max_concurrency=1)
+    state = {"active": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def call():
+        with limiter.slot_blocking("job"):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.01)
+            with lock:
+                state["active"] -= 1
+
+    threads = [threading.Thread(target=call) for _ in range(5)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert state["peak"] == 1
+
+
+def test_limiters_are_shared_per_provider_and_key():
+    a = get_limiter("deepgram", "key-1", {"max_concurrency": 2})
+    assert get_limiter("deepgram", "key-1", {"max_concurrency": 2}) is a
+    assert get_limiter("deepgram", "key-2") is not a
+    assert get_limiter("deepgram", "key-1", {"max_concurrency": 5}).max_concurrency == 5
+    assert parse_retry_after("12") == 12.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", default=3) == 3
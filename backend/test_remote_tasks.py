@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from services import remote_tasks
+from services.remote_tasks import RemoteTaskWaiter, backoff_delays
+
+
+def test_backoff_grows_with_jitter_and_is_capped():
+    delays = backoff_delays(1.0, 4.0, multiplier=2.0)
+    values = [next(delays) for _ in range(6)]
+    assert 0.5 <= values[0] <= 1.0
+    assert 1.0 <= values[1] <= 2.0
+    assert all(2.0 <= v <= 4.0 for v in values[3:])
+
+
+def test_many_tasks_wait_on_one_loop(monkeypatch):
+    monkeypatch.setattr(remote_tasks, "POLL_INITIAL_SEC", 0.01)
+    monkeypatch.setattr(remote_tasks, "POLL_MAX_SEC", 0.02)
+    waiter = RemoteTaskWaiter()
+
+    def make_check(task, ready_after):
+        calls = []
+        async def check():
+            calls.append(1)
+            return {"id": task} if len(calls) >= ready_after else None
+        return check
+
+    async def run():
+        return await asyncio.gather(*(waiter.wait("uniscribe", str(i), make_check(i, 3)) for i in range(50)))
+
+    results = asyncio.run(run())
+    assert [r["id"] for r in results] == list(range(50))
+    assert waiter.pending == 0
+
+
+def test_notify_wakes_waiter_before_next_poll(monkeypatch):
+    monkeypatch.setattr(remote_tasks, "POLL_INITIAL_SEC", 30)
+    waiter = RemoteTaskWaiter()
+    state = {"done": False}
+
+    async def check():
+        return {"ok": True} if state["done"] else None
+
+    async def run():
+        task = asyncio.create_task(waiter.wait("uniscribe", "t1", check, webhook=True))
+        await asyncio.sleep(0.01)
+        state["done"] = True
+        assert waiter.notify("uniscribe", "t1")
+        return await asyncio.wait_for(task, timeout=1)
+
+    assert asyncio.run(run()) == {"ok": True}
+    assert not waiter.notify("uniscribe", "t1")
+
+
+def test_failed_check_propagates():
+    waiter = RemoteTaskWaiter()
+
+    async def check():
+        raise Exception("Uniscribe Transcription Failed: bad audio")
+
+    with pytest.raises(Exception, match="bad audio"):
+        asyncio.run(waiter.wait("uniscribe", "t2", check))
+
+
+def test_malformed_responses_are_retried(monkeypatch):
+    monkeypatch.setattr(remote_tasks, "POLL_INITIAL_SEC", 0.01)
+    waiter = RemoteTaskWaiter()
+    responses = iter([ValueError("Expecting value"), KeyError("data"), {"id": "t3"}])
+
+    async def check():
+        response = next(responses)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    assert asyncio.run(waiter.wait("uniscribe", "t3", check)) == {"id": "t3"}
+
+
+def test_persistently_malformed_responses_abort(monkeypatch):
+    monkeypatch.setattr(remote_tasks, "POLL_INITIAL_SEC", 0.001)
+    monkeypatch.setattr(remote_tasks, "POLL_MAX_MALFORMED", 3)
+    waiter = RemoteTaskWaiter()
+    calls = []
+
+    async def check():
+        calls.append(1)
+        raise KeyError("status")
+
+    with pytest.raises(Exception, match="malformed"):
+        asyncio.run(waiter.wait("uniscribe", "t4", check))
+    assert len(calls) == 3
+
+
+def test_sync_uniscribe_fetch_closes_its_client(monkeypatch):
+    from services.transcription_factory import UniscribeProvider
+    provider = UniscribeProvider("key")
+    clients = []
+    monkeypatch.setattr(provider, "_start_task_limited", lambda url, video_id, language: ("t5", "Title", 60))
+
+    async def poll(task_id, video_id, title=None, duration=None, client=None):
+        clients.append(client)
+        return {"video_id": video_id, "title": title, "duration": duration, "segments": []}
+    monkeypatch.setattr(provider, "_poll_and_parse", poll)
+
+    assert provider.fetch("https://example.com/episode.mp3")["title"] == "Title"
+    assert clients[0] is not None and clients[0].is_closed
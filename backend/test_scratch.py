@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from services.scratch import ScratchQuotaExceeded, ScratchSpace
+
+
+def test_job_dir_is_private_and_removed(tmp_path):
+    scratch = ScratchSpace(str(tmp_path / "scratch"))
+    with scratch.job_dir() as first, scratch.job_dir() as second:
+        assert first != second
+        open(os.path.join(first, "audio.ogg"), "wb").write(b"x" * 10)
+        assert scratch.usage_bytes() == 10
+    assert os.listdir(scratch.root) == []
+
+
+def test_job_dir_is_removed_on_error(tmp_path):
+    scratch = ScratchSpace(str(tmp_path / "scratch"))
+    with pytest.raises(RuntimeError):
+        with scratch.job_dir() as path:
+            raise RuntimeError("boom")
+    assert not os.path.exists(path)
+
+
+def test_quota_refuses_new_jobs(tmp_path):
+    scratch = ScratchSpace(str(tmp_path / "scratch"), quota_mb=1)
+    with scratch.job_dir() as path:
+        open(os.path.join(path, "big.mp3"), "wb").write(b"x" * (2 * 1024 * 1024))
+        with pytest.raises(Exception, match="quota"):
+            with scratch.job_dir():
+                pass
+
+
+def test_cleanup_removes_dead_workers_and_legacy_files(tmp_path):
+    scratch = ScratchSpace(str(tmp_path / "scratch"))
+    dead = os.path.join(scratch.root, f"job_999999999_{'a' * 32}")
+    live = os.path.join(scratch.root, f"job_{os.getpid()}_{'b' * 32}")
+    os.makedirs(dead)
+    os.makedirs(live)
+    legacy = tmp_path / "backend"
+    legacy.mkdir()
+    (legacy / "temp_whisper_0c6f1c9e-8a1b-4a38-9d2f-3b7e6f0a1c2d.mp3").write_bytes(b"x")
+    (legacy / "main.py").write_text("keep")
+
+    assert scratch.cleanup_stale(legacy_dir=str(legacy)) == 2
+    assert not os.path.exists(dead)
+    assert os.path.exists(live)
+    assert os.listdir(legacy) == ["main.py"]
+
+
+def test_running_jobs_are_stopped_when_their_writes_exceed_the_quota(tmp_path, monkeypatch):
+    from services import scratch as scratch_module
+    monkeypatch.setattr(scratch_module, "SCRATCH_QUOTA_CHECK_SEC", 0)
+    scratch = ScratchSpace(str(tmp_path / "scratch"), quota_mb=1)
+    with scratch.job_dir() as path:
+        hook = scratch.progress_hook(path)
+        audio = open(os.path.join(path, "audio.ogg"), "wb")
+        audio.write(b"x" * 1024)
+        audio.flush()
+        hook({"status": "downloading"}) # Still under the quota
+        audio.write(b"x" * (2 * 1024 * 1024))
+        audio.flush()
+        with pytest.raises(ScratchQuotaExceeded):
+            hook({"status": "downloading"})
+        audio.close()
+
+
+def test_only_the_job_that_outgrows_its_share_is_stopped(tmp_path, monkeypatch):
+    from services import scratch as scratch_module
+    monkeypatch.setattr(scratch_module, "SCRATCH_QUOTA_CHECK_SEC", 0)
+    scratch = ScratchSpace(str(tmp_path / "scratch"), quota_mb=4, job_reserve_mb=1)
+    with scratch.job_dir() as small, scratch.job_dir() as big:
+        small_hook, big_hook = scratch.progress_hook(small), scratch.progress_hook(big)
+        open(os.path.join(small, "audio.ogg"), "wb").write(b"x" * (512 * 1024))
+        open(os.path.join(big, "audio.ogg"), "wb").write(b"x" * (2 * 1024 * 1024))
+        big_hook() # Grows into the unreserved quota
+        open(os.path.join(big, "audio.ogg"), "ab").write(b"x" * (2 * 1024 * 1024))
+        with pytest.raises(ScratchQuotaExceeded):
+            big_hook() # 4MB would eat into the small job's reservation
+        small_hook() # The small job is still within its share
@@ -0,0 +1,64 @@
+from services.transcript_chunking import chunk_segments_by_tokens, chunk_token_budget, count_tokens, format_segment
+
+
+def _dialogue(n: int):
+    # Two speakers alternating every 3 segments; every segment ends a sentence only at turn ends
+    segments = []
+    for i in range(n):
+        speaker = "Host" if (i // 3) % 2 == 0 else "Guest"
+        text = f"point {i} about the topic" + ("." if i % 3 == 2 else ",")
+        segments.append({"speaker": speaker, "time": f"{i // 60:02d}:{i % 60:02d}", "start_seconds": float(i), "text": text})
+    return segments
+
+
+def test_chunks_respect_budget_cover_everything_and_overlap():
+    segments = _dialogue(300)
+    chunks = chunk_segments_by_tokens(segments, max_tokens=150, overlap_tokens=30)
+    assert len(chunks) > 5
+    assert all(c["tokens"] <= 150 for c in chunks)
+    seen = set()
+    for c in chunks:
+        seen.update(line for line in c["text"].split("\n"))
+    assert seen == {format_segment(s) for s in segments}
+    # Consecutive chunks overlap, and starts always move forward
+    for a, b in zip(chunks, chunks[1:]):
+        assert a["start"] < b["start"] < a["end"]
+
+
+def test_cuts_snap_to_speaker_turns():
+    segments = _dialogue(300)
+    chunks = chunk_segments_by_tokens(segments, max_tokens=150, overlap_tokens=30)
+    starts = {int(c["start"]) for c in chunks}
+    assert all(i % 3 == 0 for i in starts)
+
+
+def test_oversized_segment_is_split_to_fit_the_budget():
+    segments = _dialogue(4)
+    segments[1]["text"] = " ".join(f"w{i}" for i in range(600))
+    segments[2]["start_seconds"] = 200.0
+    segments[3]["start_seconds"] = 201.0
+    chunks = chunk_segments_by_tokens(segments, max_tokens=100, overlap_tokens=10)
+    assert all(c["tokens"] <= 100 for c in chunks)
+    # Every word survives, in order
+    words = [w for c in chunks for line in c["text"].split("\n") for w in line.split() if w.startswith("w") and w[1:].isdigit()]
+    assert sorted(set(words), key=lambda w: int(w[1:])) == [f"w{i}" for i in range(600)]
+    # Pieces are dated between the segment's start and the next segment's
+    starts = [c["start"] for c in chunks]
+    assert starts == sorted(starts)
+    assert any(1.0 < start < 200.0 for start in starts)
+    assert chunks[-1]["text"].endswith(segments[-1]["text"])
+
+
+def test_oversized_last_segment_without_spaces_is_split():
+    segments = [{"speaker": "Host", "time": "00:00", "start_seconds": 0.0, "text": "字" * 1000}]
+    chunks = chunk_segments_by_tokens(segments, max_tokens=200, overlap_tokens=0)
+    assert len(chunks) >= 5
+    assert all(c["tokens"] <= 200 for c in chunks)
+    assert sum(c["text"].count("字") for c in chunks) == 1000
+    assert chunks[-1]["start"] > 0
+
+
+def test_budget_is_capped_by_model_context():
+    assert chunk_token_budget("gpt-3.5-turbo", {"chunk_tokens": 50000}) == 16385 // 4
+    assert chunk_token_budget("gpt-4o", {"chunk_tokens": 8000}) == 8000
+    assert count_tokens("") == 0
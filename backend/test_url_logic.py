@@ -11,6 +11,21 @@ def test_get_id_generic():
     url = "https://example.com/audio.mp3"
     assert p._get_video_id(url).startswith("url_")
 
+def test_get_id_youtube_variants():
+    p = YouTubeCaptionsProvider()
+    for url in ("https://youtu.be/dQw4w9WgXcQ?t=42", "https://m.youtube.com/watch?feature=share&v=dQw4w9WgXcQ",
+                "https://www.youtube.com/shorts/dQw4w9WgXcQ", "https://www.youtube.com/embed/dQw4w9WgXcQ"):
+        assert p._get_video_id(url) == "dQw4w9WgXcQ"
+
+def test_podcast_urls_sharing_a_path_segment_get_distinct_ids():
+    p = DeepgramProvider("fake-key")
+    first = p._get_video_id("https://traffic.example.com/joeroganexp/p2000.mp3")
+    second = p._get_video_id("https://traffic.example.com/joeroganexp/p2001.mp3")
+    assert first.startswith("url_") and second.startswith("url_")
+    assert first != second
+    # Normalisation: host case and fragments do not change the id
+    assert p._get_video_id("https://TRAFFIC.example.com/joeroganexp/p2000.mp3#t=10") == first
+
 def test_youtube_provider_rejects_mp3():
     p = YouTubeCaptionsProvider()
     url = "https://example.com/audio.mp3"
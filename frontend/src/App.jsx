@@ -19,17 +19,22 @@ function App() {
     setProgress({ percent: 100, message: "Loading from cache..." });
 
     try {
-      const res = await axios.get(`http://localhost:8000/history/${key}`);
+      // Load the analysis first; the (much larger) transcript follows lazily
+      const res = await axios.get(`http://localhost:8000/history/${key}?include_transcript=false`);
       // Fix: The cache stores the FULL result { meta, transcript, analysis: {...} }
       // So we must extract .analysis for the dashboard to work correctly.
       const fullResult = res.data;
 
       setData({
         meta: fullResult.meta,
-        transcript: fullResult.transcript,
+        transcript: [],
         analysis: fullResult.analysis || fullResult.result || fullResult
       });
       setLoading(false);
+
+      axios.get(`http://localhost:8000/history/${key}/transcript`)
+        .then(tRes => setData(prev => (prev && prev.meta === fullResult.meta) ? { ...prev, transcript: tRes.data.transcript } : prev))
+        .catch(() => { /* Older entries may have no transcript */ });
     } catch (err) {
       console.error(err);
       setError("Failed to load history item.");
@@ -49,8 +54,22 @@ function App() {
       const response = await axios.post('http://localhost:8000/analyze', payload);
       const { job_id, transcript_preview, meta } = response.data;
 
-      // Store initial data
-      const initialData = { meta, transcript: transcript_preview };
+      // Store initial data (URL jobs fill in meta/transcript once transcription finishes)
+      let initialData = { meta, transcript: transcript_preview };
+
+      // Jobs only carry a transcript_key; the segments are loaded once from the history endpoint
+      let transcriptKey = null;
+      const loadTranscript = (jobMeta, key) => {
+        if (!key || key === transcriptKey || initialData.transcript?.length) return;
+        transcriptKey = key;
+        initialData = { ...initialData, meta: jobMeta || initialData.meta };
+        axios.get(`http://localhost:8000/history/${key}/transcript`)
+          .then(tRes => {
+            initialData = { ...initialData, transcript: tRes.data.transcript };
+            setData(prev => (prev && prev.meta === initialData.meta) ? { ...prev, transcript: tRes.data.transcript } : prev);
+          })
+          .catch(() => { /* The analysis is still shown without it */ });
+      };
 
       // 2. Poll Logic
       const checkStatus = async () => {
@@ -58,6 +77,8 @@ function App() {
           const jobRes = await axios.get(`http://localhost:8000/jobs/${job_id}`);
           const job = jobRes.data;
 
+          loadTranscript(job.meta, job.transcript_key);
+
           if (job.status === 'completed') {
             setLoading(false);
             setLoading(false);
@@ -68,6 +89,13 @@ function App() {
             setError(job.error || "Analysis Failed");
           } else {
             setProgress({ percent: job.progress, message: job.message });
+            if (job.partial_result) {
+              // Streamed items (arc phases, learning moments) arrive before the job completes
+              setData({
+                ...initialData,
+                analysis: { summary: '', narrative_arc: [], learning_moments: [], ...job.partial_result }
+              });
+            }
             setTimeout(checkStatus, 2000); // Poll every 2s
           }
         } catch (err) {
@@ -79,8 +107,75 @@ function App() {
         }
       };
 
-      // Start polling
-      checkStatus();
+      // 3. Prefer server-push events; fall back to polling if the stream breaks
+      if (typeof EventSource === 'undefined') {
+        checkStatus();
+        return;
+      }
+
+      let partial = null;
+      let finished = false;
+      const source = new EventSource(`http://localhost:8000/jobs/${job_id}/events`);
+      const showPartial = () => {
+        setData({
+          ...initialData,
+          analysis: { summary: '', narrative_arc: [], learning_moments: [], ...partial }
+        });
+      };
+
+      const complete = (result) => {
+        finished = true;
+        source.close();
+        setLoading(false);
+        setData({ ...initialData, analysis: result });
+        setRefreshHistory(prev => prev + 1); // Refresh history list
+      };
+      const fail = (error) => {
+        finished = true;
+        source.close();
+        setLoading(false);
+        setError(error || "Analysis Failed");
+      };
+
+      source.addEventListener('snapshot', (e) => {
+        const job = JSON.parse(e.data);
+        loadTranscript(job.meta, job.transcript_key);
+        // Cached results (and jobs that finished before we connected) arrive as a final snapshot
+        if (job.status === 'completed') {
+          complete(job.result);
+          return;
+        }
+        if (job.status === 'failed') {
+          fail(job.error);
+          return;
+        }
+        setProgress({ percent: job.progress, message: job.message });
+        if (job.partial_result) {
+          partial = job.partial_result;
+          showPartial();
+        }
+      });
+      source.addEventListener('progress', (e) => {
+        const job = JSON.parse(e.data);
+        setProgress({ percent: job.progress, message: job.message });
+      });
+      source.addEventListener('transcript', (e) => {
+        const { meta: jobMeta, transcript_key } = JSON.parse(e.data);
+        loadTranscript(jobMeta, transcript_key);
+      });
+      source.addEventListener('partial', (e) => {
+        const { key, item } = JSON.parse(e.data);
+        partial = { ...(partial || {}), [key]: [...(partial?.[key] || []), item] };
+        showPartial();
+      });
+      source.addEventListener('complete', (e) => complete(JSON.parse(e.data).result));
+      source.addEventListener('failed', (e) => fail(JSON.parse(e.data).error));
+      source.onerror = () => {
+        if (finished) return;
+        console.warn("Event stream interrupted, falling back to polling");
+        source.close();
+        checkStatus();
+      };
 
     } catch (err) {
       console.error(err);